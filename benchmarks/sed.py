@@ -0,0 +1,269 @@
+"""
+Benchmarks of coreutils.sed on synthetic log-like inputs.
+
+    python -m benchmarks.sed                              # default matrix
+    python -m benchmarks.sed --sizes 1K,1M,1G,4G          # up to several GB
+    python -m benchmarks.sed --save benchmarks/baseline.json
+    python -m benchmarks.sed --compare benchmarks/baseline.json
+
+Every case is timed (best of a few runs) and then run once more under tracemalloc
+to record peak memory allocated by Python. Comparison with baseline exits with status 1,
+if any case got slower or allocates more than allowed by --threshold.
+"""
+
+import argparse
+import itertools
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from coreutils import sed
+from coreutils.sed.utils import FLAGS_MAP
+
+LINE_TEMPLATE = (
+    '2020-08-{day:02d} 12:{minute:02d}:{second:02d} host{host} user{user} GET /api/v1/items/{item} {level} {status}'
+)
+MATCH_LEVEL = 'ERROR'
+MISS_LEVEL = 'INFO'
+# Synthetic input is built of this many distinct lines repeated over and over
+BLOCK_LINES = 4096
+MANY_PATHS = 16
+# Lists of lines bigger than this aren't built, they would measure swapping rather than matching
+MAX_LIST_SIZE = 256 * 1024 * 1024
+# Cases are repeated until they run this long in total, best run is reported
+MIN_RUN_TIME = 1.0
+MAX_RUNS = 1000
+DENSITIES = {'rare': 0.01, 'dense': 0.5}
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+class Case(NamedTuple):
+    operation: str
+    input_type: str
+    size: int
+    patterns: int
+    density: str
+    flags: str
+
+    @property
+    def name(self) -> str:
+        return '{}/{}/{}/{}p/{}/{}'.format(
+            self.operation, self.input_type, format_size(self.size), self.patterns, self.density, self.flags or '-'
+        )
+
+
+class Result(NamedTuple):
+    seconds: float
+    mb_per_s: float
+    peak_bytes: int
+
+
+def parse_size(size: str) -> int:
+    size = size.strip().upper()
+    if size[-1:] in SIZE_UNITS:
+        return int(float(size[:-1]) * SIZE_UNITS[size[-1]])
+    return int(size)
+
+
+def format_size(size: int) -> str:
+    for unit, factor in sorted(SIZE_UNITS.items(), key=lambda item: -item[1]):
+        if size >= factor and size % factor == 0:
+            return '{}{}'.format(size // factor, unit)
+    return str(size)
+
+
+def block(density: str) -> List[str]:
+    """
+    Distinct lines, every line matches with *density* probability (spread evenly).
+    """
+    step = 1 / DENSITIES[density]
+    matching = {int(index * step) for index in range(int(BLOCK_LINES / step))}
+    return [
+        LINE_TEMPLATE.format(
+            day=index % 28 + 1,
+            minute=index % 60,
+            second=index * 7 % 60,
+            host=index % 13,
+            user=index * 31 % 1000,
+            item=index,
+            level=MATCH_LEVEL if index in matching else MISS_LEVEL,
+            status=500 if index in matching else 200,
+        )
+        for index in range(BLOCK_LINES)
+    ]
+
+
+def lines(size: int, density: str) -> Iterator[str]:
+    """
+    Yields lines of about *size* bytes in total (newlines included).
+    """
+    written = 0
+    for line in itertools.cycle(block(density)):
+        if written >= size:
+            return
+        written += len(line) + 1
+        yield line
+
+
+class Inputs:
+    """
+    Builds inputs lazily and caches files between cases.
+    """
+
+    def __init__(self, directory: pathlib.Path):
+        self._directory = directory
+        self._files: Dict[tuple, List[pathlib.Path]] = {}
+
+    def get(self, case: Case):
+        if case.input_type == 'list':
+            return list(lines(case.size, case.density))
+        paths = self._paths(case.size, case.density, 1 if case.input_type == 'path' else MANY_PATHS)
+        return paths[0] if case.input_type == 'path' else paths
+
+    def _paths(self, size: int, density: str, count: int) -> List[pathlib.Path]:
+        key = (size, density, count)
+        if key not in self._files:
+            name = '{}-{}-{}-{{}}.log'.format(format_size(size), density, count)
+            paths = [self._directory / name.format(index) for index in range(count)]
+            for path in paths:
+                with path.open('w') as file:
+                    file.writelines(line + '\n' for line in lines(size // count, density))
+            self._files[key] = paths
+        return self._files[key]
+
+
+def patterns(count: int) -> List[str]:
+    """
+    First pattern is literal found in matching lines, then goes regular expression,
+    which finds them too, others never match.
+    """
+    found = [MATCH_LEVEL, r'{} \d+$'.format(MATCH_LEVEL)]
+    missing = ['user{}x'.format(index) for index in range(count)]
+    return (found + missing)[:count]
+
+
+def operation(case: Case) -> Callable:
+    flags = {FLAGS_MAP[flag] for flag in case.flags}
+    case_patterns = patterns(case.patterns)
+    alternation = '|'.join('(?:{})'.format(pattern) for pattern in case_patterns)
+    if case.operation == 'search':
+        return lambda processable: sed.search(processable, case_patterns, flags)
+    if case.operation == 'substitute':
+        commands = [(pattern, 'X') for pattern in case_patterns]
+        return lambda processable: sed.substitute(processable, commands, flags)
+    if case.operation == 'sed_search':
+        command = '/{}/{}'.format(alternation, case.flags)
+        return lambda processable: sed.sed_search(command, processable)
+    command = 's/{}/X/{}'.format(alternation, case.flags)
+    return lambda processable: sed.sed_substitute(command, processable)
+
+
+def matrix(sizes: List[int], operations: List[str]) -> Iterator[Case]:
+    """
+    Every operation on every input type and size, then variations
+    of pattern count, match density and flags on the smallest of big inputs.
+    """
+    for size, operation_name, input_type in itertools.product(sizes, operations, ('list', 'path', 'paths')):
+        if input_type != 'list' or size <= MAX_LIST_SIZE:
+            yield Case(operation_name, input_type, size, 1, 'rare', '')
+
+    size = next((size for size in sorted(sizes) if size >= SIZE_UNITS['M']), max(sizes))
+    search_flags = ['I', 'p', 'd']
+    substitute_flags = ['g', 'I', 'p', 'gI']
+    for operation_name in operations:
+        for count, density in itertools.product((4, 32, 256), DENSITIES):
+            yield Case(operation_name, 'path', size, count, density, '')
+        flag_variants = substitute_flags if 'substitute' in operation_name else search_flags
+        for flags in flag_variants:
+            yield Case(operation_name, 'path', size, 1, 'dense', flags)
+
+
+def measure(case: Case, inputs: Inputs) -> Result:
+    run = operation(case)
+    processable = inputs.get(case)
+
+    best = float('inf')
+    total = 0.0
+    for _ in range(MAX_RUNS):
+        # Every run starts cold, otherwise repeated small inputs are answered from match cache
+        sed.match_cache.clear()
+        start = time.perf_counter()
+        run(processable)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+        if total >= MIN_RUN_TIME:
+            break
+
+    sed.match_cache.clear()
+    tracemalloc.start()
+    try:
+        run(processable)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(best, case.size / best / SIZE_UNITS['M'], peak)
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    Returns descriptions of cases, which got slower or need more memory than in baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = Result(**baseline[name])
+        if result.mb_per_s < base.mb_per_s * (1 - threshold):
+            regressions.append('{}: {:.1f} MB/s, was {:.1f} MB/s'.format(name, result.mb_per_s, base.mb_per_s))
+        if result.peak_bytes > max(base.peak_bytes * (1 + threshold), base.peak_bytes + SIZE_UNITS['M']):
+            regressions.append('{}: peak {} bytes, was {} bytes'.format(name, result.peak_bytes, base.peak_bytes))
+    return regressions
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.sed', description='Benchmarks coreutils.sed')
+    parser.add_argument('--sizes', default='1K,1M,16M', help='comma separated input sizes, like 1K,64M,2G')
+    parser.add_argument(
+        '--operations', default='search,substitute,sed_search,sed_substitute', help='comma separated operations'
+    )
+    parser.add_argument('--filter', default='', help='run only cases, which name contains this text')
+    parser.add_argument('--save', type=pathlib.Path, help='save results as baseline JSON')
+    parser.add_argument('--compare', type=pathlib.Path, help='compare results with baseline JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative regression')
+    return parser.parse_args(args)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    options = parse_args(args)
+    sizes = [parse_size(size) for size in options.sizes.split(',')]
+    cases = [case for case in matrix(sizes, options.operations.split(',')) if options.filter in case.name]
+    baseline = json.loads(options.compare.read_text())['results'] if options.compare else {}
+
+    results: Dict[str, Result] = {}
+    with tempfile.TemporaryDirectory(prefix='sed-bench-') as directory:
+        inputs = Inputs(pathlib.Path(directory))
+        print('{:<56} {:>10} {:>10} {:>12}'.format('case', 'seconds', 'MB/s', 'peak memory'))
+        for case in cases:
+            result = results[case.name] = measure(case, inputs)
+            print('{:<56} {:>10.4f} {:>10.1f} {:>12}'.format(case.name, *result))
+            sys.stdout.flush()
+
+    if options.save:
+        meta = {'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time()}
+        report = {'meta': meta, 'results': {name: result._asdict() for name, result in results.items()}}
+        options.save.write_text(json.dumps(report, indent=2) + '\n')
+
+    regressions = compare(results, baseline, options.threshold)
+    for regression in regressions:
+        print('REGRESSION {}'.format(regression))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
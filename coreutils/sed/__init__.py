@@ -1,2 +1,49 @@
+import importlib
+import sys
+
 from .utils import SedException, SedFlags
-from .sed import sed_search, sed_substitute, search, substitute, _is_processors_matched, _match_line
+
+# Public names by module, which defines them. Modules are imported when their names are first used,
+# so importing one module of package (e.g. cli) doesn't import all others.
+_EXPORTS = {
+    'cache': ('CacheInfo', 'MatchCache'),
+    'stats': ('SedStats',),
+    'sed': (
+        'sed_search', 'sed_substitute', 'search', 'search_first', 'substitute', 'isearch', 'isubstitute', 'explain',
+        '_is_processors_matched', '_match_line', 'match_cache',
+    ),
+    'program': ('SedProgram', 'compile'),
+    'script': ('SedScript', 'compile_script', 'sed_script'),
+    'records': ('Record', 'isearch_records', 'search_records'),
+    'index': ('LineIndex', 'build_index', 'load_index'),
+    'tail': ('FollowedFile', 'follow'),
+    'batch': ('BatchQuery', 'isearch_batch', 'search_batch'),
+    'backends': ('BudgetBackend', 'LinearBackend', 'StdlibBackend', 'get_backend', 'set_backend'),
+    'walk': ('Walk',),
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+_SUBMODULES = frozenset((
+    'aio', 'backends', 'batch', 'buffers', 'cache', 'cli', 'compression', 'files', 'index', 'linear', 'matchers',
+    'parallel', 'program', 'records', 'script', 'sed', 'stats', 'tail', 'utils', 'walk',
+))
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        value = getattr(importlib.import_module('.' + _MODULES[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ is supported since Python 3.7
+    for _name in _MODULES:
+        __getattr__(_name)
@@ -0,0 +1,270 @@
+# pylint: disable=protected-access
+
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import itertools
+import pathlib
+from typing import Any, AnyStr, AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Union
+
+from coreutils.sed import SedException, SedFlags
+from coreutils.sed import sed as engine
+
+# How many lines are read or matched by one executor call
+BATCH_SIZE = 1024
+# How long (in seconds) lines of slow async source wait for their batch to fill up
+BATCH_LATENCY = 0.05
+
+AsyncProcessable = Union[engine.Processable, AsyncIterable[AnyStr], AsyncIterable[pathlib.Path]]
+
+
+def _next_batch(iterator: Iterator, size: int) -> List:
+    return list(itertools.islice(iterator, size))
+
+
+async def _drain(iterator: Iterator, size: int) -> AsyncIterator:
+    """
+    Advances blocking *iterator* (file reader, lazy iterable) in default executor,
+    *size* items at a time.
+    """
+    loop = asyncio.get_event_loop()
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, _next_batch, iterator, size)
+            for item in batch:
+                yield item
+            if len(batch) < size:
+                return
+    finally:
+        # Generator may still run in executor, if consumer went away while waiting for it
+        with contextlib.suppress(ValueError):
+            getattr(iterator, 'close', lambda: None)()
+
+
+class _Batcher:
+    """
+    Pulls items of async source in background task, grouping them into batches.
+    Batch is given away once it has *size* items or `BATCH_LATENCY` seconds
+    after its first item arrived, so lines of slow streams aren't held back.
+    """
+
+    def __init__(self, source: AsyncIterable, size: int):
+        self._source = source
+        self._size = size
+        self._batch: List = []
+        self._exhausted = False
+        self._started = asyncio.Event()
+        self._full = asyncio.Event()
+        self._taken = asyncio.Event()
+
+    async def _pull(self):
+        try:
+            async for item in self._source:
+                self._batch.append(item)
+                if len(self._batch) == 1:
+                    self._started.set()
+                if len(self._batch) >= self._size:
+                    self._full.set()
+                    self._taken.clear()
+                    await self._taken.wait()
+        finally:
+            self._exhausted = True
+            self._started.set()
+            self._full.set()
+
+    def _take(self) -> List:
+        batch, self._batch = self._batch, []
+        if not self._exhausted:
+            self._started.clear()
+            self._full.clear()
+        self._taken.set()
+        return batch
+
+    async def batches(self) -> AsyncIterator[List]:
+        pulling = asyncio.ensure_future(self._pull())
+        try:
+            while True:
+                await self._started.wait()
+                if not self._full.is_set():
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._full.wait(), BATCH_LATENCY)
+                if self._batch:
+                    yield self._take()
+                elif self._exhausted:
+                    break
+            await pulling
+        finally:
+            pulling.cancel()
+
+
+async def _batches(processable: AsyncProcessable, size: int) -> AsyncIterator[List]:
+    if isinstance(processable, (str, bytes, pathlib.Path)):
+        yield [processable]
+    elif hasattr(processable, '__aiter__'):
+        async for batch in _Batcher(processable, size).batches():  # type: ignore
+            yield batch
+    else:
+        batch = []
+        async for item in _drain(iter(processable), size):  # type: ignore
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _search_batch(lines: List[AnyStr], processors: List[engine.Processor], flags: engine.Flags) -> List[AnyStr]:
+    return list(engine._search_lines(lines, processors, flags))
+
+
+def _substitute_batch(lines: List[AnyStr], processors: List[engine.Processor], flags: engine.Flags) -> List[AnyStr]:
+    return list(engine._substitute_lines(lines, processors, flags))
+
+
+async def _process(
+    processable: AsyncProcessable,
+    process_file: Callable[[pathlib.Path], Iterator[AnyStr]],
+    process_lines: Callable[[List[AnyStr]], List[AnyStr]],
+    executor: Optional[concurrent.futures.Executor],
+    batch_size: int,
+) -> AsyncIterator[AnyStr]:
+    """
+    Files are processed by blocking *process_file* advanced in default executor,
+    batches of lines are processed by *process_lines* in *executor*.
+    """
+    loop = asyncio.get_event_loop()
+    async for batch in _batches(processable, batch_size):
+        for is_file, items in itertools.groupby(batch, key=lambda item: isinstance(item, pathlib.Path)):
+            if not is_file:
+                for line in await loop.run_in_executor(executor, process_lines, list(items)):
+                    yield line
+                continue
+            for path in items:
+                async for line in _drain(process_file(path), batch_size):
+                    yield line
+
+
+def isearch(
+    processable: AsyncProcessable,
+    commands: engine.Commands,
+    flags: Optional[engine.Flags] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+    batch_size: int = BATCH_SIZE,
+    max_count: Optional[int] = None,
+) -> AsyncIterator[AnyStr]:
+    """
+    Asynchronous version of `coreutils.sed.isearch`, returning async generator.
+    *processable* can also be async iterable of lines (e.g. `asyncio.StreamReader`) or files.
+    Files are read in default executor, lines are matched in batches in *executor*
+    (default one if not given), so event loop isn't blocked.
+    Source isn't read any further once *max_count* lines are matched.
+    """
+    flags = frozenset(flags or set())
+    engine._check_flags(flags)
+    engine._check_max_count(max_count, flags)
+    processors = engine._cast_commands_to_processors(commands, flags=flags)
+    mode = engine._file_mode(processors, encoding, errors)
+    lines = _process(
+        processable,
+        functools.partial(engine._search_sequentially, processors=processors, flags=flags, mode=mode),
+        functools.partial(_search_batch, processors=processors, flags=flags),
+        executor,
+        batch_size,
+    )
+    return lines if max_count is None else _take(lines, max_count)
+
+
+async def _take(lines: AsyncIterator[AnyStr], count: int) -> AsyncIterator[AnyStr]:
+    try:
+        if count > 0:
+            async for line in lines:
+                yield line
+                count -= 1
+                if not count:
+                    return
+    finally:
+        await lines.aclose()  # type: ignore
+
+
+async def search(
+    processable: AsyncProcessable,
+    commands: engine.Commands,
+    flags: Optional[engine.Flags] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+    max_count: Optional[int] = None,
+) -> List[AnyStr]:
+    """
+    Asynchronous version of `coreutils.sed.search`.
+    """
+    lines = isearch(
+        processable, commands, flags, encoding=encoding, errors=errors, executor=executor, max_count=max_count
+    )
+    return [line async for line in lines]
+
+
+def isubstitute(
+    processable: AsyncProcessable,
+    commands: engine.SubstitutionCommands,
+    flags: Optional[engine.Flags] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+    batch_size: int = BATCH_SIZE,
+) -> AsyncIterator[AnyStr]:
+    """
+    Asynchronous version of `coreutils.sed.isubstitute`, returning async generator.
+    Sources are handled the same way as in `isearch`.
+    """
+    flags = frozenset(flags or set())
+    engine._check_flags(flags)
+    if SedFlags.INPLACE in flags:
+        raise SedException(flags, 'SedFlags.INPLACE is not supported in streaming mode, use `substitute` instead')
+
+    processors = engine._cast_commands_to_processors(commands, flags=flags, action='substitution')
+    mode = engine._file_mode(processors, encoding, errors)
+    return _process(
+        processable,
+        functools.partial(engine._substitute_processable, processors=processors, flags=flags, mode=mode),
+        functools.partial(_substitute_batch, processors=processors, flags=flags),
+        executor,
+        batch_size,
+    )
+
+
+async def substitute(
+    processable: AsyncProcessable,
+    commands: engine.SubstitutionCommands,
+    flags: Optional[engine.Flags] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> Optional[List[AnyStr]]:
+    """
+    Asynchronous version of `coreutils.sed.substitute`.
+    Inplace substitution rewrites files one by one in *executor*.
+    """
+    flags = frozenset(flags or set())
+    if SedFlags.INPLACE not in flags:
+        lines = isubstitute(processable, commands, flags, encoding=encoding, errors=errors, executor=executor)
+        return [line async for line in lines]
+
+    processors = engine._cast_commands_to_processors(commands, flags=flags, action='substitution')
+    mode = engine._file_mode(processors, encoding, errors)
+    loop = asyncio.get_event_loop()
+    paths: Iterable[Any] = await _collect(processable)
+    await loop.run_in_executor(
+        executor, functools.partial(engine._substitute_inplace, paths, processors, flags, mode=mode)
+    )
+    return None
+
+
+async def _collect(processable: AsyncProcessable) -> Any:
+    if hasattr(processable, '__aiter__'):
+        return [item async for item in processable]  # type: ignore
+    return processable
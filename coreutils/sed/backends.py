@@ -0,0 +1,185 @@
+"""
+Pluggable regular expression backends. Every pattern sed matches
+(searches, substitutions, scripts, records) is compiled by the current backend:
+
+    StdlibBackend()       `re` as is, the default
+    LinearBackend()       linear time engine, patterns it can't match are rejected
+    BudgetBackend(0.05)   `re`, but every call gets time budget; line `re` can't finish
+                          within it is matched by linear engine instead
+
+    previous = set_backend(BudgetBackend(0.05))
+
+Budget is enforced with SIGALRM timer, which exists only on Unix and interrupts
+only the main thread. Elsewhere budget backend matches supported patterns
+with linear engine right away and others with `re` unbounded.
+"""
+
+import re
+import signal
+import threading
+from typing import AnyStr, Optional
+
+import coreutils.sed.linear as linear
+from coreutils.sed import SedException
+
+DEFAULT_BUDGET = 0.1
+
+
+class StdlibBackend:
+    name = 're'
+
+    def compile(self, pattern: AnyStr, flags: int = 0):
+        return re.compile(pattern, flags)
+
+    def __repr__(self) -> str:
+        return '{}()'.format(type(self).__name__)
+
+
+class LinearBackend:
+    name = 'linear'
+
+    def compile(self, pattern: AnyStr, flags: int = 0) -> linear.LinearPattern:
+        return linear.compile(pattern, flags)
+
+    def __repr__(self) -> str:
+        return '{}()'.format(type(self).__name__)
+
+
+class BudgetBackend:
+    name = 'budget'
+
+    def __init__(self, budget: float = DEFAULT_BUDGET):
+        if budget <= 0:
+            raise SedException(budget, 'Time budget must be positive')
+        self.budget = budget
+
+    def compile(self, pattern: AnyStr, flags: int = 0) -> 'BudgetPattern':
+        return BudgetPattern(pattern, flags, self.budget)
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, self.budget)
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class _Alarm:
+    """
+    SIGALRM handler is installed once (replacing it on every call costs more than matching),
+    alarms arriving while no call is timed go to the handler it replaced.
+    """
+
+    armed = False
+    previous = None
+
+
+def _alarm(signum, frame):
+    if _Alarm.armed:
+        _Alarm.armed = False
+        raise _BudgetExceeded()
+    if callable(_Alarm.previous):
+        _Alarm.previous(signum, frame)
+
+
+def _can_time() -> bool:
+    if not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        return False
+    if signal.getsignal(signal.SIGALRM) is not _alarm:
+        _Alarm.previous = signal.signal(signal.SIGALRM, _alarm)
+    return True
+
+
+def _timed(budget: float, function, *args):
+    _Alarm.armed = True
+    signal.setitimer(signal.ITIMER_REAL, budget)
+    try:
+        return function(*args)
+    finally:
+        _Alarm.armed = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class BudgetPattern:
+    """
+    `re` pattern, which calls are interrupted after *budget* seconds
+    and redone by linear engine. Patterns linear engine doesn't support
+    raise `SedException` instead, so no call takes much longer than the budget.
+    Callable substitutions of interrupted calls may be called again.
+    """
+
+    def __init__(self, pattern: AnyStr, flags: int, budget: float):
+        self.pattern = pattern
+        self.budget = budget
+        self.regex = re.compile(pattern, flags)
+        self.flags = self.regex.flags
+        self.groups = self.regex.groups
+        self.groupindex = self.regex.groupindex
+        self.linear: Optional[linear.LinearPattern]
+        try:
+            self.linear = linear.compile(pattern, flags)
+        except SedException:
+            self.linear = None
+
+    def __reduce__(self):
+        return BudgetPattern, (self.pattern, self.flags, self.budget)
+
+    def __repr__(self) -> str:
+        return 'BudgetPattern({!r}, budget={!r})'.format(self.pattern, self.budget)
+
+    def _call(self, name: str, *args):
+        if not _can_time():
+            return getattr(self.regex if self.linear is None else self.linear, name)(*args)
+        try:
+            return _timed(self.budget, getattr(self.regex, name), *args)
+        except _BudgetExceeded:
+            if self.linear is None:
+                raise SedException(
+                    self.pattern, 'Matching took longer than {} seconds, linear engine can not match pattern'.format(
+                        self.budget
+                    )
+                ) from None
+            return getattr(self.linear, name)(*args)
+
+    def search(self, string: AnyStr, pos: int = 0):
+        return self._call('search', string, pos)
+
+    def subn(self, repl, string: AnyStr, count: int = 0):
+        return self._call('subn', repl, string, count)
+
+    def sub(self, repl, string: AnyStr, count: int = 0) -> AnyStr:
+        return self._call('sub', repl, string, count)
+
+
+_backend = StdlibBackend()
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(backend) -> object:
+    """
+    Makes *backend* compile patterns from now on, returns the previous one.
+    Cached programs and scripts are dropped, so none keeps patterns of the previous backend.
+    """
+    global _backend  # pylint: disable=global-statement
+    # Imported here, both modules compile patterns through this one
+    import coreutils.sed.program as program
+    import coreutils.sed.script as script
+
+    previous, _backend = _backend, backend
+    program.compile.cache_clear()
+    script._compile_script.cache_clear()  # pylint: disable=protected-access
+    return previous
+
+
+def compile(pattern: AnyStr, flags: int = 0):  # noqa: A001  # pylint: disable=redefined-builtin
+    """
+    Compiles pattern with the current backend.
+    """
+    return _backend.compile(pattern, flags)
+
+
+def is_stdlib() -> bool:
+    return isinstance(_backend, StdlibBackend)
@@ -0,0 +1,284 @@
+"""
+Many independent searches over the same input in one pass:
+
+    results = search_batch(path, {
+        'server errors': r' 5\\d\\d$',
+        'logins': BatchQuery('post /login', {SedFlags.INSENSITIVE}),
+    })
+    results['logins']
+
+Input is read once, in blocks of many lines. Literals, which every match of query
+patterns must contain, are searched in the whole block (every distinct literal once
+for all queries having it), so queries check only lines, where their literals are.
+Blocks without any literal are skipped without even being split into lines.
+Queries without such literals (callables, DELETE and PRINT flags and so on) check every line.
+"""
+
+# pylint: disable=protected-access
+
+import bisect
+import itertools
+import operator
+import pathlib
+from typing import AnyStr, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple, Union
+
+import coreutils.sed.files as files
+import coreutils.sed.matchers as matchers
+import coreutils.sed.walk as walk
+from coreutils.sed import SedFlags
+from coreutils.sed import sed as engine
+
+# Lines given directly are searched in blocks of this many lines
+BLOCK_LINES = 4096
+# Files are read in blocks of about this many characters (bytes in binary mode)
+BLOCK_SIZE = 1024 * 1024
+# Literal found in more than every this many lines of block is looked for line by line
+DENSE_HITS = 16
+
+
+class BatchQuery(NamedTuple):
+    """
+    Search *commands* with their own *flags*, plain commands are searched without flags.
+    """
+
+    commands: engine.Commands
+    flags: engine.Flags = frozenset()
+
+
+Queries = Mapping[str, Union[engine.Commands, BatchQuery]]
+
+
+class _Query:
+    __slots__ = ('name', 'flags', 'processors', 'is_matched', 'print_all', 'literals')
+
+    def __init__(self, name: str, query: Union[engine.Commands, BatchQuery]):
+        if not isinstance(query, BatchQuery):
+            query = BatchQuery(query)
+        self.name = name
+        self.flags = frozenset(query.flags or set())
+        engine._check_flags(self.flags)
+        self.processors = engine._cast_commands_to_processors(query.commands, flags=self.flags)
+        self.is_matched = engine._line_matcher(self.processors, self.flags)
+        self.print_all = SedFlags.PRINT in self.flags
+        self.literals = _required_literals(query.commands, self.flags)
+
+
+def _required_literals(commands: engine.Commands, flags: engine.Flags) -> Optional[List[AnyStr]]:
+    """
+    Returns literals (lowered for case insensitive search), one of which every line
+    matched by commands contains, `None` if lines without them can be matched (or printed) too.
+    """
+    if SedFlags.DELETE in flags or SedFlags.PRINT in flags:
+        return None
+    if isinstance(commands, (str, bytes)) or callable(commands):
+        commands = [commands]
+    literals = []
+    for command in commands:
+        if not isinstance(command, (str, bytes)):
+            return None
+        literal = matchers.literal_text(command)
+        if literal is None:
+            literal = matchers.required_literal(command)
+        literal = matchers._searchable_literal(literal, flags)
+        if not literal:
+            return None
+        literals.append(literal.lower() if SedFlags.INSENSITIVE in flags else literal)
+    return literals or None
+
+
+def _newline(text: AnyStr) -> AnyStr:
+    return b'\n' if isinstance(text, bytes) else '\n'  # type: ignore
+
+
+class _Block:
+    """
+    Lines joined with newlines into *text*, lines are split only when needed.
+    """
+
+    def __init__(self, text: AnyStr, lines: Optional[List[AnyStr]] = None):
+        self.text = text
+        self._lines = lines
+        self._starts: Optional[List[int]] = None
+        self._folded_lines: Optional[List[AnyStr]] = None
+
+    @property
+    def lines(self) -> List[AnyStr]:
+        if self._lines is None:
+            self._lines = self.text.split(_newline(self.text))
+        return self._lines
+
+    @property
+    def starts(self) -> List[int]:
+        """
+        Positions of line starts in text followed by position after text end.
+        """
+        if self._starts is None:
+            self._starts = [0]
+            self._starts.extend(map(operator.add, itertools.accumulate(map(len, self.lines)), itertools.count(1)))
+        return self._starts
+
+    def line_index(self, position: int) -> int:
+        return bisect.bisect_right(self.starts, position) - 1
+
+    def folded_lines(self, folded_text: AnyStr) -> List[AnyStr]:
+        """
+        Lines of folded text, which has the same length as block text.
+        """
+        if self._folded_lines is None:
+            folded_lines = folded_text.split(_newline(folded_text))
+            if len(folded_lines) != len(self.lines):
+                # Lines given directly contain newlines, so they are cut from folded text by their positions
+                starts = self.starts
+                folded_lines = [folded_text[start : end - 1] for start, end in zip(starts, starts[1:])]
+            self._folded_lines = folded_lines
+        return self._folded_lines
+
+
+class _Scanner:
+    """
+    Finds lines of block containing query literals,
+    every distinct literal is searched once per block for all queries having it.
+    """
+
+    def __init__(self, queries: List[_Query]):
+        literals: Dict[Tuple[AnyStr, bool], List[int]] = {}
+        for number, query in enumerate(queries):
+            insensitive = SedFlags.INSENSITIVE in query.flags
+            for literal in query.literals or ():
+                literals.setdefault((literal, insensitive), []).append(number)
+        self._literals = list(literals.items())
+        folded = [literal for (literal, insensitive), _ in self._literals if insensitive]
+        self._fold = matchers._fold_function(folded) if folded else None
+
+    def scan(self, block: _Block) -> Dict[int, Set[int]]:
+        """
+        Returns numbers of queries, which literals are in line, by line index.
+        """
+        folded_text = None
+        if self._fold is not None:
+            # Folding keeps text length, so positions are the same as in original text
+            folded_text = self._fold(block.text)
+        hits: Dict[int, Set[int]] = {}
+        for (literal, insensitive), numbers in self._literals:
+            text = folded_text if insensitive else block.text
+            position = text.find(literal)  # type: ignore
+            if position == -1:
+                continue
+            if text.count(literal, position) * DENSE_HITS > len(block.lines):  # type: ignore
+                lines = block.folded_lines(text) if insensitive else block.lines
+                indexes: Iterable[int] = [index for index, line in enumerate(lines) if literal in line]
+            else:
+                indexes = self._find(block, text, literal, position)  # type: ignore
+            for index in indexes:
+                if index in hits:
+                    hits[index].update(numbers)
+                else:
+                    hits[index] = set(numbers)
+        return hits
+
+    @staticmethod
+    def _find(block: _Block, text: AnyStr, literal: AnyStr, position: int) -> Iterator[int]:
+        while position != -1:
+            index = block.line_index(position)
+            yield index
+            position = text.find(literal, block.starts[index + 1])  # type: ignore
+
+
+def _file_blocks(path: pathlib.Path, mode: files.FileMode) -> Iterator[_Block]:
+    """
+    Reads file in blocks ending at line ends, newline ending block is dropped,
+    so block lines are the same as lines of file.
+    """
+    newline = mode.newline
+    with mode.open(path) as file:
+        for text in files.read_blocks(file, BLOCK_SIZE):
+            yield _Block(text[:-1] if text.endswith(newline) else text)
+
+
+def _blocks(processable: engine.Processable, mode: files.FileMode) -> Iterator[_Block]:
+    if isinstance(processable, (str, bytes, pathlib.Path)):
+        processable = [processable]
+    for is_file, processes in itertools.groupby(processable, key=lambda process: isinstance(process, pathlib.Path)):
+        if is_file:
+            for path in walk.file_paths(processes):
+                yield from _file_blocks(path, mode)  # type: ignore
+            continue
+        while True:
+            lines = list(itertools.islice(processes, BLOCK_LINES))
+            if not lines:
+                break
+            # Lines given directly may contain newlines, so they're kept as they are
+            yield _Block(_newline(lines[0]).join(lines), lines)
+
+
+def _search(blocks: Iterable[_Block], queries: List[_Query]) -> Iterator[Tuple[str, AnyStr]]:
+    scanner = _Scanner(queries)
+    # Queries without literals check every line
+    always = [number for number, query in enumerate(queries) if query.literals is None]
+    for block in blocks:
+        hits = scanner.scan(block)
+        if not hits and not always:
+            continue
+        lines = block.lines
+        for index in range(len(lines)) if always else sorted(hits):
+            line = lines[index]
+            candidates = hits.get(index)
+            if candidates is None:
+                numbers: Iterable[int] = always
+            elif always or len(candidates) > 1:
+                numbers = sorted(candidates.union(always))
+            else:
+                numbers = candidates
+            for number in numbers:
+                query = queries[number]
+                if query.is_matched(line):
+                    yield query.name, line
+                    if query.print_all:
+                        yield query.name, line
+                elif query.print_all:
+                    yield query.name, line
+
+
+def _compile_queries(queries: Queries) -> List[_Query]:
+    compiled = [_Query(name, query) for name, query in queries.items()]
+    patterns = [
+        pattern
+        for query in compiled
+        for processor in query.processors
+        for pattern in engine._processor_patterns(processor)
+    ]
+    engine._check_pattern_types(queries, patterns)
+    return compiled
+
+
+def isearch_batch(
+    processable: engine.Processable,
+    queries: Queries,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+) -> Iterator[Tuple[str, AnyStr]]:
+    """
+    Streaming version of `search_batch`, yields (query name, line) pairs in input order.
+    Line matched by several queries is yielded for every one of them, in order of queries.
+    """
+    compiled = _compile_queries(queries)
+    processors = [processor for query in compiled for processor in query.processors]
+    mode = engine._file_mode(processors, encoding, errors)
+    return _search(_blocks(processable, mode), compiled)
+
+
+def search_batch(
+    processable: engine.Processable,
+    queries: Queries,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+) -> Dict[str, List[AnyStr]]:
+    """
+    Runs many independent searches over *processable*, reading it once.
+    *queries* map names to search commands or `BatchQuery` with commands and flags.
+    Returns lines matched by every query (the same as `coreutils.sed.search` would) by query name.
+    """
+    results: Dict[str, List[AnyStr]] = {name: [] for name in queries}
+    for name, line in isearch_batch(processable, queries, encoding=encoding, errors=errors):
+        results[name].append(line)
+    return results
@@ -0,0 +1,352 @@
+import codecs
+import functools
+import locale
+import mmap
+import pathlib
+import re
+import stat
+from typing import AnyStr, Callable, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+import coreutils.sed.backends as backends
+import coreutils.sed.files as files
+import coreutils.sed.linear as linear
+import coreutils.sed.matchers as matchers
+from coreutils.sed.utils import SedFlags
+
+# Characters re.IGNORECASE matches with ASCII letters in str patterns, but not in bytes patterns
+IGNORECASE_NON_ASCII = tuple(char.encode() for char in ('İ', 'ı', 'ſ', 'K'))
+# Escapes, which can't match newline in bytes patterns
+# (\B isn't one of them: it matches empty line of buffer, but never empty line alone)
+LINE_ESCAPES = frozenset('wdbS')
+# Text buffers are checked for unsearchable content window by window, as search goes
+CHECK_WINDOW = 4 * 1024 * 1024
+# Files are substituted in blocks of about this many characters (bytes in binary mode)
+SUBSTITUTE_BLOCK = 1024 * 1024
+# Inline flags can make pattern match newlines (?s) or be parsed differently (?x)
+INLINE_FLAGS = re.compile(r'\(\?[aiLmsux-]')
+# Replacement template escapes, which may produce newline
+NEWLINE_ESCAPE = re.compile(r'\\[0nxuUN]')
+
+
+def _is_bytes_safe(pattern: str) -> bool:
+    """
+    Pattern matches the same lines as bytes pattern on UTF-8 buffer
+    if it is ASCII, uses no unicode-aware escapes or negated classes,
+    can't match newline and its single character wildcards can't
+    stop in the middle of multibyte character.
+    """
+    if not matchers.is_ascii(pattern) or '[^' in pattern or '\n' in pattern or '(?' in pattern.replace('(?:', ''):
+        return False
+    escaped = False
+    for position, char in enumerate(pattern):
+        if escaped:
+            if char.isalnum():
+                return False
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '.' and not pattern.startswith(('*', '+'), position + 1):
+            return False
+    return True
+
+
+def _is_line_local(pattern: AnyStr) -> bool:
+    """
+    Pattern can't match newline, so with re.MULTILINE its matches in buffer
+    of many lines are the same as in every line separately (^ and $ match at line ends,
+    \\A and \\Z are rejected as other unknown escapes).
+    """
+    text = pattern.decode('latin-1') if isinstance(pattern, bytes) else pattern
+    if '[^' in text or '\n' in text or INLINE_FLAGS.search(text):
+        return False
+    escaped = False
+    for char in text:
+        if escaped:
+            if char.isalnum() and char not in LINE_ESCAPES:
+                return False
+            escaped = False
+        elif char == '\\':
+            escaped = True
+    return True
+
+
+def _buffer_pattern(pattern: AnyStr, mode: files.FileMode) -> Optional[bytes]:
+    if mode.binary:
+        return pattern if isinstance(pattern, bytes) and _is_line_local(pattern) else None  # type: ignore
+    return pattern.encode() if isinstance(pattern, str) and _is_bytes_safe(pattern) else None
+
+
+def compile_buffer_regex(
+    processors: List, flags: FrozenSet[SedFlags], mode: files.FileMode = files.TEXT
+) -> Optional[Pattern]:
+    """
+    Compiles processors into single bytes regular expression,
+    which can be run over the whole file buffer.
+    Returns `None` if processors or flags can't be handled that way.
+    Only `re` backend searches buffers, others match line by line.
+    """
+    if SedFlags.PRINT in flags or SedFlags.DELETE in flags or not processors or not backends.is_stdlib():
+        return None
+    if not mode.binary and not _is_utf8(mode.encoding or locale.getpreferredencoding(False)):
+        return None
+    patterns = [
+        _buffer_pattern(pattern, mode)
+        for processor in processors
+        for pattern in getattr(processor, 'patterns', [None])
+    ]
+    if not all(patterns):
+        return None
+
+    regex_flags = re.MULTILINE | (re.IGNORECASE if SedFlags.INSENSITIVE in flags else 0)
+    if len(patterns) == 1:
+        return re.compile(patterns[0], regex_flags)  # type: ignore
+    if not all(matchers.is_fusable(pattern, re.compile(pattern)) for pattern in patterns):  # type: ignore
+        return None
+    try:
+        return re.compile(b'|'.join(b'(?:' + pattern + b')' for pattern in patterns), regex_flags)  # type: ignore
+    except re.error:
+        return None
+
+
+class BufferSubstitution(NamedTuple):
+    """
+    Substitution recompiled with re.MULTILINE to run over many lines at once.
+    """
+
+    regex: Pattern
+    repl: AnyStr
+
+
+def compile_buffer_substitutions(processors: List, flags: FrozenSet[SedFlags]) -> Optional[List[BufferSubstitution]]:
+    """
+    Recompiles substitution processors for blocks of many lines.
+    Returns `None` if lines have to be substituted one by one: substituted lines are printed,
+    pattern can match newline, replacement can contain one (callables are never trusted,
+    they may look at positions in line too) or backend isn't `re`.
+    """
+    if SedFlags.PRINT in flags or not processors or not backends.is_stdlib():
+        return None
+    substitutions = []
+    for processor in processors:
+        if not isinstance(processor, functools.partial):
+            return None
+        regex = processor.func.__self__  # type: ignore
+        repl = processor.keywords['repl']
+        if callable(repl) or not _is_line_local(regex.pattern):
+            return None
+        template = repl.decode('latin-1') if isinstance(repl, bytes) else repl
+        if '\n' in template or NEWLINE_ESCAPE.search(template):
+            return None
+        regex = re.compile(regex.pattern, regex.flags | re.MULTILINE)
+        if 'count' in processor.keywords:
+            regex, repl = _first_in_line(regex, repl)
+        substitutions.append(BufferSubstitution(regex, repl))
+    return substitutions
+
+
+def _first_in_line(regex: Pattern, repl: AnyStr) -> Tuple[Pattern, AnyStr]:
+    """
+    Returns regular expression and template substituting only the first match in every line.
+    Lazy prefix makes match of the whole regex the leftmost match in line, and the rest
+    of line is matched too, so no other match can start in the same line.
+    Template keeps prefix and the rest of line and refers to pattern groups shifted by the prefix.
+    """
+    binary = isinstance(repl, bytes)
+    pattern = regex.pattern.decode('latin-1') if binary else regex.pattern
+    parts = ['\\g<1>']
+    for part in linear.parse_template(repl, regex):
+        if isinstance(part, int):
+            parts.append('\\g<{}>'.format(part + 2))
+        else:
+            parts.append((part.decode('latin-1') if binary else part).replace('\\', '\\\\'))
+    parts.append('\\g<{}>'.format(regex.groups + 3))
+    first_pattern, template = '^(.*?)({})(.*)'.format(pattern), ''.join(parts)
+    if binary:
+        return re.compile(first_pattern.encode('latin-1'), regex.flags), template.encode('latin-1')  # type: ignore
+    return re.compile(first_pattern, regex.flags), template  # type: ignore
+
+
+def substitute_blocks(
+    blocks: Iterable[AnyStr],
+    substitutions: List[BufferSubstitution],
+    fallback: Optional[Callable[[str], str]] = None,
+) -> Iterator[Tuple[AnyStr, AnyStr]]:
+    """
+    Substitutes blocks of whole lines (see `files.read_blocks`) with one call per pattern and block,
+    yields substituted blocks without the last newline along with it (empty if block didn't end with one).
+    Text blocks read without newline translation, which have carriage returns,
+    are substituted by *fallback* line by line, as lines end at them too.
+    """
+    for block in blocks:
+        if fallback is not None and isinstance(block, str) and '\r' in block:
+            yield fallback(block), ''
+            continue
+        newline = b'\n' if isinstance(block, bytes) else '\n'
+        ending = newline if block.endswith(newline) else newline[:0]  # type: ignore
+        # Pattern could match empty string after the last newline, where there is no line
+        text = block[: len(block) - len(ending)]
+        for regex, repl in substitutions:
+            text = regex.sub(repl, text)
+        yield text, ending
+
+
+def _is_utf8(encoding: str) -> bool:
+    return codecs.lookup(encoding).name in ('utf-8', 'ascii')
+
+
+def search_file(
+    path: pathlib.Path,
+    regex: Pattern,
+    start: int = 0,
+    end: Optional[int] = None,
+    mode: files.FileMode = files.TEXT,
+    fallback: Optional[Callable[[int, int], Iterator[AnyStr]]] = None,
+) -> Optional[Iterator[AnyStr]]:
+    """
+    Memory maps file and runs *regex* over the whole buffer
+    (or its part between *start* and *end*, which must be line boundaries),
+    decoding only matched lines (binary mode doesn't decode them at all).
+    Returns `None` if text file content can't be searched that way:
+    lines separated by carriage returns or (for case insensitive regex)
+    characters folded to ASCII letters, or file can't be memory mapped.
+    With *fallback* content is checked only as far as search goes,
+    lines from the first unsearchable window on are searched by `fallback(start, end)`,
+    so search stopped early never reads the rest of file.
+    Files, which can't be memory mapped, are searched by fallback as whole.
+    """
+    buffer = _map_file(path)
+    if buffer is None:
+        return None if fallback is None else fallback(start, end)  # type: ignore
+
+    end = len(buffer) if end is None else end
+    if mode.binary:
+        return _search_buffer(buffer, regex, start, end)
+    encoding = mode.encoding or 'utf-8'
+    errors = mode.errors or 'strict'
+    if fallback is not None:
+        return _search_windows(buffer, regex, start, end, lambda line: line.decode(encoding, errors), fallback)
+    if not _is_searchable(buffer, regex, start, end):
+        buffer.close()
+        return None
+    return (line.decode(encoding, errors) for line in _search_buffer(buffer, regex, start, end))
+
+
+def _map_file(path: pathlib.Path) -> Optional[mmap.mmap]:
+    """
+    Memory maps regular file with content, returns `None` for pipes, devices, empty files
+    and files reporting zero size while having content (e.g. in /proc), which are read line by line.
+    Special files aren't even opened, so pipe is opened once by the line reader.
+    """
+    status = path.stat()
+    if not (stat.S_ISREG(status.st_mode) and status.st_size > 0):
+        return None
+    with path.open('rb') as file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+
+def _is_searchable(buffer: mmap.mmap, regex: Pattern, start: int, end: int) -> bool:
+    if buffer.find(b'\r', start, end) != -1:
+        return False
+    return not (
+        regex.flags & re.IGNORECASE and any(buffer.find(char, start, end) != -1 for char in IGNORECASE_NON_ASCII)
+    )
+
+
+def _search_windows(
+    buffer: mmap.mmap,
+    regex: Pattern,
+    start: int,
+    end: int,
+    decode: Callable[[bytes], str],
+    fallback: Callable[[int, int], Iterator[str]],
+) -> Iterator[str]:
+    """
+    Searches buffer window by window, every window ends at line boundary.
+    """
+    with buffer:
+        window_start = start
+        while window_start < end:
+            window_end = buffer.find(b'\n', min(window_start + CHECK_WINDOW, end) - 1, end) + 1 or end
+            if not _is_searchable(buffer, regex, window_start, window_end):
+                yield from fallback(window_start, end)
+                return
+            for _, line in _buffer_matches(buffer, regex, window_start, window_end):
+                yield decode(line)
+            window_start = window_end
+
+
+def locate_file(
+    path: pathlib.Path,
+    regex: Pattern,
+    mode: files.FileMode,
+    fallback: Callable[[int, int], Iterator[Tuple[int, int, AnyStr]]],
+) -> Iterator[Tuple[int, int, AnyStr]]:
+    """
+    Searches the whole file the same way `search_file` does,
+    yielding (line number, byte offset, line) of matched lines.
+    Lines are counted between matches, so file is still read once.
+    From the first unsearchable window on `fallback(offset, line number)` is used,
+    files, which can't be memory mapped, are searched by fallback as whole.
+    """
+    buffer = _map_file(path)
+    if buffer is None:
+        yield from fallback(0, 1)
+        return
+
+    encoding = mode.encoding or 'utf-8'
+    errors = mode.errors or 'strict'
+    with buffer:
+        number = 1
+        counted = 0
+        window_start = 0
+        end = len(buffer)
+        while window_start < end:
+            window_end = buffer.find(b'\n', min(window_start + CHECK_WINDOW, end) - 1, end) + 1 or end
+            if not mode.binary and not _is_searchable(buffer, regex, window_start, window_end):
+                number += _count_lines(buffer, counted, window_start)
+                yield from fallback(window_start, number)
+                return
+            for line_start, line in _buffer_matches(buffer, regex, window_start, window_end):
+                number += _count_lines(buffer, counted, line_start)
+                counted = line_start
+                yield number, line_start, line if mode.binary else line.decode(encoding, errors)
+            window_start = window_end
+
+
+def _count_lines(buffer: mmap.mmap, start: int, end: int) -> int:
+    """
+    Counts newlines piece by piece, so big gaps between matches aren't copied at once.
+    """
+    count = 0
+    for position in range(start, end, CHECK_WINDOW):
+        count += buffer[position : min(position + CHECK_WINDOW, end)].count(b'\n')
+    return count
+
+
+def _search_buffer(buffer: mmap.mmap, regex: Pattern, start: int, end: int) -> Iterator[bytes]:
+    with buffer:
+        for _, line in _buffer_matches(buffer, regex, start, end):
+            yield line
+
+
+def _buffer_matches(buffer: mmap.mmap, regex: Pattern, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yields start offsets of matched lines along with the lines.
+    """
+    position = start
+    while position <= end:
+        match = regex.search(buffer, position, end)
+        if match is None:
+            return
+        match_start = match.start()
+        if match_start == end and end > start and buffer[end - 1] == ord('\n'):
+            return
+        line_start = buffer.rfind(b'\n', start, match_start) + 1 or start
+        line_end = buffer.find(b'\n', match_start, end)
+        if line_end == -1:
+            line_end = end
+        yield line_start, buffer[line_start:line_end]
+        position = line_end + 1
@@ -0,0 +1,85 @@
+import collections
+import threading
+from typing import Any, Callable, Hashable, NamedTuple
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class MatchCache:
+    """
+    Bounded LRU cache for match results.
+    Least recently used entries are evicted when cache is full,
+    *maxsize* of 0 turns cache off. Unhashable keys are never cached.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 0:
+            raise ValueError('maxsize must be non-negative, got {}'.format(maxsize))
+        self._maxsize = maxsize
+        self._entries = collections.OrderedDict()  # type: collections.OrderedDict
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._maxsize > 0
+
+    def lookup(self, key: Hashable, compute: Callable[..., Any], *args: Any) -> Any:
+        """
+        Returns cached value for *key* or calls *compute* with *args*
+        and remembers its result.
+        """
+        if not self._maxsize:
+            return compute(*args)
+
+        try:
+            with self._lock:
+                value = self._entries[key]
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return value
+        except KeyError:
+            pass
+        except TypeError:
+            return compute(*args)
+
+        value = compute(*args)
+        with self._lock:
+            self._misses += 1
+            self._entries[key] = value
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def resize(self, maxsize: int):
+        """
+        Changes cache size, evicting least recently used entries if needed.
+        """
+        if maxsize < 0:
+            raise ValueError('maxsize must be non-negative, got {}'.format(maxsize))
+        with self._lock:
+            self._maxsize = maxsize
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        """
+        Drops all entries and resets statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self._maxsize, len(self._entries))
@@ -0,0 +1,200 @@
+"""
+Command line interface:
+
+    python -m coreutils.sed [options] EXPRESSION [FILE ...]
+    python -m coreutils.sed [options] -e SCRIPT [-e SCRIPT ...] [FILE ...]
+    python -m coreutils.sed -f /pattern/flags FILE [FILE ...]
+
+EXPRESSION is the same as for `sed_search` (/pattern/flags)
+or `sed_substitute` (s/pattern/substitution/flags).
+With -e or -n sed script is run instead (see `coreutils.sed.script`).
+Lines are read from FILEs or from standard input (also named by `-`).
+With -f FILEs are followed like with `tail -F` and lines appended to them are searched.
+"""
+
+import itertools
+import os
+import pathlib
+import re
+import sys
+from typing import IO, Iterable, Iterator, List, Optional
+
+import coreutils.sed.files as files
+from coreutils.sed import SedException
+
+PROGRAM = 'python -m coreutils.sed'
+# How many output lines are joined into one write
+WRITE_BATCH = 4096
+STDIN = '-'
+
+
+def _parse_args(args: Optional[List[str]]):
+    # argparse isn't imported until command line is parsed, so importing this module stays cheap
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=PROGRAM, description='Searches or substitutes lines with sed expression.')
+    parser.add_argument('expression', nargs='?', help='/pattern/flags or s/pattern/substitution/flags')
+    parser.add_argument('files', nargs='*', metavar='FILE', help='files to process (default: stdin)')
+    parser.add_argument(
+        '-e', '--expression', dest='scripts', action='append', metavar='SCRIPT', help='add script commands'
+    )
+    parser.add_argument('-n', '--quiet', action='store_true', help='print only lines printed by script')
+    parser.add_argument('-i', '--in-place', action='store_true', help='substitute files in place')
+    parser.add_argument('-b', '--binary', action='store_true', help='process bytes without decoding them')
+    parser.add_argument('-m', '--max-count', type=int, help='stop after this many matched lines (search only)')
+    parser.add_argument('-f', '--follow', action='store_true', help='search lines appended to growing files')
+    parser.add_argument('-j', '--workers', type=int, help='process files in this many processes')
+    parser.add_argument('--encoding', help='encoding of files (default: locale encoding)')
+    parser.add_argument('--errors', help='how to handle decoding errors, e.g. strict, replace, surrogateescape')
+    options = parser.parse_args(args)
+    if options.scripts is not None and options.expression is not None:
+        # With -e the first positional argument is a file
+        options.files.insert(0, options.expression)
+        options.expression = None
+    elif options.scripts is None:
+        if options.expression is None:
+            parser.error('expression is required')
+        if options.quiet:
+            options.scripts, options.expression = [options.expression], None
+    options.files = options.files or [STDIN]
+    return options
+
+
+def _stdin_lines(mode: files.FileMode) -> Iterator:
+    if mode.binary:
+        return files.binary_lines(sys.stdin.buffer)
+    if mode.encoding is None and mode.errors is None:
+        return files.lines(sys.stdin)
+    return files.lines(mode.wrap(sys.stdin.buffer))
+
+
+def _inputs(names: List[str], mode: files.FileMode) -> Iterator:
+    for name in names:
+        if name == STDIN:
+            yield from _stdin_lines(mode)
+        else:
+            yield pathlib.Path(name)
+
+
+def _output(mode: files.FileMode) -> IO:
+    if mode.binary:
+        return sys.stdout.buffer
+    if mode.encoding is None and mode.errors is None:
+        return sys.stdout
+    return mode.wrap(sys.stdout.buffer, write_through=True)
+
+
+def write(lines: Iterable, output: IO, newline):
+    """
+    Writes lines in big batches instead of one write per line.
+    """
+    lines = iter(lines)
+    while True:
+        batch = list(itertools.islice(lines, WRITE_BATCH))
+        if not batch:
+            return
+        batch.append(newline[:0])
+        output.write(newline.join(batch))
+
+
+def run_script(options) -> int:
+    if options.workers is not None and options.workers > 1:
+        raise SedException(options.scripts, 'Scripts keep state between lines, they cannot run in workers')
+    # Imported here (as engine below), so only what command line needs is imported
+    from coreutils.sed.script import compile_script
+
+    scripts = [os.fsencode(script) for script in options.scripts] if options.binary else options.scripts
+    script = compile_script(scripts, quiet=options.quiet)
+    mode = files.FileMode(options.binary, options.encoding, options.errors)
+
+    if options.in_place:
+        script.run([pathlib.Path(name) for name in options.files], inplace=True, **_encoding(options))
+        return 0
+    # Single file is passed as is, so script can jump to lines it addresses by numbers
+    if len(options.files) == 1 and options.files[0] != STDIN:
+        processable = pathlib.Path(options.files[0])
+    else:
+        processable = _inputs(options.files, mode)
+    output = _output(mode)
+    write(script.irun(processable, **_encoding(options)), output, mode.newline)
+    output.flush()
+    return 0
+
+
+def _encoding(options) -> dict:
+    return {'encoding': options.encoding, 'errors': options.errors}
+
+
+def run_follow(options) -> int:
+    if options.scripts is not None or options.in_place or options.expression.startswith('s'):
+        raise SedException(options.expression, 'Only search expressions can follow files')
+    if STDIN in options.files:
+        raise SedException(STDIN, 'Standard input cannot be followed, pipe it instead')
+    from coreutils.sed.program import compile as compile_command
+    from coreutils.sed.tail import follow
+
+    command = os.fsencode(options.expression) if options.binary else options.expression
+    program = compile_command(command)
+    mode = files.FileMode(options.binary, options.encoding, options.errors)
+    paths = [pathlib.Path(name) for name in options.files]
+
+    output = _output(mode)
+    # Matches are written as soon as they're found, batching would delay them until more lines come
+    for line in follow(paths, program.pattern, program.flags, max_count=options.max_count, **_encoding(options)):
+        output.write(line + mode.newline)
+        output.flush()
+    return 0
+
+
+def run(options) -> int:
+    from coreutils.sed.program import compile as compile_command
+
+    if options.max_count is not None and (options.scripts is not None or options.expression.startswith('s')):
+        raise SedException(options.max_count, 'Match limit applies to search expressions only, scripts can use q')
+    if options.follow:
+        return run_follow(options)
+    if options.scripts is not None:
+        return run_script(options)
+    command = os.fsencode(options.expression) if options.binary else options.expression
+    if options.in_place:
+        command += b'i' if options.binary else 'i'
+    program = compile_command(command)
+    mode = files.FileMode(options.binary, options.encoding, options.errors)
+
+    kwargs = dict(_encoding(options), workers=options.workers)
+    if options.in_place:
+        program.substitute([pathlib.Path(name) for name in options.files], **kwargs)
+        return 0
+
+    processable = _inputs(options.files, mode)
+    if program.substitution is None:
+        lines = program.isearch(processable, max_count=options.max_count, **kwargs)
+    else:
+        lines = program.isubstitute(processable, **kwargs)
+    output = _output(mode)
+    write(lines, output, mode.newline)
+    output.flush()
+    return 0
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    options = _parse_args(args)
+    try:
+        return run(options)
+    except SedException as e:
+        sys.stderr.write('{}: {}\n'.format(PROGRAM, e.message))
+        return 1
+    except re.error as e:
+        # Substitution templates (e.g. invalid group references) are checked only when they're used
+        sys.stderr.write('{}: Invalid substitution: {}\n'.format(PROGRAM, e))
+        return 1
+    except OSError as e:
+        if isinstance(e, BrokenPipeError):
+            # Reader went away (e.g. `| head`), further flushes would fail again
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        sys.stderr.write('{}: {}\n'.format(PROGRAM, e))
+        return 2
+    except KeyboardInterrupt:
+        # The usual way to stop following files
+        return 130
@@ -0,0 +1,173 @@
+"""
+Transparent reading and writing of gzip, bzip2 and xz compressed files.
+File is treated as compressed when both its suffix (.gz, .bz2, .xz)
+and its magic number say so. Data is decompressed (and compressed)
+in background thread, so it overlaps with matching of lines.
+"""
+
+import importlib
+import io
+import pathlib
+import queue
+import threading
+from typing import BinaryIO, Optional
+
+# suffix: (magic number, module)
+FORMATS = {
+    '.gz': (b'\x1f\x8b', 'gzip'),
+    '.bz2': (b'BZh', 'bz2'),
+    '.xz': (b'\xfd7zXZ\x00', 'lzma'),
+}
+# How many bytes are decompressed at once
+BLOCK_SIZE = 1024 * 1024
+# How many blocks may wait in queue between thread and reader (writer)
+QUEUE_SIZE = 4
+# The same level as gzip command uses, module default is slower one
+GZIP_LEVEL = 6
+
+
+def detect(path: pathlib.Path) -> Optional[str]:
+    """
+    Returns name of module handling compressed file, `None` for plain files.
+    Files without compression suffix aren't even opened.
+    """
+    known = FORMATS.get(path.suffix.lower())
+    if known is None:
+        return None
+    magic, module = known
+    try:
+        with path.open('rb') as file:
+            return module if file.read(len(magic)) == magic else None
+    except OSError:
+        # Opening file for reading will report the error
+        return None
+
+
+class _ThreadedReader(io.RawIOBase):
+    """
+    Reads blocks produced from *source* by background thread.
+    """
+
+    def __init__(self, source: BinaryIO):
+        super().__init__()
+        self._source = source
+        self._blocks: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._block = memoryview(b'')
+        self._finished = False
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _produce(self):
+        try:
+            while not self._stopped.is_set():
+                block = self._source.read(BLOCK_SIZE)
+                self._blocks.put(block)
+                if not block:
+                    return
+        except BaseException as e:  # pylint: disable=broad-except
+            self._blocks.put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        if not self._block:
+            if self._finished:
+                return 0
+            block = self._blocks.get()
+            if isinstance(block, BaseException):
+                self._finished = True
+                raise block
+            if not block:
+                self._finished = True
+                return 0
+            self._block = memoryview(block)
+        size = min(len(buffer), len(self._block))
+        buffer[:size] = self._block[:size]
+        self._block = self._block[size:]
+        return size
+
+    def close(self):
+        if self.closed:
+            return
+        # Reader may stop early: queue is emptied, so thread isn't stuck putting a block
+        self._stopped.set()
+        while self._thread.is_alive():
+            try:
+                self._blocks.get(timeout=0.01)
+            except queue.Empty:
+                pass
+        self._source.close()
+        super().close()
+
+
+class _ThreadedWriter(io.RawIOBase):
+    """
+    Passes written blocks to background thread writing them to *target*.
+    """
+
+    def __init__(self, target: BinaryIO):
+        super().__init__()
+        self._target = target
+        self._blocks: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._consume, daemon=True)
+        self._thread.start()
+
+    def _consume(self):
+        while True:
+            block = self._blocks.get()
+            if block is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self._target.write(block)
+            except BaseException as e:  # pylint: disable=broad-except
+                self._error = e
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore
+        if self._error is not None:
+            raise self._error
+        self._blocks.put(bytes(data))
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self._blocks.put(None)
+        self._thread.join()
+        # Target is closed even after failed write, so its file isn't leaked, the first error is reported
+        try:
+            self._target.close()
+        finally:
+            super().close()
+            if self._error is not None:
+                raise self._error
+
+
+def open_read(path: pathlib.Path, module: str) -> BinaryIO:
+    """
+    Opens compressed file for reading its decompressed content.
+    """
+    source = importlib.import_module(module).open(str(path), 'rb')  # type: ignore
+    return io.BufferedReader(_ThreadedReader(source), BLOCK_SIZE)  # type: ignore
+
+
+def open_write(file: BinaryIO, module: str, path: pathlib.Path) -> BinaryIO:
+    """
+    Wraps binary *file* into writer compressing data the way *path* is compressed.
+    Closing writer finishes compressed stream, but leaves *file* open.
+    """
+    if module == 'gzip':
+        import gzip
+
+        # Header keeps name of original file rather than of temporary one
+        target = gzip.GzipFile(filename=path.name, mode='wb', fileobj=file, compresslevel=GZIP_LEVEL)
+    else:
+        target = importlib.import_module(module).open(file, 'wb')  # type: ignore
+    return io.BufferedWriter(_ThreadedWriter(target), BLOCK_SIZE)  # type: ignore
@@ -0,0 +1,247 @@
+import contextlib
+import io
+import locale
+import os
+import pathlib
+from typing import IO, AnyStr, BinaryIO, Iterable, Iterator, NamedTuple, Optional, TextIO, Tuple
+
+import coreutils.sed.compression as compression
+
+
+class FileMode(NamedTuple):
+    """
+    How files are read and written: as bytes or as text in given encoding
+    (`None` means locale encoding and strict errors).
+    """
+
+    binary: bool = False
+    encoding: Optional[str] = None
+    errors: Optional[str] = None
+
+    @property
+    def newline(self) -> AnyStr:  # type: ignore
+        return b'\n' if self.binary else '\n'
+
+    def open(self, path: pathlib.Path, mode: str = 'r', **kwargs) -> IO:
+        """
+        Compressed files are decompressed while they're read.
+        """
+        if mode == 'r':
+            module = compression.detect(path)
+            if module is not None:
+                return self.wrap(compression.open_read(path, module), **kwargs)
+        if self.binary:
+            return path.open(mode + 'b')
+        return path.open(mode, encoding=self.encoding, errors=self.errors, **kwargs)
+
+    def wrap(self, file: BinaryIO, **kwargs) -> IO:
+        """
+        Wraps binary *file* into text file, unless mode is binary.
+        """
+        if self.binary:
+            return file
+        return io.TextIOWrapper(file, encoding=self.encoding, errors=self.errors, **kwargs)  # type: ignore
+
+    def lines(self, file: IO) -> Iterator[AnyStr]:
+        return binary_lines(file) if self.binary else lines(file)
+
+    def lines_with_endings(self, file: IO) -> Iterator[Tuple[AnyStr, AnyStr]]:
+        return binary_lines_with_endings(file) if self.binary else lines_with_endings(file)
+
+
+TEXT = FileMode()
+
+
+def read_lines(path: pathlib.Path, mode: FileMode = TEXT) -> Iterator[AnyStr]:
+    """
+    Yields lines of file without line terminators.
+    """
+    with mode.open(path) as file:
+        yield from mode.lines(file)
+
+
+class RangeReader(io.RawIOBase):
+    """
+    Reads binary file only up to *end* offset.
+    """
+
+    def __init__(self, file: BinaryIO, end: int):
+        super().__init__()
+        self._file = file
+        self._end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        size = min(len(buffer), self._end - self._file.tell())
+        if size <= 0:
+            return 0
+        data = self._file.read(size)
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def read_range_lines(
+    path: pathlib.Path, start: int, end: Optional[int], mode: FileMode = TEXT
+) -> Iterator[AnyStr]:
+    """
+    Yields lines of file part between *start* and *end* offsets (line boundaries)
+    the same way whole file lines are yielded. File is read to its end if *end* is `None`
+    and isn't seeked from its start, so pipes can be read too.
+    """
+    with path.open('rb') as file:
+        if start:
+            file.seek(start)
+        with mode.wrap(file if end is None else io.BufferedReader(RangeReader(file, end))) as reader:
+            yield from mode.lines(reader)
+
+
+def read_lines_with_offsets(path: pathlib.Path, mode: FileMode = TEXT, start: int = 0) -> Iterator[Tuple[int, AnyStr]]:
+    """
+    Yields lines of file starting at *start* offset (line boundary) along with their byte offsets.
+    Text lines are split the same way text files split them, but decoded one by one,
+    so offsets are right only for encodings, which keep ASCII as is (UTF-8, latin-1 and so on).
+    Offsets in compressed file count bytes of decompressed content.
+    """
+    encoding = mode.encoding or locale.getpreferredencoding(False)
+    errors = mode.errors or 'strict'
+    with FileMode(binary=True).open(path) as file:
+        if start:
+            file.seek(start)
+        offset = start
+        for raw in file:
+            if mode.binary:
+                yield offset, raw[:-1] if raw.endswith(b'\n') else raw
+            else:
+                if raw.endswith(b'\r\n'):
+                    content = raw[:-2]
+                else:
+                    content = raw[:-1] if raw.endswith((b'\n', b'\r')) else raw
+                # Lone carriage returns left inside are line terminators too
+                part_offset = offset
+                for part in content.split(b'\r'):
+                    yield part_offset, part.decode(encoding, errors)
+                    part_offset += len(part) + 1
+            offset += len(raw)
+
+
+def read_blocks(file: IO, size: int) -> Iterator[AnyStr]:
+    """
+    Reads file in blocks of about *size* characters (bytes for binary file),
+    every block but the last one ends at line end, so blocks hold only whole lines.
+    """
+    while True:
+        block = file.read(size)
+        if not block:
+            return
+        if not block.endswith(b'\n' if isinstance(block, bytes) else '\n'):
+            block += file.readline()
+        yield block
+
+
+def lines(file: TextIO) -> Iterator[str]:
+    """
+    Yields lines of text file without line terminators.
+    """
+    for line in file:
+        yield line[:-1] if line.endswith('\n') else line
+
+
+def lines_with_endings(file: TextIO) -> Iterator[Tuple[str, str]]:
+    """
+    Yields lines of text file opened with `newline=''`
+    split into line itself and its original terminator.
+    """
+    for line in file:
+        if line.endswith('\r\n'):
+            yield line[:-2], '\r\n'
+        elif line.endswith(('\n', '\r')):
+            yield line[:-1], line[-1]
+        else:
+            yield line, ''
+
+
+def binary_lines(file: BinaryIO) -> Iterator[bytes]:
+    """
+    Yields lines of binary file without b'\\n' terminators,
+    carriage returns are kept as is.
+    """
+    for line in file:
+        yield line[:-1] if line.endswith(b'\n') else line
+
+
+def binary_lines_with_endings(file: BinaryIO) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    Yields lines of binary file split into line itself and b'\\n' terminator.
+    """
+    for line in file:
+        if line.endswith(b'\n'):
+            yield line[:-1], b'\n'
+        else:
+            yield line, b''
+
+
+def write_lines(lines: Iterable[AnyStr], file: IO, newline: AnyStr = '\n'):  # type: ignore
+    """
+    Writes lines to file, terminating every line with newline.
+    """
+    file.writelines(line + newline for line in lines)
+
+
+@contextlib.contextmanager
+def atomic_rewrite(path: pathlib.Path, mode: str = 'w', **kwargs) -> Iterator[IO]:
+    """
+    Yields temporary file in the same directory as *path*, which replaces
+    *path* only after it is completely written and synced to disk.
+    If anything fails, original file is left untouched.
+    Compressed file is written back compressed the same way.
+    """
+    # Only rewriting files needs these, so they don't slow down start of every search
+    import shutil
+    import tempfile
+
+    path = path.resolve()
+    module = compression.detect(path)
+    # Text is encoded by wrapper, NamedTemporaryFile takes errors only since Python 3.8
+    file = tempfile.NamedTemporaryFile(
+        'wb', dir=str(path.parent), prefix='.{}.'.format(path.name), suffix='.tmp', delete=False
+    )
+    try:
+        with file:
+            if module is None and 'b' in mode:
+                yield file
+            elif module is None:
+                text = io.TextIOWrapper(file.file, **kwargs)
+                yield text
+                text.flush()
+                text.detach()
+            else:
+                target = compression.open_write(file, module, path)
+                with target if 'b' in mode else io.TextIOWrapper(target, **kwargs) as compressed:  # type: ignore
+                    yield compressed
+            file.flush()
+            os.fsync(file.fileno())
+        shutil.copymode(str(path), file.name)
+        os.replace(file.name, str(path))
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(file.name)
+        raise
+    _fsync_directory(path.parent)
+
+
+def _fsync_directory(directory: pathlib.Path):
+    """
+    Makes rename durable, where directories can be synced.
+    """
+    try:
+        descriptor = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
@@ -0,0 +1,293 @@
+"""
+Persistent line index of big files, kept in hidden sidecar file
+next to indexed one (or in given directory):
+
+    index = build_index(path)
+    start, end = index.byte_range(1000000, 1000100)
+
+Once file has an index, search, substitute and scripts use it while it is fresh:
+parallel chunks are cut at indexed line starts and scripts, which print only
+numbered lines, jump straight to them. Index of file, which was only appended to,
+is updated incrementally by scanning the appended part.
+"""
+
+import array
+import bisect
+import contextlib
+import itertools
+import operator
+import os
+import pathlib
+import struct
+import sys
+import zlib
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import coreutils.sed.compression as compression
+import coreutils.sed.files as files
+from coreutils.sed import SedException
+
+SUFFIX = '.lineidx'
+MAGIC = b'SEDLIDX1'
+# magic, offsets typecode, lone carriage returns, file size, mtime, inode, tail checksum, number of lines
+HEADER = struct.Struct('<8s1s?QQQIQ')
+# How many bytes are read at once while scanning file
+BLOCK_SIZE = 1024 * 1024
+# Appended file is recognized by checksum of this many bytes before its old end
+TAIL_SIZE = 4096
+# Offsets of files smaller than this are stored as 32-bit numbers
+COMPACT_SIZE = 2 ** 32
+
+
+class FileState(NamedTuple):
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+def _state(path: pathlib.Path) -> FileState:
+    stat = path.stat()
+    return FileState(stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+
+class LineIndex:
+    """
+    Start offsets of file lines (split by b'\\n'), numbered from 1.
+    Index is valid while file size, modification time and inode stay the same.
+    *carriage_returns* tells, whether file has carriage returns not followed by newline,
+    which split lines of text files too, so text lines can't be numbered by index.
+    """
+
+    def __init__(
+        self, path: pathlib.Path, offsets: array.array, state: FileState, tail_checksum: int, carriage_returns: bool
+    ):
+        self.path = path
+        self.offsets = offsets
+        self.state = state
+        self.tail_checksum = tail_checksum
+        self.carriage_returns = carriage_returns
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __repr__(self) -> str:
+        return '{}({!r}, lines={})'.format(type(self).__name__, str(self.path), len(self))
+
+    @property
+    def size(self) -> int:
+        return self.state.size
+
+    def is_fresh(self) -> bool:
+        try:
+            return _state(self.path) == self.state
+        except FileNotFoundError:
+            return False
+
+    def numbers_text_lines(self, mode: files.FileMode) -> bool:
+        """
+        Lines read in *mode* are the same as indexed lines.
+        """
+        return mode.binary or not self.carriage_returns
+
+    def line_offset(self, number: int) -> int:
+        """
+        Offset of line *number* start, offset of file end for lines after the last one.
+        """
+        if number < 1:
+            raise IndexError('Line numbers start from 1, got {}'.format(number))
+        return self.offsets[number - 1] if number <= len(self.offsets) else self.size
+
+    def byte_range(self, first: int, last: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Offsets of lines from *first* to *last* (the last line of file by default), both included.
+        """
+        end = self.size if last is None else self.line_offset(max(last, first - 1) + 1)
+        return self.line_offset(first), end
+
+    def line_number(self, offset: int) -> int:
+        """
+        Number of line, which *offset* belongs to.
+        """
+        return max(bisect.bisect_right(self.offsets, offset), 1)
+
+    def boundary(self, offset: int) -> int:
+        """
+        The first line start at or after *offset* (file size if there is none).
+        """
+        position = bisect.bisect_left(self.offsets, offset)
+        return self.offsets[position] if position < len(self.offsets) else self.size
+
+    def chunks(self, chunk_size: int) -> List[Tuple[int, int]]:
+        """
+        Splits file into (start, end) parts of about *chunk_size* bytes, every part ends at line boundary.
+        """
+        chunks = []
+        start = 0
+        while start < self.size:
+            end = self.boundary(start + chunk_size)
+            chunks.append((start, end))
+            start = end
+        return chunks
+
+    def lines(self, first: int, last: Optional[int] = None, mode: files.FileMode = files.TEXT) -> Iterator:
+        """
+        Reads lines from *first* to *last* (both included) only.
+        """
+        start, end = self.byte_range(first, last)
+        return files.read_range_lines(self.path, start, end, mode)
+
+
+def index_path(path: pathlib.Path, directory: Optional[pathlib.Path] = None) -> pathlib.Path:
+    path = path.resolve()
+    return (directory or path.parent) / '.{}{}'.format(path.name, SUFFIX)
+
+
+def _tail_checksum(file, size: int) -> int:
+    file.seek(max(size - TAIL_SIZE, 0))
+    return zlib.crc32(file.read(min(size, TAIL_SIZE)))
+
+
+def _scan(file, offsets: array.array, start: int, size: int) -> int:
+    """
+    Appends offsets of lines starting after newlines between *start* and *size*,
+    returns number of carriage returns, which aren't followed by newline.
+    """
+    file.seek(start)
+    position = start
+    carriage_returns = 0
+    previous_carriage_return = False
+    while position < size:
+        block = file.read(min(BLOCK_SIZE, size - position))
+        if not block:
+            break
+        parts = block.split(b'\n')
+        # Every newline starts line: its offset is sum of preceding parts lengths and newlines
+        offsets.extend(map(operator.add, itertools.accumulate(map(len, parts[:-1])), itertools.count(position + 1)))
+        carriage_returns += block.count(b'\r') - block.count(b'\r\n')
+        if previous_carriage_return and block.startswith(b'\n'):
+            carriage_returns -= 1
+        previous_carriage_return = block.endswith(b'\r')
+        position += len(block)
+    return carriage_returns
+
+
+def _typecode(size: int) -> str:
+    return 'I' if size < COMPACT_SIZE else 'Q'
+
+
+def _index(path: pathlib.Path, previous: Optional[LineIndex]) -> LineIndex:
+    """
+    Scans file, continuing *previous* index if file was only appended to.
+    """
+    with path.open('rb') as file:
+        state = _state(path)
+        appended = (
+            previous is not None
+            and previous.state.inode == state.inode
+            and previous.size <= state.size
+            and _tail_checksum(file, previous.size) == previous.tail_checksum
+        )
+        if appended:
+            offsets = array.array(_typecode(state.size), previous.offsets)  # type: ignore
+            carriage_returns = previous.carriage_returns
+            start = previous.size
+        else:
+            offsets = array.array(_typecode(state.size))
+            carriage_returns = False
+            start = 0
+        if start == 0 and state.size:
+            offsets.append(0)
+        # Newline at the end of previous content starts the first appended line
+        carriage_returns = _scan(file, offsets, max(start - 1, 0), state.size) > 0 or carriage_returns
+        if offsets and offsets[-1] == state.size:
+            offsets.pop()
+        tail_checksum = _tail_checksum(file, state.size)
+    return LineIndex(path, offsets, state, tail_checksum, carriage_returns)
+
+
+def _read(path: pathlib.Path, sidecar: pathlib.Path) -> Optional[LineIndex]:
+    try:
+        with sidecar.open('rb') as file:
+            header = file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                return None
+            magic, typecode, carriage_returns, size, mtime_ns, inode, tail_checksum, count = HEADER.unpack(header)
+            if magic != MAGIC:
+                return None
+            offsets = array.array(typecode.decode())
+            offsets.fromfile(file, count)
+    except (OSError, EOFError, ValueError, struct.error):
+        return None
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return LineIndex(path, offsets, FileState(size, mtime_ns, inode), tail_checksum, carriage_returns)
+
+
+def _write(index: LineIndex, sidecar: pathlib.Path):
+    """
+    Replaces sidecar atomically, so concurrent readers never see partial index.
+    """
+    offsets = index.offsets
+    if sys.byteorder == 'big':
+        offsets = array.array(offsets.typecode, offsets)
+        offsets.byteswap()
+    temporary = sidecar.with_name('{}.{}.tmp'.format(sidecar.name, os.getpid()))
+    try:
+        with temporary.open('wb') as file:
+            file.write(
+                HEADER.pack(
+                    MAGIC,
+                    offsets.typecode.encode(),
+                    index.carriage_returns,
+                    index.state.size,
+                    index.state.mtime_ns,
+                    index.state.inode,
+                    index.tail_checksum,
+                    len(offsets),
+                )
+            )
+            offsets.tofile(file)
+        os.replace(str(temporary), str(sidecar))
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            temporary.unlink()
+
+
+def build_index(path: pathlib.Path, directory: Optional[pathlib.Path] = None) -> LineIndex:
+    """
+    Returns fresh line index of file, saving it to sidecar file.
+    Existing index is reused as is if file didn't change,
+    updated incrementally if file was only appended to and rebuilt otherwise.
+    Compressed files can't be indexed, their lines can't be read from the middle.
+    """
+    if compression.detect(path) is not None:
+        raise SedException(path, 'Compressed files cannot be indexed')
+    sidecar = index_path(path, directory)
+    previous = _read(path, sidecar)
+    if previous is not None and previous.is_fresh():
+        return previous
+    index = _index(path, previous)
+    _write(index, sidecar)
+    return index
+
+
+def load_index(
+    path: pathlib.Path, directory: Optional[pathlib.Path] = None, update: bool = False
+) -> Optional[LineIndex]:
+    """
+    Returns fresh index of file, if it has one.
+    Stale index is brought up to date with *update*, otherwise `None` is returned for it.
+    Files without index never get one here, use `build_index` for them.
+    """
+    sidecar = index_path(path, directory)
+    if not sidecar.exists() or compression.detect(path) is not None:
+        return None
+    index = _read(path, sidecar)
+    if index is not None and index.is_fresh():
+        return index
+    if not update:
+        return None
+    try:
+        return build_index(path, directory)
+    except OSError:
+        return None
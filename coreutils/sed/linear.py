@@ -0,0 +1,687 @@
+"""
+Linear time regular expression engine for patterns, which can't be trusted.
+
+Patterns are parsed by the parser `re` itself uses and compiled into program
+of Thompson automaton. Whether line matches is found by lazily built DFA,
+match spans and groups (for substitutions) by Pike VM running all threads
+in lockstep. Either way time spent on line grows linearly with its length,
+whatever the pattern is, but ordinary patterns are matched several times slower than by `re`.
+
+Backreferences, lookaround assertions, conditional groups, atomic groups
+and possessive repeats can't be matched in linear time, patterns using them are rejected.
+"""
+
+import functools
+import re
+import string as strings
+from typing import Any, AnyStr, Callable, Dict, FrozenSet, List, Optional, Set, Tuple, Union
+
+from coreutils.sed import SedException
+
+try:
+    import re._constants as constants  # type: ignore
+    import re._parser as parser  # type: ignore
+except ImportError:  # Python before 3.11
+    import sre_constants as constants  # type: ignore
+    import sre_parse as parser  # type: ignore
+
+# Repeats are unrolled, so program can't be longer than this many instructions
+MAX_INSTRUCTIONS = 100000
+# DFA cache is dropped and built anew, when it has more states than this
+MAX_DFA_STATES = 10000
+# How many characters per character class are remembered in str patterns
+MAX_CACHED_CHARS = 65536
+COMPILE_CACHE_SIZE = 256
+
+_CHAR, _SPLIT, _JMP, _SAVE, _ASSERT, _MATCH = range(6)
+_START, _LINE_START, _END, _LINE_END, _STRING_END, _BOUNDARY, _NON_BOUNDARY = range(7)
+
+# Assertions, which depend on preceding character
+_LOOKBEHIND = frozenset((_START, _LINE_START, _BOUNDARY, _NON_BOUNDARY))
+_ATOM_FLAGS = re.IGNORECASE | re.DOTALL | re.ASCII | re.LOCALE
+_CATEGORIES = {
+    constants.CATEGORY_DIGIT: '\\d',
+    constants.CATEGORY_NOT_DIGIT: '\\D',
+    constants.CATEGORY_SPACE: '\\s',
+    constants.CATEGORY_NOT_SPACE: '\\S',
+    constants.CATEGORY_WORD: '\\w',
+    constants.CATEGORY_NOT_WORD: '\\W',
+}
+_UNSUPPORTED = {
+    constants.GROUPREF: 'backreferences',
+    constants.GROUPREF_EXISTS: 'conditional groups',
+    constants.ASSERT: 'lookaround assertions',
+    constants.ASSERT_NOT: 'lookaround assertions',
+}
+for _name, _description in (('ATOMIC_GROUP', 'atomic groups'), ('POSSESSIVE_REPEAT', 'possessive repeats')):
+    if hasattr(constants, _name):
+        _UNSUPPORTED[getattr(constants, _name)] = _description
+
+_TEMPLATE_ESCAPES = {'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v', '\\': '\\'}
+
+
+class _Compiler:
+    """
+    Compiles parsed pattern into program, which instructions are [opcode, x, y] lists.
+    Characters are tested by predicates built from single character regular
+    expressions, so character classes, case folding and categories mean exactly what they mean in `re`.
+    """
+
+    def __init__(self, pattern: AnyStr):
+        self.pattern = pattern
+        self.binary = isinstance(pattern, bytes)
+        self.program: List[list] = []
+        self.predicates: List[Callable[[Any], bool]] = []
+        self.words: List[Callable[[Any], bool]] = []
+        self.assertions: Set[int] = set()
+        # Characters of predicates, which test equality to single character
+        self.literals: Dict[int, Any] = {}
+        self._predicate_ids: Dict[Tuple[str, int], int] = {}
+
+    def _emit(self, opcode: int, x: Any = None, y: Any = None) -> int:
+        if len(self.program) >= MAX_INSTRUCTIONS:
+            raise SedException(self.pattern, 'Pattern repeats too much to be matched in linear time')
+        self.program.append([opcode, x, y])
+        return len(self.program) - 1
+
+    def _char(self, code: int) -> str:
+        return '\\x{:02x}'.format(code) if self.binary else '\\U{:08x}'.format(code)
+
+    def _class(self, items: list) -> str:
+        negate = ''
+        parts = []
+        for op, av in items:
+            if op is constants.NEGATE:
+                negate = '^'
+            elif op is constants.LITERAL:
+                parts.append(self._char(av))
+            elif op is constants.RANGE:
+                parts.append('{}-{}'.format(self._char(av[0]), self._char(av[1])))
+            elif op is constants.CATEGORY and av in _CATEGORIES:
+                parts.append(_CATEGORIES[av])
+            else:
+                raise SedException(self.pattern, 'Character class item {} is not supported'.format(op))
+        return '[{}{}]'.format(negate, ''.join(parts))
+
+    def _test(self, source: str, flags: int) -> Callable[[Any], bool]:
+        """
+        Bytes are tested with table of all 256 answers, characters are tested once and remembered.
+        """
+        regex = re.compile(source.encode('ascii') if self.binary else source, flags)
+        if self.binary:
+            return [regex.fullmatch(bytes((code,))) is not None for code in range(256)].__getitem__
+        cache: Dict[str, bool] = {}
+
+        def _test(char: str) -> bool:
+            result = cache.get(char)
+            if result is None:
+                result = regex.fullmatch(char) is not None
+                if len(cache) < MAX_CACHED_CHARS:
+                    cache[char] = result
+            return result
+
+        return _test
+
+    def _predicate(self, op, av, flags: int) -> int:
+        if op is constants.LITERAL:
+            source = self._char(av)
+        elif op is constants.NOT_LITERAL:
+            source = '[^{}]'.format(self._char(av))
+        elif op is constants.ANY:
+            source = '.'
+        else:
+            source = self._class(av)
+        flags &= _ATOM_FLAGS
+        key = (source, flags)
+        if key not in self._predicate_ids:
+            if op is constants.LITERAL and not flags & re.IGNORECASE:
+                literal = av if self.binary else chr(av)
+                self.literals[len(self.predicates)] = literal
+                test = literal.__eq__
+            else:
+                test = self._test(source, flags)
+            self._predicate_ids[key] = len(self.predicates)
+            self.predicates.append(test)
+        return self._predicate_ids[key]
+
+    def _word(self, flags: int) -> int:
+        test = self._test('\\w', flags & (re.ASCII | re.LOCALE))
+        self.words.append(test)
+        return len(self.words) - 1
+
+    def compile(self, nodes, flags: int) -> None:
+        for op, av in nodes:
+            self._node(op, av, flags)
+
+    def _node(self, op, av, flags: int) -> None:
+        if op in _UNSUPPORTED:
+            raise SedException(self.pattern, 'Linear engine does not support {}'.format(_UNSUPPORTED[op]))
+        if op in (constants.LITERAL, constants.NOT_LITERAL, constants.ANY, constants.IN):
+            self._emit(_CHAR, self._predicate(op, av, flags))
+        elif op is constants.BRANCH:
+            self._branch(av[1], flags)
+        elif op is constants.SUBPATTERN:
+            group, add_flags, del_flags, nodes = av
+            if group is not None:
+                self._emit(_SAVE, 2 * group)
+            self.compile(nodes, (flags | add_flags) & ~del_flags)
+            if group is not None:
+                self._emit(_SAVE, 2 * group + 1)
+        elif op in (constants.MAX_REPEAT, constants.MIN_REPEAT):
+            self._repeat(av, flags, greedy=op is constants.MAX_REPEAT)
+        elif op is constants.AT:
+            self._assertion(av, flags)
+        else:
+            raise SedException(self.pattern, 'Linear engine does not support {}'.format(op))
+
+    def _branch(self, alternatives: list, flags: int) -> None:
+        jumps = []
+        for alternative in alternatives[:-1]:
+            split = self._emit(_SPLIT, len(self.program) + 1)
+            self.compile(alternative, flags)
+            jumps.append(self._emit(_JMP))
+            self.program[split][2] = len(self.program)
+        self.compile(alternatives[-1], flags)
+        for jump in jumps:
+            self.program[jump][1] = len(self.program)
+
+    def _split(self, split: int, body: int, exit: int, greedy: bool) -> None:  # pylint: disable=redefined-builtin
+        self.program[split][1:] = [body, exit] if greedy else [exit, body]
+
+    def _repeat(self, av, flags: int, greedy: bool) -> None:
+        minimum, maximum, nodes = av
+        for _ in range(minimum):
+            self.compile(nodes, flags)
+        if maximum == constants.MAXREPEAT:
+            split = self._emit(_SPLIT)
+            self.compile(nodes, flags)
+            self._emit(_JMP, split)
+            self._split(split, split + 1, len(self.program), greedy)
+            return
+        splits = []
+        for _ in range(maximum - minimum):
+            splits.append(self._emit(_SPLIT))
+            self.compile(nodes, flags)
+        for split in splits:
+            self._split(split, split + 1, len(self.program), greedy)
+
+    def _assertion(self, at, flags: int) -> None:
+        multiline = flags & re.MULTILINE
+        if at is constants.AT_BEGINNING:
+            kind, word = (_LINE_START if multiline else _START), None
+        elif at is constants.AT_BEGINNING_STRING:
+            kind, word = _START, None
+        elif at is constants.AT_END:
+            kind, word = (_LINE_END if multiline else _END), None
+        elif at is constants.AT_END_STRING:
+            kind, word = _STRING_END, None
+        elif at is constants.AT_BOUNDARY:
+            kind, word = _BOUNDARY, self._word(flags)
+        elif at is constants.AT_NON_BOUNDARY:
+            kind, word = _NON_BOUNDARY, self._word(flags)
+        else:
+            raise SedException(self.pattern, 'Linear engine does not support {}'.format(at))
+        self.assertions.add(kind)
+        self._emit(_ASSERT, kind, word)
+
+
+def _holds(kind: int, word: Optional[int], previous: Optional[tuple], current: Optional[tuple], is_last: bool) -> bool:
+    """
+    Checks assertion between *previous* and *current* characters,
+    which are described by kinds (`None` at string edges).
+    """
+    if kind == _START:
+        return previous is None
+    if kind == _LINE_START:
+        return previous is None or previous[-1]
+    if kind == _END:
+        return current is None or (is_last and current[-1])
+    if kind == _LINE_END:
+        return current is None or current[-1]
+    if kind == _STRING_END:
+        return current is None
+    if previous is None and current is None:
+        # Neither \b nor \B matches empty string
+        return False
+    boundary = (previous is not None and previous[word]) != (current is not None and current[word])
+    return boundary if kind == _BOUNDARY else not boundary
+
+
+class LinearMatch:
+    """
+    Match found by `LinearPattern`, a subset of `re.Match` interface.
+    """
+
+    def __init__(self, pattern: 'LinearPattern', string: AnyStr, slots: tuple):
+        self.re = pattern
+        self.string = string
+        self._slots = slots
+
+    def _index(self, group: Union[int, str]) -> int:
+        index = self.re.groupindex.get(group, group) if isinstance(group, str) else group
+        if not isinstance(index, int) or not 0 <= index <= self.re.groups:
+            raise IndexError('no such group')
+        return index
+
+    def span(self, group: Union[int, str] = 0) -> Tuple[int, int]:
+        index = self._index(group)
+        start, end = self._slots[2 * index], self._slots[2 * index + 1]
+        return (-1, -1) if start is None or end is None else (start, end)
+
+    def start(self, group: Union[int, str] = 0) -> int:
+        return self.span(group)[0]
+
+    def end(self, group: Union[int, str] = 0) -> int:
+        return self.span(group)[1]
+
+    def _group(self, group: Union[int, str], default: Any = None) -> Any:
+        start, end = self.span(group)
+        return default if start == -1 else self.string[start:end]
+
+    def group(self, *groups: Union[int, str]) -> Any:
+        if len(groups) > 1:
+            return tuple(map(self._group, groups))
+        return self._group(groups[0] if groups else 0)
+
+    def __getitem__(self, group: Union[int, str]) -> Any:
+        return self._group(group)
+
+    def groups(self, default: Any = None) -> tuple:
+        return tuple(self._group(index, default) for index in range(1, self.re.groups + 1))
+
+    def groupdict(self, default: Any = None) -> Dict[str, Any]:
+        return {name: self._group(index, default) for name, index in self.re.groupindex.items()}
+
+    def expand(self, template: AnyStr) -> AnyStr:
+        return _expand(parse_template(template, self.re), self)
+
+    def __repr__(self) -> str:
+        return '<LinearMatch object; span={!r}, match={!r}>'.format(self.span(), self.group())
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def parse_template(template: AnyStr, pattern: 'LinearPattern') -> Tuple[Union[AnyStr, int], ...]:
+    """
+    Splits substitution template into literal parts and group numbers
+    the way `re` does: \\g<name>, \\g<number>, \\number, octal and character escapes.
+    Pattern may be `re` pattern as well, only its groups and group names are used.
+    """
+    binary = isinstance(template, bytes)
+    text = template.decode('latin-1') if binary else template
+    parts: List[Union[str, int]] = []
+    literal: List[str] = []
+    position = 0
+    while position < len(text):
+        char = text[position]
+        position += 1
+        if char != '\\' or position == len(text):
+            if char == '\\':
+                raise re.error('bad escape (end of pattern)', template, position - 1)
+            literal.append(char)
+            continue
+        char = text[position]
+        position += 1
+        group = None
+        if char == 'g':
+            end = text.find('>', position)
+            if not text.startswith('<', position) or end == -1:
+                raise re.error('missing group name', template, position)
+            name = text[position + 1 : end]
+            position = end + 1
+            group = int(name) if name.isdigit() else pattern.groupindex.get(name)
+            if group is None:
+                raise IndexError('unknown group name {!r}'.format(name))
+        elif char == '0' or (char in '1234567' and text[position : position + 2].isdigit() and
+                             all(digit in '01234567' for digit in text[position : position + 2])):
+            digits = char
+            while len(digits) < 3 and position < len(text) and text[position] in '01234567':
+                digits += text[position]
+                position += 1
+            literal.append(chr(int(digits, 8)))
+        elif char.isdigit():
+            digits = char
+            if position < len(text) and text[position].isdigit():
+                digits += text[position]
+                position += 1
+            group = int(digits)
+        elif char in _TEMPLATE_ESCAPES:
+            literal.append(_TEMPLATE_ESCAPES[char])
+        elif char in strings.ascii_letters:
+            raise re.error('bad escape \\{}'.format(char), template, position - 2)
+        else:
+            literal.append('\\' + char)
+        if group is not None:
+            if group > pattern.groups:
+                raise re.error('invalid group reference {}'.format(group), template, position)
+            if literal:
+                parts.append(''.join(literal))
+                literal = []
+            parts.append(group)
+    if literal:
+        parts.append(''.join(literal))
+    if binary:
+        return tuple(part.encode('latin-1') if isinstance(part, str) else part for part in parts)
+    return tuple(parts)
+
+
+def _expand(parts: tuple, match: LinearMatch) -> AnyStr:
+    empty = match.string[:0]
+    return empty.join(part if not isinstance(part, int) else (match[part] or empty) for part in parts)
+
+
+class LinearPattern:
+    """
+    Compiled pattern with the part of `re.Pattern` interface sed uses: search and subn.
+    """
+
+    def __init__(self, pattern: AnyStr, flags: int = 0):
+        self.pattern = pattern
+        parsed = parser.parse(pattern, flags)
+        state = getattr(parsed, 'state', None) or parsed.pattern
+        self.flags = state.flags
+        # Group 0 isn't counted, as in `re`
+        self.groups = state.groups - 1
+        self.groupindex = dict(state.groupdict)
+
+        compiler = _Compiler(pattern)
+        compiler._emit(_SAVE, 0)  # pylint: disable=protected-access
+        compiler.compile(parsed, self.flags)
+        compiler._emit(_SAVE, 1)  # pylint: disable=protected-access
+        compiler._emit(_MATCH)  # pylint: disable=protected-access
+        self._program = [tuple(instruction) for instruction in compiler.program]
+        self._predicates = compiler.predicates
+        self._words = compiler.words
+        self._assertions = bool(compiler.assertions)
+        self._lookbehind = bool(compiler.assertions & _LOOKBEHIND)
+        self._first = self._first_predicates()
+        self._first_literals = None
+        if self._first is not None and all(predicate in compiler.literals for predicate in self._first):
+            self._first_literals = {compiler.literals[predicate] for predicate in self._first}
+        self._newline = 10 if compiler.binary else '\n'
+        self._kinds: Dict[Any, tuple] = {}
+
+        # DFA states are (pending instructions, kind of preceding character) pairs numbered in order of appearance
+        self._state_ids: Dict[Tuple[FrozenSet[int], Any], int] = {}
+        self._states: List[Tuple[FrozenSet[int], Any]] = []
+        self._transitions: List[Dict[Any, int]] = []
+        self._finals: List[Optional[bool]] = []
+        self._initial = self._state((frozenset(), None if self._lookbehind else 0))
+
+    def __reduce__(self):
+        return compile, (self.pattern, self.flags)
+
+    def __repr__(self) -> str:
+        return 'linear.compile({!r})'.format(self.pattern)
+
+    def _kind(self, char: Any) -> tuple:
+        """
+        Describes character for assertions: whether it is word character for every \\b flavour and newline.
+        """
+        kind = self._kinds.get(char)
+        if kind is None:
+            kind = tuple(word(char) for word in self._words) + (char == self._newline,)
+            if len(self._kinds) < MAX_CACHED_CHARS:
+                self._kinds[char] = kind
+        return kind
+
+    def _state(self, key: Tuple[FrozenSet[int], Any]) -> int:
+        state = self._state_ids.get(key)
+        if state is None:
+            state = self._state_ids[key] = len(self._states)
+            self._states.append(key)
+            self._transitions.append({})
+            self._finals.append(None)
+        return state
+
+    def _closure(self, pcs, previous, current, is_last) -> Tuple[List[int], bool]:
+        """
+        Follows instructions, which don't consume characters, from *pcs*.
+        Returns character instructions reached and whether match is reached.
+        """
+        program = self._program
+        stack = list(pcs)
+        seen = set()
+        chars = []
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            opcode, x, y = program[pc]
+            if opcode == _CHAR:
+                chars.append(pc)
+            elif opcode == _MATCH:
+                return chars, True
+            elif opcode == _SPLIT:
+                stack.append(y)
+                stack.append(x)
+            elif opcode == _JMP:
+                stack.append(x)
+            elif opcode == _SAVE or _holds(x, y, previous, current, is_last):
+                stack.append(pc + 1)
+        return chars, False
+
+    def _step(self, state: int, char: Any, is_last: bool) -> int:
+        """
+        Returns state after *char*, -1 if match is found before it.
+        Transitions of the last character aren't cached, they may differ because of `$`.
+        """
+        origin = self._states[state]
+        pending, previous = origin
+        current = self._kind(char)
+        chars, matched = self._closure(pending | {0}, previous, current, is_last)
+        if matched:
+            following = -1
+        else:
+            predicates = self._predicates
+            program = self._program
+            pending = frozenset(pc + 1 for pc in chars if predicates[program[pc][1]](char))
+            if len(self._states) >= MAX_DFA_STATES:
+                self._reset()
+                state = self._state(origin)
+            following = self._state((pending, current if self._lookbehind else 0))
+        if not is_last:
+            self._transitions[state][char] = following
+        return following
+
+    def _reset(self):
+        # Lists are cleared in place, so references held by running scan stay valid
+        self._state_ids.clear()
+        del self._states[:]
+        del self._transitions[:]
+        del self._finals[:]
+        self._initial = self._state((frozenset(), None if self._lookbehind else 0))
+
+    def _final(self, state: int) -> bool:
+        final = self._finals[state]
+        if final is None:
+            pending, previous = self._states[state]
+            final = self._finals[state] = self._closure(pending | {0}, previous, None, False)[1]
+        return final
+
+    def is_matched(self, string: AnyStr) -> bool:
+        """
+        Tells whether pattern matches anywhere in *string* without finding where.
+        """
+        transitions = self._transitions
+        state = self._initial
+        last = len(string) - 1
+        for char in string[:last] if last > 0 else ():
+            following = transitions[state].get(char)
+            if following is None:
+                following = self._step(state, char, False)
+            if following == -1:
+                return True
+            state = following
+        if last >= 0:
+            state = self._step(state, string[last], True)
+            if state == -1:
+                return True
+        return self._final(state)
+
+    def _add(self, threads: list, pc: int, slots: tuple, position: int, context: tuple, seen: set) -> None:
+        """
+        Adds thread and threads it splits into, in priority order, to *threads*.
+        """
+        program = self._program
+        stack = [(pc, slots)]
+        while stack:
+            pc, slots = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            opcode, x, y = program[pc]
+            if opcode == _SPLIT:
+                stack.append((y, slots))
+                stack.append((x, slots))
+            elif opcode == _JMP:
+                stack.append((x, slots))
+            elif opcode == _SAVE:
+                stack.append((pc + 1, slots[:x] + (position,) + slots[x + 1 :]))
+            elif opcode == _ASSERT:
+                if _holds(x, y, *context):
+                    stack.append((pc + 1, slots))
+            else:
+                threads.append((pc, slots))
+
+    def _context(self, string: AnyStr, position: int) -> Optional[tuple]:
+        if not self._assertions:
+            return None
+        length = len(string)
+        previous = self._kind(string[position - 1]) if position > 0 else None
+        current = self._kind(string[position]) if position < length else None
+        return previous, current, position == length - 1
+
+    def _first_predicates(self) -> Optional[List[int]]:
+        """
+        Returns predicates of characters, with which every match starts,
+        `None` if matches can be empty or start depends on assertions.
+        """
+        chars = []
+        stack = [0]
+        seen = set()
+        while stack:
+            pc = stack.pop()
+            if pc in seen:
+                continue
+            seen.add(pc)
+            opcode, x, y = self._program[pc]
+            if opcode == _CHAR:
+                chars.append(x)
+            elif opcode in (_MATCH, _ASSERT):
+                return None
+            elif opcode == _SPLIT:
+                stack.extend((y, x))
+            else:
+                stack.append(x if opcode == _JMP else pc + 1)
+        return sorted(set(chars))
+
+    def _skip(self, string: AnyStr, position: int) -> int:
+        """
+        Returns position of the next character, with which match can start, length of string if there is none.
+        """
+        length = len(string)
+        if self._first_literals is not None:
+            found = [string.find(literal, position) for literal in self._first_literals]  # type: ignore
+            return min((index for index in found if index != -1), default=length)
+        predicates = [self._predicates[predicate] for predicate in self._first]  # type: ignore
+        for index in range(position, length):
+            char = string[index]
+            for predicate in predicates:
+                if predicate(char):
+                    return index
+        return length
+
+    def _match(self, string: AnyStr, position: int, must_advance: bool = False) -> Optional[tuple]:
+        """
+        Returns group slots of the leftmost match starting at *position* or later, preferred the way `re` prefers.
+        After empty match, the next one mustn't be empty at the same position.
+        """
+        program = self._program
+        predicates = self._predicates
+        skips = self._first is not None
+        length = len(string)
+        empty = (None,) * (2 * self.groups + 2)
+        threads: list = []
+        matched = None
+        index = position
+        while True:
+            if not threads and matched is None:
+                if skips:
+                    # No thread is alive, so nothing can match before the next possible first character
+                    index = self._skip(string, index)
+                    if index == length:
+                        return None
+                self._add(threads, 0, empty, index, self._context(string, index), set())
+            char = string[index] if index < length else None
+            following: list = []
+            seen: set = set()
+            context = self._context(string, index + 1) if index < length else None
+            for pc, slots in threads:
+                opcode, x, _ = program[pc]
+                if opcode == _MATCH:
+                    if must_advance and index == position:
+                        continue
+                    # Threads of lower priority are cut off
+                    matched = slots
+                    break
+                if char is not None and predicates[x](char):
+                    self._add(following, pc + 1, slots, index + 1, context, seen)
+            if index == length or (matched is not None and not following):
+                return matched
+            index += 1
+            if matched is None and (following or not skips):
+                self._add(following, 0, empty, index, context, seen)
+            threads = following
+
+    def search(self, string: AnyStr, pos: int = 0) -> Optional[LinearMatch]:
+        if pos == 0 and not self.is_matched(string):
+            return None
+        slots = self._match(string, pos)
+        return None if slots is None else LinearMatch(self, string, slots)
+
+    def subn(self, repl: Union[AnyStr, Callable[[LinearMatch], AnyStr]], string: AnyStr, count: int = 0):
+        if not self.is_matched(string):
+            return string, 0
+        if callable(repl):
+            expand = repl
+        else:
+            parts = parse_template(repl, self)
+            expand = functools.partial(_expand, parts)
+        pieces = []
+        replaced = 0
+        position = 0
+        last = 0
+        must_advance = False
+        while position <= len(string) and (not count or replaced < count):
+            slots = self._match(string, position, must_advance)
+            if slots is None:
+                break
+            start, end = slots[0], slots[1]
+            pieces.append(string[last:start])
+            pieces.append(expand(LinearMatch(self, string, slots)))
+            replaced += 1
+            last = position = end
+            must_advance = start == end
+        pieces.append(string[last:])
+        return string[:0].join(pieces), replaced
+
+    def sub(self, repl: Union[AnyStr, Callable[[LinearMatch], AnyStr]], string: AnyStr, count: int = 0) -> AnyStr:
+        return self.subn(repl, string, count)[0]
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile(pattern: AnyStr, flags: int = 0) -> LinearPattern:  # noqa: A001  # pylint: disable=redefined-builtin
+    """
+    Compiles pattern for linear time matching, invalid patterns raise `re.error`
+    the same way `re.compile` does, patterns linear engine can't match raise `SedException`.
+    """
+    return LinearPattern(pattern, flags)
+
+
+def is_supported(pattern: AnyStr, flags: int = 0) -> bool:
+    try:
+        compile(pattern, flags)
+    except SedException:
+        return False
+    return True
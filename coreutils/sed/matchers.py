@@ -0,0 +1,406 @@
+import collections
+import functools
+import re
+from typing import (
+    Any, AnyStr, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Pattern, Sequence, Tuple, Union
+)
+
+import coreutils.sed.backends as backends
+from coreutils.sed.utils import SedFlags
+
+REGEX_SPECIAL_CHARS = frozenset('.^$*+?{}[]\\|()')
+GLOBAL_INLINE_FLAGS = re.compile(r'\(\?[aiLmsux]+\)')
+AHO_CORASICK_MIN_PATTERNS = 32
+
+# Characters matched by ASCII letters under re.IGNORECASE, which str.lower() doesn't map to them
+IGNORECASE_FOLDS = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's'})
+IGNORECASE_FOLD_CHARS = tuple(map(chr, IGNORECASE_FOLDS))
+
+
+def regex_flags(flags: FrozenSet[SedFlags]) -> int:
+    return re.IGNORECASE if SedFlags.INSENSITIVE in flags else 0
+
+
+def fold_case(line: str) -> str:
+    """
+    Lowers line the same way re.IGNORECASE compares it against ASCII letters.
+    """
+    # translate() is much slower than lower(), so it's done only if line has characters to translate
+    for char in IGNORECASE_FOLD_CHARS:
+        if char in line:
+            return line.translate(IGNORECASE_FOLDS).lower()
+    return line.lower()
+
+
+def _fold_function(patterns: Sequence[AnyStr]) -> Callable[[AnyStr], AnyStr]:
+    """
+    re.IGNORECASE folds only ASCII letters in bytes patterns, so does bytes.lower().
+    """
+    return bytes.lower if patterns and isinstance(patterns[0], bytes) else fold_case  # type: ignore
+
+
+def pattern_text(pattern: AnyStr) -> str:
+    """
+    Bytes patterns are analyzed as latin-1 text, which maps every byte to one character.
+    """
+    return pattern.decode('latin-1') if isinstance(pattern, bytes) else pattern  # type: ignore
+
+
+def pattern_like(text: Optional[str], pattern: AnyStr) -> Optional[AnyStr]:
+    """
+    Converts *text* found by analyzing *pattern* back to pattern's type.
+    """
+    if text is None or isinstance(pattern, str):
+        return text  # type: ignore
+    return text.encode('latin-1')  # type: ignore
+
+
+def _alternation(patterns: Sequence[AnyStr]) -> AnyStr:
+    if isinstance(patterns[0], bytes):
+        return b'|'.join(b'(?:' + pattern + b')' for pattern in patterns)  # type: ignore
+    return '|'.join('(?:{})'.format(pattern) for pattern in patterns)  # type: ignore
+
+
+QUANTIFIER = re.compile(r'\{(?P<min>\d*)(?:,\d*)?\}')
+ESCAPE_SEQUENCE = re.compile(r'x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]*\}|\d{1,3}')
+MIN_PREFILTER_LENGTH = 2
+
+
+def literal_text(pattern: AnyStr) -> Optional[AnyStr]:
+    """
+    Returns text matched by pattern if pattern is a plain literal
+    (escaped punctuation is allowed), otherwise `None`.
+    """
+    return pattern_like(_literal_text(pattern_text(pattern)), pattern)
+
+
+def _literal_text(pattern: str) -> Optional[str]:
+    chars = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            if char.isalnum():
+                return None
+            chars.append(char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in REGEX_SPECIAL_CHARS:
+            return None
+        else:
+            chars.append(char)
+    return None if escaped else ''.join(chars)
+
+
+def required_literal(pattern: AnyStr) -> Optional[AnyStr]:
+    """
+    Conservatively finds the longest literal every match of pattern must contain.
+    Only top level of pattern is analyzed: groups, classes, escapes and
+    optional atoms split literal runs, top level alternation gives up.
+    """
+    return pattern_like(_required_literal(pattern_text(pattern)), pattern)
+
+
+def _required_literal(pattern: str) -> Optional[str]:
+    if GLOBAL_INLINE_FLAGS.search(pattern):
+        return None
+
+    runs: List[str] = []
+    run: List[str] = []
+    depth = 0
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        position += 1
+        if depth:
+            if char == '\\':
+                position += 1
+            elif char == '[':
+                position = _skip_class(pattern, position)
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            continue
+
+        quantifier = QUANTIFIER.match(pattern, position - 1) if char == '{' else None
+        if char in '*?' or (quantifier and not quantifier.group('min').strip('0')):
+            if run:
+                run.pop()
+        if char == '|':
+            return None
+        if char == '\\' and position < len(pattern) and not pattern[position].isalnum():
+            run.append(pattern[position])
+            position += 1
+            continue
+        if quantifier:
+            position = quantifier.end()
+        elif char == '[':
+            position = _skip_class(pattern, position)
+        elif char == '(':
+            depth += 1
+        elif char not in REGEX_SPECIAL_CHARS:
+            run.append(char)
+            continue
+        elif char == '\\':
+            position = _skip_escape(pattern, position)
+        runs.append(''.join(run))
+        run = []
+    runs.append(''.join(run))
+
+    longest = max(runs, key=len)
+    return longest if len(longest) >= MIN_PREFILTER_LENGTH else None
+
+
+def _skip_escape(pattern: str, position: int) -> int:
+    """
+    Returns position right after escape sequence, which starts at *position* (after backslash).
+    """
+    escape = ESCAPE_SEQUENCE.match(pattern, position)
+    return escape.end() if escape else position + 1
+
+
+def _skip_class(pattern: str, position: int) -> int:
+    """
+    Returns position right after character class, which starts at *position*.
+    """
+    if pattern.startswith('^', position):
+        position += 1
+    if pattern.startswith(']', position):
+        position += 1
+    while position < len(pattern) and pattern[position] != ']':
+        position += 2 if pattern[position] == '\\' else 1
+    return position + 1
+
+
+def is_ascii(text: str) -> bool:
+    return all(ord(char) < 128 for char in text)
+
+
+def is_fusable(pattern: AnyStr, regex: Pattern) -> bool:
+    """
+    Pattern can be put into alternation with other patterns if it
+    doesn't depend on group numbering or names and doesn't set global flags.
+    """
+    pattern = pattern_text(pattern)
+    if regex.groupindex or GLOBAL_INLINE_FLAGS.search(pattern) or '(?P=' in pattern or '(?(' in pattern:
+        return False
+    escaped = False
+    for char in pattern:
+        if escaped and char.isdigit() and char != '0':
+            return False
+        escaped = not escaped and char == '\\'
+    return True
+
+
+class Strategy(NamedTuple):
+    patterns: Tuple[AnyStr, ...]
+    strategy: str
+
+
+class LiteralMatcher:
+    """
+    Searches line for any of literals with `in` operator,
+    case insensitive search compares lowered strings.
+    """
+
+    def __init__(
+        self, patterns: Sequence[AnyStr], flags: FrozenSet[SedFlags], literals: Optional[Sequence[AnyStr]] = None
+    ):
+        self.patterns = tuple(patterns)
+        self.insensitive = SedFlags.INSENSITIVE in flags
+        self._fold = _fold_function(self.patterns)
+        literals = self.patterns if literals is None else literals
+        self.literals = tuple(literal.lower() for literal in literals) if self.insensitive else tuple(literals)
+        self.strategy = 'casefold-literal' if self.insensitive else 'literal'
+
+    def __call__(self, line: AnyStr) -> bool:
+        if self.insensitive:
+            line = self._fold(line)
+        for literal in self.literals:
+            if literal in line:
+                return True
+        return False
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, self.patterns)
+
+
+class RegexMatcher:
+    """
+    Searches line with one regular expression, which can be
+    alternation of several fused patterns.
+    If *prefilter* is given, regular expression runs only on lines it accepts.
+    """
+
+    def __init__(self, patterns: Sequence[AnyStr], flags: FrozenSet[SedFlags], prefilter: Optional[Callable] = None):
+        self.patterns = tuple(patterns)
+        self.prefilter = prefilter
+        if len(self.patterns) == 1:
+            self.regex = backends.compile(self.patterns[0], regex_flags(flags))
+            self.strategy = 'regex'
+        else:
+            self.regex = backends.compile(_alternation(self.patterns), regex_flags(flags))
+            self.strategy = 'fused-regex'
+        if prefilter is not None:
+            self.strategy = 'prefiltered-' + self.strategy
+
+    def __call__(self, line: AnyStr) -> bool:
+        if self.prefilter is not None and not self.prefilter(line):
+            return False
+        return self.regex.search(line) is not None
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, self.patterns)
+
+
+class AhoCorasickMatcher:
+    """
+    Searches line for any of literal patterns in a single pass
+    using Aho-Corasick automaton with precomputed transitions.
+    """
+
+    strategy = 'aho-corasick'
+
+    def __init__(
+        self, patterns: Sequence[AnyStr], flags: FrozenSet[SedFlags], literals: Optional[Sequence[AnyStr]] = None
+    ):
+        self.patterns = tuple(patterns)
+        self.insensitive = SedFlags.INSENSITIVE in flags
+        self._fold = _fold_function(self.patterns)
+        literals = self.patterns if literals is None else literals
+        if self.insensitive:
+            literals = [literal.lower() for literal in literals]
+
+        # Keys are characters of str literals or integer bytes of bytes literals
+        goto: List[Dict[Any, int]] = [{}]
+        accepts = [False]
+        for literal in literals:
+            state = 0
+            for char in literal:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    goto.append({})
+                    accepts.append(False)
+                    next_state = goto[state][char] = len(goto) - 1
+                state = next_state
+            accepts[state] = True
+
+        # Breadth-first walk guarantees fail state transitions are complete before they're inherited
+        transitions: List[Dict[Any, int]] = [dict(edges) for edges in goto]
+        fail = [0] * len(goto)
+        queue = collections.deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            accepts[state] = accepts[state] or accepts[fail[state]]
+            for char, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(char, 0)
+                queue.append(next_state)
+            for char, next_state in transitions[fail[state]].items():
+                transitions[state].setdefault(char, next_state)
+
+        self._transitions = transitions
+        self._accepts = accepts
+        self._matches_empty = accepts[0]
+
+    def __call__(self, line: AnyStr) -> bool:
+        if self._matches_empty:
+            return True
+        if self.insensitive:
+            line = self._fold(line)
+        transitions = self._transitions
+        accepts = self._accepts
+        state = 0
+        for char in line:
+            state = transitions[state].get(char, 0)
+            if accepts[state]:
+                return True
+        return False
+
+    def __repr__(self) -> str:
+        return '{}({} patterns)'.format(type(self).__name__, len(self.patterns))
+
+
+def _literal_matcher(
+    patterns: Sequence[AnyStr], literals: Sequence[AnyStr], flags: FrozenSet[SedFlags]
+) -> Union[LiteralMatcher, AhoCorasickMatcher]:
+    if len(literals) >= AHO_CORASICK_MIN_PATTERNS:
+        return AhoCorasickMatcher(patterns, flags, literals=literals)
+    return LiteralMatcher(patterns, flags, literals=literals)
+
+
+def _searchable_literal(literal: Optional[AnyStr], flags: FrozenSet[SedFlags]) -> Optional[AnyStr]:
+    """
+    Case insensitive literal search is exact only for ASCII literals
+    (bytes are always folded as ASCII).
+    """
+    if literal is None or (SedFlags.INSENSITIVE in flags and isinstance(literal, str) and not is_ascii(literal)):
+        return None
+    return literal
+
+
+def _regex_matcher(patterns: Sequence[AnyStr], flags: FrozenSet[SedFlags]) -> RegexMatcher:
+    """
+    Regular expression gets prefilter if every pattern
+    has a literal, that all of its matches contain.
+    """
+    literals = [_searchable_literal(required_literal(pattern), flags) for pattern in patterns]
+    if all(literals):
+        return RegexMatcher(patterns, flags, prefilter=_literal_matcher(literals, literals, flags))  # type: ignore
+    return RegexMatcher(patterns, flags)
+
+
+def compile_search_pattern(pattern: AnyStr, flags: FrozenSet[SedFlags]) -> Union[LiteralMatcher, RegexMatcher]:
+    """
+    Literal patterns are searched with `in`, regular expressions
+    get required literal prefilter where possible.
+    """
+    literal = _searchable_literal(literal_text(pattern), flags)
+    if literal is not None:
+        return LiteralMatcher([pattern], flags, literals=[literal])
+    return _regex_matcher([pattern], flags)
+
+
+def compile_search_patterns(patterns: Iterable[AnyStr], flags: FrozenSet[SedFlags]) -> List:
+    """
+    Compiles search patterns into as few matchers as possible,
+    so every line is scanned once instead of once per pattern:
+    literals are searched together (many literals go to Aho-Corasick automaton),
+    other fusable patterns are merged into single alternation regex.
+    With DELETE flag every pattern is matched (and negated) separately.
+    """
+    patterns = list(patterns)
+    regexes = [re.compile(pattern, flags=regex_flags(flags)) for pattern in patterns]
+    if SedFlags.DELETE in flags or len(patterns) < 2:
+        return [compile_search_pattern(pattern, flags) for pattern in patterns]
+
+    literals = {pattern: _searchable_literal(literal_text(pattern), flags) for pattern in patterns}
+    literal_patterns = [pattern for pattern in patterns if literals[pattern] is not None]
+    matchers: List = []
+    if literal_patterns:
+        matchers.append(_literal_matcher(literal_patterns, [literals[pattern] for pattern in literal_patterns], flags))
+
+    pairs = [(pattern, regex) for pattern, regex in zip(patterns, regexes) if literals[pattern] is None]
+    fusable = [pattern for pattern, regex in pairs if is_fusable(pattern, regex)]
+    separate = [pattern for pattern, regex in pairs if not is_fusable(pattern, regex)]
+    if len(fusable) > 1:
+        try:
+            matchers.append(_regex_matcher(fusable, flags))
+        except re.error:
+            separate = fusable + separate
+    else:
+        separate = fusable + separate
+    matchers.extend(_regex_matcher([pattern], flags) for pattern in separate)
+    return matchers
+
+
+def describe(processor: Callable) -> Strategy:
+    """
+    Returns patterns handled by processor and its matching strategy.
+    """
+    if isinstance(processor, functools.partial):
+        return Strategy((processor.func.__self__.pattern,), 'substitution')  # type: ignore
+    patterns = getattr(processor, 'patterns', None)
+    if patterns is None:
+        return Strategy((repr(processor),), 'callable')
+    return Strategy(patterns, processor.strategy)  # type: ignore
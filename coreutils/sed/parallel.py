@@ -0,0 +1,333 @@
+# pylint: disable=protected-access
+
+import collections
+import contextlib
+import concurrent.futures
+import functools
+import io
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
+from typing import Any, AnyStr, Callable, Deque, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import coreutils.sed.buffers as buffers
+import coreutils.sed.compression as compression
+import coreutils.sed.files as files
+import coreutils.sed.index as index
+import coreutils.sed.walk as walk
+from coreutils.sed import SedException
+from coreutils.sed import sed as engine
+
+# How many tasks per worker are submitted ahead of the one, which results are awaited
+TASKS_PER_WORKER = 2
+# Files bigger than this are split into chunks processed by different workers
+CHUNK_SIZE = 64 * 1024 * 1024
+
+
+class Chunk(NamedTuple):
+    """
+    Part of file between two line boundaries.
+    """
+
+    path: pathlib.Path
+    start: int
+    end: int
+
+
+Task = Union[str, pathlib.Path, Chunk]
+
+
+def split_file(path: pathlib.Path, chunk_size: int) -> List[Chunk]:
+    """
+    Splits file into chunks of about *chunk_size* bytes,
+    every chunk ends right after newline (or at the end of file).
+    Chunks are cut at indexed line starts if file has line index.
+    """
+    line_index = index.load_index(path, update=True)
+    if line_index is not None:
+        return [Chunk(path, start, end) for start, end in line_index.chunks(chunk_size)]
+
+    size = path.stat().st_size
+    chunks = []
+    with path.open('rb') as file:
+        start = 0
+        while start < size:
+            end = start + chunk_size
+            if end >= size:
+                end = size
+            else:
+                file.seek(end - 1)
+                file.readline()
+                end = file.tell()
+            chunks.append(Chunk(path, start, end))
+            start = end
+    return chunks
+
+
+def _chunk_lines(chunk: Chunk, mode: files.FileMode = files.TEXT) -> Iterator[AnyStr]:
+    return files.read_range_lines(chunk.path, chunk.start, chunk.end, mode)
+
+
+def _search_task(
+    mode: files.FileMode,
+    task: Task,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    max_count: Optional[int] = None,
+) -> Iterator[AnyStr]:
+    """
+    Task never yields more than *max_count* lines, they are enough for the whole search.
+    """
+    if not isinstance(task, Chunk):
+        return engine._limited(engine._search_sequentially(task, processors, flags, mode), max_count)
+
+    buffer_regex = buffers.compile_buffer_regex(processors, flags, mode)
+    if buffer_regex is None:
+        return engine._limited(engine._search_lines(_chunk_lines(task, mode), processors, flags), max_count)
+    fallback = functools.partial(engine._search_file_range, task.path, processors=processors, flags=flags, mode=mode)
+    matched_lines = buffers.search_file(task.path, buffer_regex, task.start, task.end, mode, fallback=fallback)
+    return engine._limited(matched_lines, max_count)  # type: ignore
+
+
+def _substitute_task(
+    mode: files.FileMode, task: Task, processors: List[engine.Processor], flags: engine.Flags
+) -> Iterator[AnyStr]:
+    if isinstance(task, Chunk):
+        lines = _chunk_lines(task, mode)
+    else:
+        lines = engine._aggregate_processable_lines(task, mode)
+    return engine._substitute_lines(lines, processors, flags)
+
+
+def _collect(
+    run: Callable[[Task, List[engine.Processor], engine.Flags], Iterator[AnyStr]],
+    task: Task,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+) -> List[AnyStr]:
+    return list(run(task, processors, flags))
+
+
+def _collect_to_file(
+    run: Callable[[Task, List[engine.Processor], engine.Flags], Iterator[AnyStr]],
+    mode: files.FileMode,
+    directory: str,
+    task: Task,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+) -> str:
+    """
+    Writes task results to new file in *directory*, returning its name.
+    """
+    with tempfile.NamedTemporaryFile('wb', dir=directory, suffix='.part', delete=False) as part:
+        with mode.wrap(part) as file:
+            files.write_lines(run(task, processors, flags), file, mode.newline)
+        return part.name
+
+
+def _check_picklable(processors: List[engine.Processor]):
+    """
+    Processors are sent to worker processes, so lambdas
+    and other local callables can't be used.
+    """
+    try:
+        pickle.dumps(processors)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise SedException(processors, 'Processors must be picklable to run in worker processes: {}'.format(e))
+
+
+def _tasks(processable: engine.Processable, chunk_size: int) -> Iterator[Task]:
+    if isinstance(processable, (str, bytes, pathlib.Path)):
+        processable = [processable]
+    for process in processable:
+        if isinstance(process, pathlib.Path) and process.is_dir():
+            yield from _tasks(walk.Walk(process), chunk_size)
+            continue
+        # Compressed file can be decompressed only from its start, so it's processed whole
+        is_big_file = isinstance(process, pathlib.Path) and process.stat().st_size > chunk_size
+        if is_big_file and compression.detect(process) is None:  # type: ignore
+            yield from split_file(process, chunk_size)  # type: ignore
+        else:
+            yield process
+
+
+def _map_ordered(
+    task_function: Callable,
+    tasks: Iterable[Task],
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    workers: int,
+) -> Iterator[Any]:
+    """
+    Runs *task_function* for every file or chunk in worker processes and yields results in input order.
+    Strings are processed in current process, when their turn comes.
+    Only a few tasks per worker are queued ahead, so files
+    can be discovered lazily and results don't pile up in memory.
+    """
+    pending: Deque[Union[concurrent.futures.Future, str]] = collections.deque()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for task in tasks:
+                if isinstance(task, (str, bytes)):
+                    pending.append(task)
+                else:
+                    pending.append(executor.submit(task_function, task, processors, flags))
+                while len(pending) > workers * TASKS_PER_WORKER:
+                    yield _result(pending.popleft(), task_function, processors, flags)
+            while pending:
+                yield _result(pending.popleft(), task_function, processors, flags)
+        finally:
+            for future in pending:
+                if isinstance(future, concurrent.futures.Future):
+                    future.cancel()
+
+
+def _result(
+    pending: Union[concurrent.futures.Future, str],
+    task_function: Callable,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+) -> Any:
+    if isinstance(pending, concurrent.futures.Future):
+        return pending.result()
+    return task_function(pending, processors, flags)
+
+
+def _chain(results: Iterable[List[AnyStr]]) -> Iterator[AnyStr]:
+    for lines in results:
+        yield from lines
+
+
+def _run(
+    run: Callable,
+    processable: engine.Processable,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    workers: int,
+    output: Optional[pathlib.Path],
+    mode: files.FileMode,
+) -> Optional[Iterator[AnyStr]]:
+    _check_picklable(processors)
+    tasks = _tasks(processable, CHUNK_SIZE)
+    run = functools.partial(run, mode)
+    if output is None:
+        return _chain(_map_ordered(functools.partial(_collect, run), tasks, processors, flags, workers))
+
+    with tempfile.TemporaryDirectory(dir=str(output.resolve().parent), prefix='.sed-') as directory:
+        collect = functools.partial(_collect_to_file, run, mode, directory)
+        parts = _map_ordered(collect, tasks, processors, flags, workers)
+        try:
+            with output.open('wb') as file:
+                for part in parts:
+                    with open(part, 'rb') as part_file:
+                        shutil.copyfileobj(part_file, file)
+                    os.unlink(part)
+        finally:
+            parts.close()
+    return None
+
+
+def search(
+    processable: engine.Processable,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    workers: int,
+    output: Optional[pathlib.Path] = None,
+    mode: files.FileMode = files.TEXT,
+    max_count: Optional[int] = None,
+) -> Optional[Iterator[AnyStr]]:
+    """
+    Searches files in *workers* processes, big files are split into chunks.
+    Matched lines are yielded in input order or, if *output* is given,
+    written to it through temporary files, without collecting them in memory.
+    Every file or chunk stops being searched after *max_count* matched lines.
+    """
+    task = _search_task if max_count is None else functools.partial(_search_task, max_count=max_count)
+    return _run(task, processable, processors, flags, workers, output, mode)
+
+
+def substitute(
+    processable: engine.Processable,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    workers: int,
+    output: Optional[pathlib.Path] = None,
+    mode: files.FileMode = files.TEXT,
+) -> Optional[Iterator[AnyStr]]:
+    """
+    Substitutes files in *workers* processes, big files are split into chunks.
+    Substituted lines are yielded in input order or, if *output* is given,
+    written to it through temporary files, without collecting them in memory.
+    """
+    return _run(_substitute_task, processable, processors, flags, workers, output, mode)
+
+
+def _part_path(chunk: Chunk, token: str) -> pathlib.Path:
+    path = chunk.path.resolve()
+    return path.parent / '.{}.{}.{}.part'.format(path.name, chunk.start, token)
+
+
+def _substitute_inplace_task(
+    token: str, mode: files.FileMode, task: Task, processors: List[engine.Processor], flags: engine.Flags
+) -> Optional[Chunk]:
+    """
+    Rewrites whole file or, for file chunk, writes substituted chunk
+    into part file next to original file.
+    """
+    if not isinstance(task, Chunk):
+        engine._substitute_file_inplace(task, processors, flags, mode)  # type: ignore
+        return None
+
+    with task.path.open('rb') as file:
+        file.seek(task.start)
+        with mode.wrap(io.BufferedReader(files.RangeReader(file, task.end)), newline='') as source:
+            with mode.open(_part_path(task, token), 'w', newline='') as target:
+                engine._substitute_stream(mode.lines_with_endings(source), target, processors, flags, mode.newline)
+    return task
+
+
+def substitute_inplace(
+    paths: Iterable[pathlib.Path],
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    workers: int,
+    mode: files.FileMode = files.TEXT,
+):
+    """
+    Rewrites files in *workers* processes.
+    Big files are split into chunks, which are substituted into part files
+    and then merged into atomic replacement of original file.
+    """
+    _check_picklable(processors)
+    token = str(os.getpid())
+    chunks: List[Chunk] = []
+
+    def _recorded_tasks() -> Iterator[Task]:
+        for task in _tasks(paths, CHUNK_SIZE):
+            if isinstance(task, Chunk):
+                chunks.append(task)
+            yield task
+
+    results = _map_ordered(
+        functools.partial(_substitute_inplace_task, token, mode), _recorded_tasks(), processors, flags, workers
+    )
+    try:
+        file_chunks: List[Chunk] = []
+        for chunk in results:
+            if chunk is None:
+                continue
+            file_chunks.append(chunk)
+            if chunk.end < chunk.path.stat().st_size:
+                continue
+            with files.atomic_rewrite(chunk.path, 'wb') as target:
+                for file_chunk in file_chunks:
+                    with _part_path(file_chunk, token).open('rb') as part:
+                        shutil.copyfileobj(part, target)
+            file_chunks = []
+    finally:
+        results.close()
+        for chunk in chunks:
+            with contextlib.suppress(FileNotFoundError):
+                _part_path(chunk, token).unlink()
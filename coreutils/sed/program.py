@@ -0,0 +1,198 @@
+# pylint: disable=protected-access
+
+import functools
+import pathlib
+import re
+from typing import AnyStr, Iterator, List, Optional, Union
+
+import coreutils.sed.matchers as matchers
+import coreutils.sed.utils as utils
+from coreutils.sed import SedException, SedFlags
+from coreutils.sed import sed as engine
+
+SEARCH_COMMAND = re.compile(r'^/(?P<pattern>.*)/(?P<flags>[^/]*)$')
+SUBSTITUTE_COMMAND = re.compile(
+    r'^s(?P<separator>.)(?P<pattern>.*)(?P=separator)(?P<substitution>.*)(?P=separator)(?P<flags>.*)$'
+)
+COMPILE_CACHE_SIZE = 256
+
+
+class SedProgram:
+    """
+    Parsed and compiled sed command.
+    Compiled regular expressions and flags are reused between calls,
+    so running program does no parsing at all.
+    """
+
+    def __init__(
+        self, command: AnyStr, pattern: AnyStr, flags: engine.Flags, substitution: Optional[AnyStr] = None
+    ):
+        self.command = command
+        self.pattern = pattern
+        self.substitution = substitution
+        self.flags = frozenset(flags)
+        engine._check_flags(self.flags)
+
+        self._substitute_processors: Optional[List[engine.Processor]] = None
+        try:
+            self._search_processors = engine._cast_commands_to_processors(pattern, flags=self.flags)
+            if substitution is not None:
+                self._substitute_processors = engine._cast_commands_to_processors(
+                    (pattern, substitution), flags=self.flags, action='substitution'
+                )
+        except re.error as e:
+            raise SedException(command, 'Invalid regular expression {!r}: {}'.format(pattern, e)) from e
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, self.command)
+
+    @property
+    def strategies(self) -> List[matchers.Strategy]:
+        """
+        Matching strategies chosen for program's pattern, see `coreutils.sed.explain`.
+        """
+        return [matchers.describe(processor) for processor in self._search_processors]
+
+    def isearch(
+        self,
+        processable: engine.Processable,
+        workers: Optional[int] = None,
+        encoding: Optional[str] = None,
+        errors: Optional[str] = None,
+        max_count: Optional[int] = None,
+    ) -> Iterator[AnyStr]:
+        """
+        Streaming version of `search`.
+        """
+        mode = engine._file_mode(self._search_processors, encoding, errors)
+        return engine._search_processable(
+            processable, self._search_processors, self.flags, workers=workers, mode=mode, max_count=max_count
+        )
+
+    def search(
+        self,
+        processable: engine.Processable,
+        workers: Optional[int] = None,
+        output: Optional[pathlib.Path] = None,
+        encoding: Optional[str] = None,
+        errors: Optional[str] = None,
+        max_count: Optional[int] = None,
+    ) -> Optional[List[AnyStr]]:
+        """
+        Same as `coreutils.sed.search` with program's pattern and flags.
+        """
+        if output is not None:
+            mode = engine._file_mode(self._search_processors, encoding, errors)
+            engine._search_to_file(
+                processable,
+                self._search_processors,
+                self.flags,
+                output,
+                workers=workers,
+                mode=mode,
+                max_count=max_count,
+            )
+            return None
+        return list(self.isearch(processable, workers=workers, encoding=encoding, errors=errors, max_count=max_count))
+
+    def isubstitute(
+        self,
+        processable: engine.Processable,
+        workers: Optional[int] = None,
+        encoding: Optional[str] = None,
+        errors: Optional[str] = None,
+    ) -> Iterator[AnyStr]:
+        """
+        Streaming version of `substitute`.
+        """
+        processors = self._get_substitute_processors()
+        if SedFlags.INPLACE in self.flags:
+            raise SedException(self.command, 'SedFlags.INPLACE is not supported in streaming mode, use `substitute`')
+        mode = engine._file_mode(processors, encoding, errors)
+        return engine._substitute_processable(processable, processors, self.flags, workers=workers, mode=mode)
+
+    def substitute(
+        self,
+        processable: engine.Processable,
+        workers: Optional[int] = None,
+        output: Optional[pathlib.Path] = None,
+        encoding: Optional[str] = None,
+        errors: Optional[str] = None,
+    ) -> Union[List[AnyStr], None]:
+        """
+        Same as `coreutils.sed.substitute` with program's pattern, substitution and flags.
+        """
+        processors = self._get_substitute_processors()
+        mode = engine._file_mode(processors, encoding, errors)
+        if SedFlags.INPLACE in self.flags:
+            engine._substitute_inplace(processable, processors, self.flags, workers=workers, mode=mode)
+            return None
+        if output is not None:
+            engine._substitute_to_file(processable, processors, self.flags, output, workers=workers, mode=mode)
+            return None
+        return list(self.isubstitute(processable, workers=workers, encoding=encoding, errors=errors))
+
+    def _get_substitute_processors(self) -> List[engine.Processor]:
+        if self._substitute_processors is None:
+            raise SedException(self.command, 'Only substitution commands (s/pattern/substitution/flags) can substitute')
+        return self._substitute_processors
+
+
+def _parse_flags(command: AnyStr, str_flags: str) -> engine.Flags:
+    try:
+        return frozenset(utils.FLAGS_MAP[sf] for sf in str_flags)
+    except KeyError as e:
+        raise SedException(command, 'Unknown flag {}.'.format(e.args[0]))
+
+
+def _parse_substitute_command(command: AnyStr) -> SedProgram:
+    command_parse_match = SUBSTITUTE_COMMAND.match(matchers.pattern_text(command))
+    if command_parse_match is None:
+        raise SedException(command, 'Substitution command must look like s/pattern/substitution/flags.')
+
+    pattern = command_parse_match.group('pattern')
+    separator = command_parse_match.group('separator')
+    substitution = command_parse_match.group('substitution')
+    str_flags = command_parse_match.group('flags')
+
+    generic_solve = 'Use unique separator.'
+    separator_error = None
+    if separator in pattern:
+        separator_error = 'Separator used in pattern.'
+    if separator in substitution:
+        separator_error = 'Separator used in substitution string.'
+    if separator in str_flags:
+        separator_error = 'Separator used in flags.'
+    if separator_error:
+        raise SedException(command, '{} {}'.format(separator_error, generic_solve))
+
+    return SedProgram(
+        command,
+        matchers.pattern_like(pattern, command),
+        _parse_flags(command, str_flags),
+        substitution=matchers.pattern_like(substitution, command),
+    )
+
+
+def _parse_search_command(command: AnyStr) -> SedProgram:
+    command_parse_match = SEARCH_COMMAND.match(matchers.pattern_text(command))
+    if command_parse_match is None:
+        raise SedException(command, 'Search command must look like /pattern/flags.')
+
+    pattern = command_parse_match.group('pattern')
+    return SedProgram(
+        command, matchers.pattern_like(pattern, command), _parse_flags(command, command_parse_match.group('flags'))
+    )
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile(command: AnyStr) -> SedProgram:  # noqa: A001  # pylint: disable=redefined-builtin
+    """
+    Parses sed command (/pattern/flags or s/pattern/substitution/flags)
+    and returns reusable `SedProgram`.
+    Bytes commands make programs working with bytes.
+    Programs are cached by command string.
+    """
+    if matchers.pattern_text(command).startswith('s'):
+        return _parse_substitute_command(command)
+    return _parse_search_command(command)
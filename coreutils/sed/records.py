@@ -0,0 +1,154 @@
+# pylint: disable=protected-access
+
+import functools
+import itertools
+import locale
+import pathlib
+from typing import AnyStr, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import coreutils.sed.backends as backends
+import coreutils.sed.buffers as buffers
+import coreutils.sed.compression as compression
+import coreutils.sed.files as files
+import coreutils.sed.matchers as matchers
+import coreutils.sed.walk as walk
+from coreutils.sed import SedException, SedFlags
+from coreutils.sed import sed as engine
+
+Span = Optional[Tuple[int, int]]
+
+
+class Record(NamedTuple):
+    """
+    Matched line along with its location:
+    *path* of file (`None` for lines given directly),
+    1-based *line_number* within file (or among lines given directly),
+    byte *offset* of line start in file (`None` for lines given directly,
+    in decompressed content for compressed files),
+    *span* of the leftmost pattern match in *text*
+    (`None` if line is matched by callable or selected with DELETE flag).
+    """
+
+    path: Optional[pathlib.Path]
+    line_number: int
+    offset: Optional[int]
+    span: Span
+    text: AnyStr
+
+
+def _span_finder(commands: engine.Commands, flags: engine.Flags) -> Callable[[AnyStr], Span]:
+    """
+    Finds span of the leftmost match among pattern commands,
+    only matched lines are searched for it.
+    """
+    if isinstance(commands, (str, bytes)) or callable(commands):
+        commands = [commands]
+    patterns = [command for command in commands if isinstance(command, (str, bytes))]
+    if SedFlags.DELETE in flags or not patterns:
+        return lambda line: None
+    regexes = [backends.compile(pattern, matchers.regex_flags(flags)) for pattern in patterns]
+
+    def _span(line: AnyStr) -> Span:
+        leftmost = None
+        for regex in regexes:
+            match = regex.search(line)
+            if match is not None and (leftmost is None or match.start() < leftmost[0]):
+                leftmost = match.span()
+        return leftmost
+
+    return _span
+
+
+def _check_offsets_encoding(mode: files.FileMode):
+    if mode.binary:
+        return
+    encoding = mode.encoding or locale.getpreferredencoding(False)
+    if '\r\n'.encode(encoding) != b'\r\n':
+        raise SedException(encoding, 'Byte offsets can be found only in ASCII compatible encodings')
+
+
+def _file_records(
+    path: pathlib.Path,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    mode: files.FileMode,
+    span: Callable[[AnyStr], Span],
+) -> Iterator[Record]:
+    """
+    Memory maps file if it can be searched as whole buffer,
+    otherwise reads it line by line, counting bytes.
+    """
+    is_matched = functools.partial(engine._is_processors_matched, processors=processors, flags=flags)
+
+    def _read(start: int, number: int) -> Iterator[Tuple[int, int, AnyStr]]:
+        lines = files.read_lines_with_offsets(path, mode, start)
+        for line_number, (offset, line) in enumerate(lines, number):
+            if is_matched(line):
+                yield line_number, offset, line
+
+    buffer_regex = buffers.compile_buffer_regex(processors, flags, mode)
+    if buffer_regex is None or compression.detect(path) is not None:
+        located = _read(0, 1)
+    else:
+        located = buffers.locate_file(path, buffer_regex, mode, fallback=_read)
+    for line_number, offset, line in located:
+        yield Record(path, line_number, offset, span(line), line)
+
+
+def _records(
+    processable: engine.Processable,
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    mode: files.FileMode,
+    span: Callable[[AnyStr], Span],
+) -> Iterator[Record]:
+    if isinstance(processable, (str, bytes, pathlib.Path)):
+        processable = [processable]
+    line_numbers = itertools.count(1)
+    for is_file, processes in itertools.groupby(processable, key=lambda process: isinstance(process, pathlib.Path)):
+        if is_file:
+            for path in walk.file_paths(processes):
+                yield from _file_records(path, processors, flags, mode, span)
+            continue
+        for line_number, line in zip(line_numbers, processes):
+            if engine._is_processors_matched(line, processors, flags):
+                yield Record(None, line_number, None, span(line), line)
+
+
+def isearch_records(
+    processable: engine.Processable,
+    commands: engine.Commands,
+    flags: Optional[engine.Flags] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    max_count: Optional[int] = None,
+) -> Iterator[Record]:
+    """
+    Streaming version of `search_records`.
+    """
+    flags = frozenset(flags or set())
+    engine._check_flags(flags)
+    engine._check_max_count(max_count, flags)
+    if SedFlags.PRINT in flags:
+        raise SedException(flags, 'Records describe matched lines, SedFlags.PRINT prints all of them')
+    processors = engine._cast_commands_to_processors(commands, flags=flags)
+    mode = engine._file_mode(processors, encoding, errors)
+    _check_offsets_encoding(mode)
+    return engine._limited(_records(processable, processors, flags, mode, _span_finder(commands, flags)), max_count)
+
+
+def search_records(
+    processable: engine.Processable,
+    commands: engine.Commands,
+    flags: Optional[engine.Flags] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    max_count: Optional[int] = None,
+) -> List[Record]:
+    """
+    Same as `coreutils.sed.search`, but returns `Record` of every matched line:
+    its file, line number, byte offset and span of match along with line itself.
+    Locations are found during the same pass over input,
+    so offsets can be used to seek straight to matched lines later.
+    """
+    return list(isearch_records(processable, commands, flags, encoding=encoding, errors=errors, max_count=max_count))
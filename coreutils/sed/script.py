@@ -0,0 +1,641 @@
+"""
+Multi-command sed scripts:
+
+    1,/^$/d; s/foo/bar/g; /error/I p; $q
+
+Commands are separated by `;` or newlines, every command can have an address
+(line number, `$` for the last line or /regex/ with optional I flag),
+a range of two addresses (`/start/,/end/`, `10,$`) and `!` to negate it.
+Supported commands are `d`, `p`, `q`, `s/pattern/substitution/flags`
+and multi-line ones, working with pattern space and hold space:
+
+    N   append newline and the next line to pattern space (at the end of input print it and quit)
+    D   delete pattern space up to the first newline and restart cycle without reading next line
+    P   print pattern space up to the first newline
+    h H copy (append) pattern space to hold space
+    g G copy (append) hold space to pattern space
+    x   exchange pattern and hold spaces
+
+    $!N; /^Traceback.*\n  File/P; D
+
+Spaces are kept as parts, which are joined with newlines only when their text is needed,
+so appending lines to them costs no copying of what they already hold.
+Neither of them can grow beyond `MAX_SPACE` characters (bytes for bytes scripts).
+"""
+
+# pylint: disable=protected-access
+
+import collections
+import functools
+import itertools
+import pathlib
+import re
+from typing import AnyStr, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import coreutils.sed.files as files
+import coreutils.sed.index as index
+import coreutils.sed.matchers as matchers
+import coreutils.sed.utils as utils
+import coreutils.sed.walk as walk
+from coreutils.sed import SedException, SedFlags
+from coreutils.sed import sed as engine
+from coreutils.sed.program import COMPILE_CACHE_SIZE
+
+Script = Union[AnyStr, Sequence[AnyStr]]
+
+SUBSTITUTE_FLAGS = frozenset({SedFlags.GLOBAL, SedFlags.PRINT, SedFlags.INSENSITIVE})
+SEPARATORS = ';\n'
+BLANKS = ' \t'
+MULTILINE_COMMANDS = frozenset('NDPhHgGx')
+# Pattern or hold space longer than this many characters stops script
+MAX_SPACE = 64 * 1024 * 1024
+
+
+class Address:
+    """
+    Selects line by its *number*, the *last* line or lines matched by *matcher*.
+    """
+
+    __slots__ = ('number', 'last', 'matcher')
+
+    def __init__(self, number: Optional[int] = None, last: bool = False, matcher: Optional[engine.Processor] = None):
+        self.number = number
+        self.last = last
+        self.matcher = matcher
+
+    def matches(self, space: AnyStr, number: int, is_last: bool) -> bool:
+        if self.matcher is not None:
+            return bool(self.matcher(space))
+        if self.last:
+            return is_last
+        return number == self.number
+
+
+class Command:
+    """
+    One script command: *name* is one of `d`, `p`, `q`, `s` or multi-line commands.
+    Command without *start* address runs on every line.
+    """
+
+    __slots__ = ('name', 'start', 'end', 'negate', 'addressed', 'substitution', 'print_substituted')
+
+    def __init__(
+        self,
+        name: str,
+        start: Optional[Address] = None,
+        end: Optional[Address] = None,
+        negate: bool = False,
+        substitution: Optional[engine.Processor] = None,
+        flags: engine.Flags = frozenset(),
+    ):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.negate = negate
+        self.addressed = start is not None or negate
+        self.substitution = substitution
+        self.print_substituted = SedFlags.PRINT in flags
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, self.name)
+
+
+def _selected(
+    command: Command, index: int, active: List[Optional[bool]], space: AnyStr, number: int, is_last: bool
+) -> bool:
+    """
+    Checks command address, *active* ranges are tracked by command *index*,
+    `None` marks ended range starting at line number, which can't start again.
+    As `N` reads lines past the addressed ones, line numbers are compared the way GNU sed does:
+    range starts at the first line from its start line number on (unless it's past its end line number
+    already) and ends at the first line from its end line number on, which is selected only if it's the end line.
+    Range end is looked for starting from the line after range start,
+    line number end lower than start line number selects start line only.
+    """
+    start, end = command.start, command.end
+    if start is None:
+        selected = False
+    elif end is None:
+        selected = start.matches(space, number, is_last)
+    elif active[index]:
+        if end.number is None:
+            selected, ended = True, end.matches(space, number, is_last)
+        else:
+            selected, ended = number <= end.number, number >= end.number
+        if ended:
+            active[index] = None if start.number is not None else False
+    elif active[index] is None:
+        selected = False
+    elif start.number is not None and number > start.number and end.number is not None and number > end.number:
+        selected = False
+        active[index] = None
+    elif start.number is not None and number >= start.number or start.matches(space, number, is_last):
+        selected = True
+        stays = end.number > number if end.number is not None else not (end.last and is_last)
+        active[index] = True if stays else (None if start.number is not None else False)
+    else:
+        selected = False
+    return selected != command.negate
+
+
+def _line_window(commands: Iterable[Command]) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Lines, which quiet script can print anything on, if all its commands are addressed by line numbers:
+    from the first addressed line to the last one (`None` for the end of input).
+    """
+    firsts: List[int] = []
+    lasts: List[Optional[int]] = []
+    quit_at: Optional[int] = None
+    for command in commands:
+        start, end = command.start, command.end
+        # N reads lines beyond the addressed ones
+        if command.negate or start is None or start.number is None or command.name == 'N':
+            return None
+        firsts.append(start.number)
+        if command.name == 'q':
+            quit_at = start.number if quit_at is None else min(quit_at, start.number)
+        elif end is None:
+            lasts.append(start.number)
+        else:
+            lasts.append(None if end.number is None else max(start.number, end.number))
+    if not firsts:
+        return None
+    last = None if None in lasts or not lasts else max(lasts)  # type: ignore
+    if quit_at is not None:
+        last = quit_at if last is None else min(last, quit_at)
+    return min(firsts), last
+
+
+class _Space:
+    """
+    Pattern or hold space, *parts* joined with newlines.
+    Parts are joined only when text is needed (and replaced with the joined text then).
+    """
+
+    __slots__ = ('parts', 'size', 'newline')
+
+    def __init__(self, newline: AnyStr):
+        self.newline = newline
+        self.parts = collections.deque([newline[:0]])
+        self.size = 0
+
+    @property
+    def text(self) -> AnyStr:
+        if len(self.parts) > 1:
+            text = self.newline.join(self.parts)
+            self.parts = collections.deque([text])
+        return self.parts[0]
+
+    def set(self, text: AnyStr):
+        self.parts = collections.deque([text])
+        self.size = len(text)
+
+    def append(self, text: AnyStr):
+        self.parts.append(text)
+        self.size += len(text) + 1
+
+    def first_line(self) -> Tuple[AnyStr, bool]:
+        """
+        Returns text up to the first newline and whether there is newline at all.
+        """
+        first = self.parts[0]
+        position = first.find(self.newline)
+        if position != -1:
+            return first[:position], True
+        return first, len(self.parts) > 1
+
+    def delete_first_line(self) -> bool:
+        """
+        Deletes text up to the first newline, returns `False` if there is no newline.
+        """
+        first = self.parts[0]
+        position = first.find(self.newline)
+        if position != -1:
+            self.parts[0] = first[position + 1 :]
+            self.size -= position + 1
+        elif len(self.parts) > 1:
+            self.parts.popleft()
+            self.size -= len(first) + 1
+        else:
+            return False
+        return True
+
+
+def _with_last(lines: Iterable[Tuple[AnyStr, AnyStr]]) -> Iterator[Tuple[Tuple[AnyStr, AnyStr], bool]]:
+    """
+    Looks one line ahead to tell whether line is the last one.
+    """
+    lines = iter(lines)
+    previous = next(lines, None)
+    if previous is None:
+        return
+    for line in lines:
+        yield previous, False
+        previous = line
+    yield previous, True
+
+
+class SedScript:
+    """
+    Parsed and compiled sed script.
+    Every line goes through all commands in a single pass over input,
+    then, unless script is *quiet*, resulting pattern space is printed.
+    Line numbers and `$` are counted across all inputs,
+    except for inplace rewrite, where every file is processed on its own.
+    """
+
+    def __init__(self, script: AnyStr, commands: Iterable[Command], quiet: bool = False):
+        self.script = script
+        self.commands = tuple(commands)
+        self.quiet = quiet
+        self._binary = isinstance(script, bytes)
+        addresses = [address for command in self.commands for address in (command.start, command.end)]
+        self._needs_last = any(address is not None and address.last for address in addresses)
+        self._line_window = _line_window(self.commands) if quiet else None
+        self._multiline = any(command.name in MULTILINE_COMMANDS for command in self.commands)
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, self.script)
+
+    def irun(
+        self, processable: engine.Processable, encoding: Optional[str] = None, errors: Optional[str] = None
+    ) -> Iterator[AnyStr]:
+        """
+        Streaming version of `run`.
+        Input stops being read as soon as `q` command is reached.
+        Quiet script, which addresses lines only by their numbers,
+        reads only those lines of file with line index (see `coreutils.sed.index`).
+        """
+        mode = self._mode(encoding, errors)
+        first = 1
+        if isinstance(processable, pathlib.Path) and self._line_window is not None and not processable.is_dir():
+            lines, first = self._window_lines(processable, mode)
+        else:
+            lines = engine._aggregate_processable_lines(processable, mode)
+        return (line for line, _ in self._execute(zip(lines, itertools.repeat(mode.newline)), first))
+
+    def run(
+        self,
+        processable: engine.Processable,
+        output: Optional[pathlib.Path] = None,
+        inplace: bool = False,
+        encoding: Optional[str] = None,
+        errors: Optional[str] = None,
+    ) -> Optional[List[AnyStr]]:
+        """
+        Runs script on *processable* lines (or files), returning printed lines.
+        If *output* file is given, lines are written there instead.
+        With *inplace* every file is rewritten with its own output, keeping line terminators.
+        """
+        mode = self._mode(encoding, errors)
+        if inplace:
+            paths = [processable] if isinstance(processable, pathlib.Path) else list(processable)  # type: ignore
+            if not all(isinstance(path, pathlib.Path) for path in paths):
+                raise SedException(self.script, 'Inplace rewrite on types other than files is not implemented')
+            for path in walk.file_paths(paths):
+                self._rewrite(path, mode)
+            return None
+        if output is not None:
+            with mode.open(output, 'w') as file:
+                files.write_lines(self.irun(processable, encoding, errors), file, mode.newline)
+            return None
+        return list(self.irun(processable, encoding, errors))
+
+    def _window_lines(self, path: pathlib.Path, mode: files.FileMode) -> Tuple[Iterator[AnyStr], int]:
+        """
+        Returns lines of script's line window along with number of the first one.
+        """
+        line_index = index.load_index(path, update=True)
+        if line_index is None or not line_index.numbers_text_lines(mode):
+            return engine._aggregate_processable_lines(path, mode), 1
+        first, last = self._line_window  # type: ignore
+        return line_index.lines(first, last, mode), first
+
+    def _mode(self, encoding: Optional[str], errors: Optional[str]) -> files.FileMode:
+        if self._binary and (encoding is not None or errors is not None):
+            raise SedException(encoding, 'encoding and errors can be used only with str scripts')
+        return files.FileMode(self._binary, encoding, errors)
+
+    def _rewrite(self, path: pathlib.Path, mode: files.FileMode):
+        with mode.open(path, newline='') as source:
+            if mode.binary:
+                rewrite = files.atomic_rewrite(path, 'wb')
+            else:
+                rewrite = files.atomic_rewrite(path, newline='', encoding=mode.encoding, errors=mode.errors)
+            with rewrite as target:
+                pending = None
+                for line, ending in self._execute(mode.lines_with_endings(source)):
+                    # Only the last printed line may lack terminator
+                    if pending is not None:
+                        target.write(pending[0] + (pending[1] or mode.newline))
+                    pending = (line, ending)
+                if pending is not None:
+                    target.write(pending[0] + pending[1])
+
+    def _execute(self, lines: Iterable[Tuple[AnyStr, AnyStr]], first: int = 1) -> Iterator[Tuple[AnyStr, AnyStr]]:
+        """
+        Runs commands on (line, terminator) pairs, numbered from *first*,
+        yielding printed pattern spaces with terminators.
+        """
+        if self._multiline:
+            yield from self._execute_spaces(lines, first)
+            return
+        commands = self.commands
+        quiet = self.quiet
+        active: List[Optional[bool]] = [False] * len(commands)
+        if self._needs_last:
+            numbered = enumerate(_with_last(lines), first)
+        else:
+            numbered = enumerate(zip(lines, itertools.repeat(False)), first)
+
+        for number, ((space, ending), is_last) in numbered:
+            deleted = stop = False
+            for index, command in enumerate(commands):
+                if command.addressed and not _selected(command, index, active, space, number, is_last):
+                    continue
+                name = command.name
+                if name == 's':
+                    space, count = command.substitution(string=space)  # type: ignore
+                    if count and command.print_substituted:
+                        yield space, ending
+                elif name == 'p':
+                    yield space, ending
+                elif name == 'd':
+                    deleted = True
+                    break
+                else:
+                    stop = True
+                    break
+            if not deleted and not quiet:
+                yield space, ending
+            if stop:
+                return
+
+    def _execute_spaces(
+        self, lines: Iterable[Tuple[AnyStr, AnyStr]], first: int = 1
+    ) -> Iterator[Tuple[AnyStr, AnyStr]]:
+        """
+        `_execute` for scripts with multi-line commands.
+        Lines of pattern space are joined with newlines, printed pattern space
+        gets terminator of the last line read into it.
+        """
+        commands = self.commands
+        quiet = self.quiet
+        active: List[Optional[bool]] = [False] * len(commands)
+        numbered = enumerate(_with_last(lines), first)
+        newline = matchers.pattern_like('\n', self.script)
+        pattern, hold = _Space(newline), _Space(newline)
+        restart = False
+
+        while True:
+            if not restart:
+                following = next(numbered, None)
+                if following is None:
+                    return
+                number, ((line, ending), is_last) = following
+                pattern.set(line)
+            deleted = restart = stop = False
+            for index, command in enumerate(commands):
+                if command.addressed and not _selected(command, index, active, pattern.text, number, is_last):
+                    continue
+                name = command.name
+                if name == 's':
+                    space, count = command.substitution(string=pattern.text)  # type: ignore
+                    if count:
+                        pattern.set(space)
+                        self._check_size(pattern)
+                        if command.print_substituted:
+                            yield space, ending
+                elif name == 'p':
+                    yield pattern.text, ending
+                elif name == 'd':
+                    deleted = True
+                    break
+                elif name == 'q':
+                    stop = True
+                    break
+                elif name == 'N':
+                    following = next(numbered, None)
+                    if following is None:
+                        # GNU sed prints pattern space, when there is no next line
+                        stop = True
+                        break
+                    number, ((line, ending), is_last) = following
+                    pattern.append(line)
+                    self._check_size(pattern)
+                elif name == 'D':
+                    deleted = True
+                    restart = pattern.delete_first_line()
+                    break
+                elif name == 'P':
+                    line, has_newline = pattern.first_line()
+                    yield line, newline if has_newline else ending
+                elif name == 'h':
+                    hold.set(pattern.text)
+                elif name == 'H':
+                    hold.append(pattern.text)
+                    self._check_size(hold)
+                elif name == 'g':
+                    pattern.set(hold.text)
+                elif name == 'G':
+                    pattern.append(hold.text)
+                    self._check_size(pattern)
+                else:
+                    pattern, hold = hold, pattern
+            if not deleted and not quiet:
+                yield pattern.text, ending
+            if stop:
+                return
+
+    def _check_size(self, space: _Space):
+        if space.size > MAX_SPACE:
+            raise SedException(self.script, 'Pattern or hold space is longer than {} characters'.format(MAX_SPACE))
+
+
+class _Parser:
+    """
+    Parses script text, bytes scripts are parsed as latin-1 text.
+    """
+
+    def __init__(self, script: AnyStr):
+        self._script = script
+        self._text = matchers.pattern_text(script)
+        self._position = 0
+
+    def parse(self) -> List[Command]:
+        commands = []
+        while True:
+            self._skip(BLANKS + SEPARATORS)
+            if self._peek() == '#':
+                self._skip_comment()
+                continue
+            if self._position >= len(self._text):
+                return commands
+            commands.append(self._command())
+            self._skip(BLANKS)
+            if self._peek() == '#':
+                self._skip_comment()
+            elif self._peek() and self._peek() not in SEPARATORS:
+                raise self._error('Unexpected {!r} after command'.format(self._peek()))
+
+    def _error(self, message: str) -> SedException:
+        return SedException(self._script, '{} at position {}.'.format(message, self._position))
+
+    def _peek(self) -> str:
+        return self._text[self._position : self._position + 1]
+
+    def _next(self) -> str:
+        char = self._peek()
+        self._position += len(char)
+        return char
+
+    def _skip(self, chars: str):
+        while self._peek() and self._peek() in chars:
+            self._position += 1
+
+    def _skip_comment(self):
+        while self._peek() and self._peek() != '\n':
+            self._position += 1
+
+    def _command(self) -> Command:
+        start = self._address()
+        end = None
+        if start is not None:
+            self._skip(BLANKS)
+            if self._peek() == ',':
+                self._position += 1
+                self._skip(BLANKS)
+                end = self._address()
+                if end is None:
+                    raise self._error('Missing range end address')
+        self._skip(BLANKS)
+        negate = self._peek() == '!'
+        if negate:
+            self._position += 1
+            self._skip(BLANKS)
+
+        name = self._next()
+        if name in ('d', 'p') or name in MULTILINE_COMMANDS:
+            return Command(name, start, end, negate)
+        if name == 'q':
+            if end is not None:
+                raise self._error('Command q accepts one address only')
+            return Command(name, start, end, negate)
+        if name == 's':
+            substitution, flags = self._substitution()
+            return Command(name, start, end, negate, substitution, flags)
+        if not name or name in SEPARATORS:
+            raise self._error('Missing command')
+        raise self._error('Unknown command {!r}'.format(name))
+
+    def _address(self) -> Optional[Address]:
+        char = self._peek()
+        if char.isdigit():
+            start = self._position
+            while self._peek().isdigit():
+                self._position += 1
+            number = int(self._text[start : self._position])
+            if number == 0:
+                raise self._error('Line numbers start from 1')
+            return Address(number=number)
+        if char == '$':
+            self._position += 1
+            return Address(last=True)
+        if char not in ('/', '\\'):
+            return None
+
+        self._position += 1
+        separator = self._separator() if char == '\\' else char
+        pattern = self._delimited(separator, re.escape(separator))
+        flags = frozenset()
+        if self._peek() == 'I':
+            self._position += 1
+            flags = frozenset({SedFlags.INSENSITIVE})
+        return Address(matcher=self._compile(matchers.compile_search_pattern, pattern, flags))
+
+    def _separator(self) -> str:
+        separator = self._next()
+        if not separator or separator in '\\\n':
+            raise self._error('Separator must not be backslash or newline')
+        return separator
+
+    def _delimited(self, separator: str, escaped: str) -> str:
+        """
+        Reads text up to unescaped *separator*, escaped separators are replaced by *escaped*.
+        """
+        parts = []
+        while True:
+            char = self._next()
+            if not char or char == '\n':
+                raise self._error('Unterminated expression, missing {!r}'.format(separator))
+            if char == separator:
+                return ''.join(parts)
+            if char == '\\':
+                following = self._next()
+                parts.append(escaped if following == separator else char + following)
+            else:
+                parts.append(char)
+
+    def _substitution(self) -> Tuple[engine.Processor, engine.Flags]:
+        separator = self._separator()
+        pattern = self._delimited(separator, re.escape(separator))
+        substitution = self._delimited(separator, separator)
+        flags = set()
+        while self._peek().isalpha():
+            flag = self._next()
+            if utils.FLAGS_MAP.get(flag) not in SUBSTITUTE_FLAGS:
+                raise self._error('Unknown flag {!r} of s command'.format(flag))
+            flags.add(utils.FLAGS_MAP[flag])
+
+        def _compile_substitution(pattern: AnyStr, flags: engine.Flags) -> engine.Processor:
+            repl = matchers.pattern_like(substitution, self._script)
+            return engine._cast_commands_to_processors((pattern, repl), flags=flags, action='substitution')[0]
+
+        return self._compile(_compile_substitution, pattern, frozenset(flags)), frozenset(flags)
+
+    def _compile(self, compile_pattern, pattern: str, flags: engine.Flags) -> engine.Processor:
+        if not pattern:
+            raise self._error('Empty regular expression')
+        try:
+            return compile_pattern(matchers.pattern_like(pattern, self._script), flags)
+        except re.error as e:
+            raise self._error('Invalid regular expression {!r}: {}'.format(pattern, e)) from e
+
+
+def _join(script: Sequence[AnyStr]) -> AnyStr:
+    expressions = list(script)
+    if not expressions:
+        raise SedException(script, 'Script must have at least one expression')
+    engine._check_pattern_types(script, expressions)
+    return matchers.pattern_like('\n', expressions[0]).join(expressions)  # type: ignore
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile_script(script: AnyStr, quiet: bool) -> SedScript:
+    return SedScript(script, _Parser(script).parse(), quiet=quiet)
+
+
+def compile_script(script: Script, quiet: bool = False) -> SedScript:
+    """
+    Parses sed script and returns reusable `SedScript`.
+    *script* is a string (or bytes) of commands or a list of them, like several `-e` options.
+    *quiet* script prints only lines printed by `p` commands and flags, like `sed -n`.
+    Compiled scripts are cached.
+    """
+    if not isinstance(script, (str, bytes)):
+        script = _join(script)
+    return _compile_script(script, quiet)
+
+
+def sed_script(
+    script: Script,
+    processable: engine.Processable,
+    quiet: bool = False,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+) -> List[AnyStr]:
+    """
+    Runs sed script on processable, returning list of printed lines.
+    For inplace rewrite and output files use `compile_script`.
+    """
+    return compile_script(script, quiet).run(processable, encoding=encoding, errors=errors)  # type: ignore
@@ -1,21 +1,30 @@
 import functools
+import io
 import itertools
 import pathlib
-import re
-from types import FunctionType
-from typing import Callable, FrozenSet, Iterable, List, Optional, Tuple, Union
-
-import coreutils.sed.utils as utils
+from typing import IO, AnyStr, Callable, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
+
+import coreutils.sed.backends as backends
+import coreutils.sed.buffers as buffers
+import coreutils.sed.compression as compression
+import coreutils.sed.files as files
+import coreutils.sed.matchers as matchers
+import coreutils.sed.walk as walk
 from coreutils.sed import SedException, SedFlags
+from coreutils.sed.cache import MatchCache
+from coreutils.sed.stats import SedStats
 
-Processor = Callable[[str], bool]
-Processable = Union[str, Iterable[str], pathlib.Path, Iterable[pathlib.Path]]
-Commands = Union[str, Iterable[str], Processor, Iterable[Processor]]
+Processor = Callable[[AnyStr], bool]
+Processable = Union[AnyStr, Iterable[AnyStr], pathlib.Path, Iterable[pathlib.Path]]
+Commands = Union[AnyStr, Iterable[AnyStr], Processor, Iterable[Processor]]
 Flags = FrozenSet[SedFlags]
 
-SubstituitionProcessor = Union[Tuple[str, str], Tuple[str, Callable[[str], str]]]
+SubstituitionProcessor = Union[Tuple[AnyStr, AnyStr], Tuple[AnyStr, Callable[[AnyStr], AnyStr]]]
 SubstitutionCommands = Union[SubstituitionProcessor, Iterable[SubstituitionProcessor]]
 
+# Opt-in, e.g. `match_cache.resize(1024)` for inputs with many repeated lines
+match_cache = MatchCache(0)
+
 
 def _cast_commands_to_processors(
     commands: Union[Commands, SubstitutionCommands], flags: Flags, action: str = 'search'
@@ -23,83 +32,161 @@ def _cast_commands_to_processors(
     """
     Generic functon to handle different processor types.
     """
-    def _compile_regex_search(pattern: str) -> Processor:
-        """
-        Functon compiles regular expression and returns search
-        function.
-        """
-        regex = re.compile(pattern, flags=re.IGNORECASE if SedFlags.INSENSITIVE in flags else 0)
-        return regex.search  # type: ignore
-
-    def _compile_regex_substitute(pattern: str, repl: Union[str, Callable[[str], str]]) -> Processor:
+    def _compile_regex_substitute(pattern: AnyStr, repl: Union[AnyStr, Callable[[AnyStr], AnyStr]]) -> Processor:
         """
         Functon compiles regular expression and returns substitute
         function. Substitute function repl argument can be string or function.
         """
-        regex = re.compile(pattern, flags=re.IGNORECASE if SedFlags.INSENSITIVE in flags else 0)
+        regex = backends.compile(pattern, matchers.regex_flags(flags))
         if SedFlags.GLOBAL in flags:
             return functools.partial(regex.subn, repl=repl)  # type: ignore
         return functools.partial(regex.subn, repl=repl, count=1)  # type: ignore
 
-    if action == 'search' and isinstance(commands, FunctionType):
-        return [commands]
-
     if action == 'search':
-        if isinstance(commands, str):
-            return [_compile_regex_search(pattern=commands)]
-        return [_compile_regex_search(pattern=command) if isinstance(command, str) else command for command in commands]
+        if isinstance(commands, (str, bytes)) or callable(commands):
+            commands = [commands]
+        commands = list(commands)
+        patterns = [command for command in commands if isinstance(command, (str, bytes))]
+        callables = [command for command in commands if not isinstance(command, (str, bytes))]
+        _check_pattern_types(commands, patterns)
+        return matchers.compile_search_patterns(patterns, flags) + callables
     elif action == 'substitution':
         if isinstance(commands, tuple):
-            return [_compile_regex_substitute(pattern=commands[0], repl=commands[1])]
-        return [_compile_regex_substitute(pattern=command[0], repl=commands[1]) for command in commands]
+            commands = [commands]
+        commands = list(commands)
+        _check_pattern_types(commands, [command[0] for command in commands])
+        return [_compile_regex_substitute(pattern=command[0], repl=command[1]) for command in commands]
+
+
+def _check_pattern_types(commands, patterns: List[AnyStr]):
+    if len({type(pattern) for pattern in patterns}) > 1:
+        raise SedException(commands, 'str and bytes patterns cannot be mixed')
+
+
+def _processor_patterns(processor: Processor) -> Tuple[AnyStr, ...]:
+    """
+    Returns patterns of search matcher or substitution regex, callables have none.
+    """
+    processor = getattr(processor, 'processor', processor)  # traced processor
+    if isinstance(processor, functools.partial):
+        return (processor.func.__self__.pattern,)  # type: ignore
+    return getattr(processor, 'patterns', ())
 
 
-def _aggregate_processable_lines(processable: Processable) -> Iterable[str]:
+def _file_mode(
+    processors: List[Processor], encoding: Optional[str] = None, errors: Optional[str] = None
+) -> files.FileMode:
+    """
+    Files are read as bytes for bytes patterns, otherwise they're decoded
+    with *encoding* and *errors* (locale encoding by default).
+    """
+    binary = any(isinstance(pattern, bytes) for processor in processors for pattern in _processor_patterns(processor))
+    if binary and (encoding is not None or errors is not None):
+        raise SedException(encoding, 'encoding and errors can be used only with str patterns')
+    return files.FileMode(binary, encoding, errors)
+
+
+def _compile_processors(
+    commands: Union[Commands, SubstitutionCommands],
+    flags: Flags,
+    action: str = 'search',
+    stats: Optional[SedStats] = None,
+) -> List[Processor]:
+    """
+    Casts commands to processors, which are traced if *stats* are collected.
+    """
+    if stats is None:
+        return _cast_commands_to_processors(commands, flags=flags, action=action)
+    return stats.compile(functools.partial(_cast_commands_to_processors, commands, flags=flags, action=action))
+
+
+def _in_workers(workers: Optional[int], stats: Optional[SedStats]) -> bool:
+    if workers is None or workers <= 1:
+        return False
+    if stats is not None:
+        raise SedException(workers, 'Statistics are collected only in current process, workers cannot be used')
+    return True
+
+
+def explain(commands: Commands, flags: Optional[Flags] = None) -> List[matchers.Strategy]:
+    """
+    Shows how search *commands* are going to be matched:
+    returns patterns of every processor along with its matching strategy
+    (literal, prefiltered regex, fused regex, Aho-Corasick automaton or callable).
+    """
+    flags = frozenset(flags or set())
+    return [matchers.describe(processor) for processor in _cast_commands_to_processors(commands, flags=flags)]
+
+
+def _aggregate_processable_lines(
+    processable: Processable, mode: files.FileMode = files.TEXT, stats: Optional[SedStats] = None
+) -> Iterator[AnyStr]:
     """
     Generic function to handle different processable types.
+    Lines are yielded lazily, files are read line by line
+    (as bytes in binary *mode*).
     """
-    def _process_file(path: pathlib.Path) -> List[str]:
+    def _process_file(path: pathlib.Path) -> Iterator[AnyStr]:
         """
-        If it's file processable, then return list of file lines
+        If it's file processable, then yield file lines
+        without line terminators (lines of all files for directory)
         """
-        return path.read_text().splitlines()
-
-    if isinstance(processable, str):
-        return [processable]
+        for file_path in walk.file_paths([path]):
+            if stats is None:
+                yield from files.read_lines(file_path, mode)
+            else:
+                yield from stats.read(file_path, files.read_lines(file_path, mode))
+
+    if isinstance(processable, (str, bytes)):
+        yield processable
+        return
 
     if isinstance(processable, pathlib.Path):
-        return _process_file(processable)
+        yield from _process_file(processable)
+        return
 
-    lines: List[str] = []
     for process in processable:
         if isinstance(process, pathlib.Path):
-            lines += _process_file(path=process)
+            yield from _process_file(path=process)
         else:
-            lines.append(process)
-    return lines
+            yield process
 
 
-@functools.lru_cache(typed=True)
-def _match_line(line: str, processor: Processor, flags: Flags) -> bool:
+def _match_line(line: AnyStr, processor: Processor, flags: Flags, cached: bool = True) -> bool:
     """
     Checks one processor (condition) at a time.
     Returns match according to DELETE flag.
+    Processor results are memoized in `match_cache` if it's turned on and *cached*.
     """
-    is_match = processor(line)
+    if cached and match_cache.enabled:
+        is_match = match_cache.lookup((line, processor), _call_processor, processor, line)
+    else:
+        is_match = bool(processor(line))
     if SedFlags.DELETE in flags:
         return not is_match
     return is_match
 
 
-def _is_processors_matched(line: str, processors: Iterable[Processor], flags: Flags) -> bool:
+def _call_processor(processor: Processor, line: AnyStr) -> bool:
+    return bool(processor(line))
+
+
+def _cached_match(processor: Processor, line: AnyStr) -> bool:
+    return match_cache.lookup((line, processor), _call_processor, processor, line)
+
+
+def _is_processors_matched(
+    line: AnyStr, processors: Iterable[Processor], flags: Flags, cached: bool = True
+) -> bool:
     """
     We must chek all supplied processors (conditions) on processed string.
     """
     for processor in processors:
-        if _match_line(line, processor, flags=flags):
+        if _match_line(line, processor, flags=flags, cached=cached):
             return True
     return False
 
+
 def _check_flags(flags: Flags):
     """
     If PRINT flag and DELETE flag are both used, then raise exception
@@ -107,138 +194,542 @@ def _check_flags(flags: Flags):
     if flags and SedFlags.DELETE in flags and SedFlags.PRINT in flags:
         raise SedException(flags, 'SedFlags.DELETE and SedFlags.PRINT cannot be used simultaneously')
 
-def substitute(
-    processable: Processable, commands: SubstitutionCommands, flags: Flags
-) -> Union[Iterable[str], None]:  # pylint: disable=unused-argument
+
+def _substitute_line(line: AnyStr, processors: Iterable[Processor]) -> Tuple[AnyStr, int]:
     """
-    Substitute can take *processable* of and apply regular expression or predicate
-    to every string in *processable*, returning list of matched strings.
-    Can take sed flags to modify match behaviour.
+    Makes all substitutions on supplied line and returns it
+    along with total number of substitutions made.
     """
-    def make_substitutions_on_line(line: str, processors) -> str:
-        """
-        Makes all substitutions on supplied line and returns it.
-        """
-        substituted_line = line
-        for processor in processors:
-            substituted_line = processor(string=substituted_line)
-        return substituted_line
+    substitutions_count = 0
+    for processor in processors:
+        line, count = processor(string=line)  # type: ignore
+        substitutions_count += count
+    return line, substitutions_count
+
+
+def _substitute_lines(lines: Iterable[AnyStr], processors: List[Processor], flags: Flags) -> Iterator[AnyStr]:
+    """
+    Lazily applies substitution processors to every line.
+    """
+    for line in lines:
+        substituted_line, count = _substitute_line(line, processors)
+        if SedFlags.PRINT in flags and count:
+            yield substituted_line
+        yield substituted_line
+
+
+def _line_matcher(processors: List[Processor], flags: Flags, cached: bool = True) -> Processor:
+    """
+    Returns function telling whether line is matched, the only processor
+    is called directly (or through `match_cache`, if it's turned on and *cached*)
+    unless DELETE flag needs to be handled.
+    """
+    cached = cached and match_cache.enabled
+    if len(processors) == 1 and SedFlags.DELETE not in flags:
+        if cached:
+            return functools.partial(_cached_match, processors[0])
+        return processors[0]
+    return functools.partial(_is_processors_matched, processors=processors, flags=flags, cached=cached)
+
 
+def _search_lines(
+    lines: Iterable[AnyStr], processors: List[Processor], flags: Flags, cached: bool = True
+) -> Iterator[AnyStr]:
+    """
+    Lazily yields lines matched by processors.
+    """
+    print_all = SedFlags.PRINT in flags
+    is_matched = _line_matcher(processors, flags, cached)
+    for line in lines:
+        if is_matched(line):
+            yield line
+            if print_all:
+                yield line
+        elif print_all:
+            yield line
+
+
+def _check_max_count(max_count: Optional[int], flags: Flags):
+    if max_count is None:
+        return
+    if max_count < 0:
+        raise SedException(max_count, 'max_count must be non-negative')
+    if SedFlags.PRINT in flags:
+        raise SedException(flags, 'max_count limits matched lines, SedFlags.PRINT prints all of them')
+
+
+def _limited(lines: Iterator[AnyStr], max_count: Optional[int]) -> Iterator[AnyStr]:
+    """
+    Stops *lines* once *max_count* of them are yielded.
+    """
+    if max_count is None:
+        return lines
+    return _take(lines, max_count)
+
+
+def _take(lines: Iterator[AnyStr], count: int) -> Iterator[AnyStr]:
+    """
+    Next line is never asked for after the last one, and *lines* are closed right away,
+    so files they are read from are closed and never read any further.
+    """
+    try:
+        if count > 0:
+            for number, line in enumerate(lines, 1):
+                yield line
+                if number >= count:
+                    return
+    finally:
+        close = getattr(lines, 'close', None)
+        if close is not None:
+            close()
+
+
+def _search_processable(
+    processable: Processable,
+    processors: List[Processor],
+    flags: Flags,
+    workers: Optional[int] = None,
+    mode: files.FileMode = files.TEXT,
+    stats: Optional[SedStats] = None,
+    max_count: Optional[int] = None,
+) -> Iterator[AnyStr]:
+    """
+    Lazily searches processable, files are spread across
+    *workers* processes if more than one worker is requested.
+    With *stats* lines are always matched one by one, bypassing `match_cache`,
+    so every line reaches processors.
+    Search stops after *max_count* matched lines.
+    """
+    _check_max_count(max_count, flags)
+    if _in_workers(workers, stats):
+        from coreutils.sed import parallel
+
+        matched_lines = parallel.search(processable, processors, flags, workers=workers, mode=mode, max_count=max_count)
+        return _limited(matched_lines, max_count)  # type: ignore
+    if stats is not None:
+        lines = _aggregate_processable_lines(processable, mode, stats)
+        matched_lines = _search_lines(lines, processors, flags, cached=False)
+        return stats.finish(_limited(matched_lines, max_count))
+    return _limited(_search_sequentially(processable, processors, flags, mode), max_count)
+
+
+def _search_to_file(
+    processable: Processable,
+    processors: List[Processor],
+    flags: Flags,
+    output: pathlib.Path,
+    workers: Optional[int] = None,
+    mode: files.FileMode = files.TEXT,
+    stats: Optional[SedStats] = None,
+    max_count: Optional[int] = None,
+):
+    """
+    Writes matched lines to *output* file as they are found.
+    Worker processes write their results to temporary files, merged in order,
+    unless search is limited by *max_count* (so its results are few).
+    """
+    _check_max_count(max_count, flags)
+    if max_count is None and _in_workers(workers, stats):
+        from coreutils.sed import parallel
+
+        parallel.search(processable, processors, flags, workers=workers, output=output, mode=mode)
+        return
+    with mode.open(output, 'w') as file:
+        matched_lines = _search_processable(
+            processable, processors, flags, workers=workers, mode=mode, stats=stats, max_count=max_count
+        )
+        files.write_lines(matched_lines, file, mode.newline)
+
+
+def _search_sequentially(
+    processable: Processable, processors: List[Processor], flags: Flags, mode: files.FileMode = files.TEXT
+) -> Iterator[AnyStr]:
+    """
+    Lazily searches processable.
+    Files are searched as whole memory mapped buffers when processors
+    and flags allow it, otherwise they are matched line by line
+    (from the point buffer turns out not to be searchable).
+    Compressed files are always matched line by line while they're decompressed.
+    """
+    buffer_regex = buffers.compile_buffer_regex(processors, flags, mode)
+    if buffer_regex is None:
+        yield from _search_lines(_aggregate_processable_lines(processable, mode), processors, flags)
+        return
+
+    if isinstance(processable, (str, bytes, pathlib.Path)):
+        processable = [processable]
+    for is_file, processes in itertools.groupby(processable, key=lambda process: isinstance(process, pathlib.Path)):
+        if not is_file:
+            yield from _search_lines(processes, processors, flags)
+            continue
+        for path in walk.file_paths(processes):
+            if compression.detect(path) is not None:
+                yield from _search_lines(files.read_lines(path, mode), processors, flags)
+                continue
+            fallback = functools.partial(_search_file_range, path, processors=processors, flags=flags, mode=mode)
+            yield from buffers.search_file(path, buffer_regex, mode=mode, fallback=fallback)  # type: ignore
+
+
+def _search_file_range(
+    path: pathlib.Path, start: int, end: Optional[int], processors: List[Processor], flags: Flags, mode: files.FileMode
+) -> Iterator[AnyStr]:
+    return _search_lines(files.read_range_lines(path, start, end, mode), processors, flags)
+
+
+def _substitute_processable(
+    processable: Processable,
+    processors: List[Processor],
+    flags: Flags,
+    workers: Optional[int] = None,
+    mode: files.FileMode = files.TEXT,
+    stats: Optional[SedStats] = None,
+) -> Iterator[AnyStr]:
+    """
+    Lazily substitutes processable, files are spread across
+    *workers* processes if more than one worker is requested.
+    """
+    if _in_workers(workers, stats):
+        from coreutils.sed import parallel
+
+        return parallel.substitute(processable, processors, flags, workers=workers, mode=mode)  # type: ignore
+    if stats is None:
+        return _substitute_sequentially(processable, processors, flags, mode)
+    substituted_lines = _substitute_lines(_aggregate_processable_lines(processable, mode, stats), processors, flags)
+    return stats.finish(substituted_lines)
+
+
+def _substitute_sequentially(
+    processable: Processable,
+    processors: List[Processor],
+    flags: Flags,
+    mode: files.FileMode = files.TEXT,
+    blocks: bool = False,
+) -> Iterator[AnyStr]:
+    """
+    Lazily substitutes processable.
+    Files are substituted in blocks of many lines, with one call per pattern and block,
+    when processors and flags allow it (see `buffers.compile_buffer_substitutions`),
+    otherwise they are substituted line by line.
+    With *blocks* substituted blocks of file lines are yielded joined with newlines.
+    """
+    substitutions = buffers.compile_buffer_substitutions(processors, flags)
+    if substitutions is None:
+        yield from _substitute_lines(_aggregate_processable_lines(processable, mode), processors, flags)
+        return
+
+    if isinstance(processable, (str, bytes, pathlib.Path)):
+        processable = [processable]
+    newline = mode.newline
+    for is_file, processes in itertools.groupby(processable, key=lambda process: isinstance(process, pathlib.Path)):
+        if not is_file:
+            yield from _substitute_lines(processes, processors, flags)
+            continue
+        for path in walk.file_paths(processes):
+            with mode.open(path) as file:
+                file_blocks = files.read_blocks(file, buffers.SUBSTITUTE_BLOCK)
+                for block, _ in buffers.substitute_blocks(file_blocks, substitutions):
+                    if blocks:
+                        yield block
+                    else:
+                        yield from block.split(newline)
+
+
+def _substitute_to_file(
+    processable: Processable,
+    processors: List[Processor],
+    flags: Flags,
+    output: pathlib.Path,
+    workers: Optional[int] = None,
+    mode: files.FileMode = files.TEXT,
+    stats: Optional[SedStats] = None,
+):
+    """
+    Writes substituted lines to *output* file as they are produced.
+    Worker processes write their results to temporary files, merged in order.
+    """
+    if _in_workers(workers, stats):
+        from coreutils.sed import parallel
+
+        parallel.substitute(processable, processors, flags, workers=workers, output=output, mode=mode)
+        return
+    with mode.open(output, 'w') as file:
+        if stats is None:
+            substituted = _substitute_sequentially(processable, processors, flags, mode, blocks=True)
+        else:
+            substituted = _substitute_processable(processable, processors, flags, mode=mode, stats=stats)
+        files.write_lines(substituted, file, mode.newline)
+
+
+def isubstitute(
+    processable: Processable,
+    commands: SubstitutionCommands,
+    flags: Optional[Flags] = None,
+    workers: Optional[int] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    stats: Optional[SedStats] = None,
+) -> Iterator[AnyStr]:
+    """
+    Streaming version of `substitute`.
+    Files are read line by line and substituted strings are yielded
+    as soon as they are ready, so memory stays flat regardless of input size.
+    Inplace substitution is not supported, use `substitute` instead.
+    """
     flags = frozenset(flags or set())
-    processors = _cast_commands_to_processors(commands, flags=flags, action='substitution')
-    lines = None
+    _check_flags(flags)
+    if SedFlags.INPLACE in flags:
+        raise SedException(flags, 'SedFlags.INPLACE is not supported in streaming mode, use `substitute` instead')
+
+    processors = _compile_processors(commands, flags, action='substitution', stats=stats)
+    mode = _file_mode(processors, encoding, errors)
+    return _substitute_processable(processable, processors, flags, workers=workers, mode=mode, stats=stats)
 
+
+def _substitute_stream(
+    lines: Iterable[Tuple[AnyStr, AnyStr]], target: IO, processors: List[Processor], flags: Flags, newline: AnyStr
+):
+    """
+    Substitutes *lines* split from their terminators one by one,
+    writing them to *target* with original line terminators.
+    """
+    print_substituted = SedFlags.PRINT in flags
+    for line, ending in lines:
+        substituted_line, count = _substitute_line(line, processors)
+        if print_substituted and count:
+            target.write(substituted_line + (ending or newline))
+        target.write(substituted_line + ending)
+
+
+def _substitute_file_inplace(
+    path: pathlib.Path,
+    processors: List[Processor],
+    flags: Flags,
+    mode: files.FileMode = files.TEXT,
+    stats: Optional[SedStats] = None,
+):
+    """
+    Applies substitution processors to file, streaming it into temporary file,
+    which atomically replaces original one.
+    File is substituted in blocks of many lines where possible, as `_substitute_sequentially` does.
+    """
+    substitutions = None if stats is not None else buffers.compile_buffer_substitutions(processors, flags)
+    with mode.open(path, newline='') as source:
+        if mode.binary:
+            rewrite = files.atomic_rewrite(path, 'wb')
+        else:
+            rewrite = files.atomic_rewrite(path, newline='', encoding=mode.encoding, errors=mode.errors)
+        with rewrite as target:
+            if substitutions is not None:
+                fallback = functools.partial(_substitute_block_lines, processors=processors, flags=flags, mode=mode)
+                blocks = files.read_blocks(source, buffers.SUBSTITUTE_BLOCK)
+                for block, ending in buffers.substitute_blocks(blocks, substitutions, fallback=fallback):
+                    target.write(block)
+                    target.write(ending)
+                return
+            lines = mode.lines_with_endings(source)
+            if stats is not None:
+                lines = stats.read(path, lines)
+            _substitute_stream(lines, target, processors, flags, mode.newline)
+
+
+def _substitute_block_lines(block: str, processors: List[Processor], flags: Flags, mode: files.FileMode) -> str:
+    """
+    Substitutes text block read without newline translation line by line, keeping line terminators.
+    """
+    target = io.StringIO(newline='')
+    lines = files.lines_with_endings(io.StringIO(block, newline=''))
+    _substitute_stream(lines, target, processors, flags, mode.newline)
+    return target.getvalue()
+
+
+def _substitute_inplace(
+    processable: Processable,
+    processors: List[Processor],
+    flags: Flags,
+    workers: Optional[int] = None,
+    mode: files.FileMode = files.TEXT,
+    stats: Optional[SedStats] = None,
+):
+    """
+    Applies substitution processors to files, rewriting them.
+    Files are spread across *workers* processes if more than one worker is requested.
+    """
     if isinstance(processable, pathlib.Path):
         processable = [processable]
     else:
         processable = list(processable)
-    if SedFlags.INPLACE in flags:
-        file_to_lines = {}
-        processing_files = isinstance(processable[0], pathlib.Path)
-        if processing_files:
-            for proc_able in processable:
-                if not isinstance(proc_able, pathlib.Path):
-                    raise SedException(processable,
-                                       "If {}'s supplied as processable, no other types allowed between them".format(pathlib.Path))
-
-                lines = _aggregate_processable_lines(proc_able)
-                file_to_lines[proc_able] = []
-                for line in lines:
-                    substituted_line = make_substitutions_on_line(line, processors)
-                    if SedFlags.PRINT in flags and substituted_line[1]:
-                        file_to_lines[proc_able].append(substituted_line[0])
-                    file_to_lines[proc_able].append(substituted_line[0])
-
-            for file in file_to_lines:
-                with open(file.resolve(), 'w') as f:
-                    f.writelines('\n'.join(file_to_lines[file]))
-                    f.flush()
-        else:
-            raise SedException(None, "Inplace substitution on types other than files is not implemented")
-
+    if not processable:
         return
+    processing_files = isinstance(processable[0], pathlib.Path)
+    if not processing_files:
+        raise SedException(None, "Inplace substitution on types other than files is not implemented")
+    for proc_able in processable:
+        if not isinstance(proc_able, pathlib.Path):
+            raise SedException(
+                processable, "If {}'s supplied as processable, no other types allowed between them".format(pathlib.Path)
+            )
+    processable = walk.file_paths(processable)
+
+    if _in_workers(workers, stats):
+        from coreutils.sed import parallel
+
+        parallel.substitute_inplace(processable, processors, flags, workers=workers, mode=mode)
+        return
+    for path in processable:
+        _substitute_file_inplace(path, processors, flags, mode, stats)
+    if stats is not None:
+        stats.finished()
 
-    lines = _aggregate_processable_lines(processable)
 
+def substitute(
+    processable: Processable,
+    commands: SubstitutionCommands,
+    flags: Flags,
+    workers: Optional[int] = None,
+    output: Optional[pathlib.Path] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    stats: Optional[SedStats] = None,
+) -> Union[Iterable[AnyStr], None]:  # pylint: disable=unused-argument
+    """
+    Substitute can take *processable* of and apply regular expression or predicate
+    to every string in *processable*, returning list of matched strings.
+    Can take sed flags to modify match behaviour.
+    Files can be processed in parallel by *workers* processes (big files are split into chunks),
+    results keep input order.
+    If *output* file is given, results are written there instead of being returned.
+    With bytes patterns files are read without decoding and bytes are returned,
+    otherwise files are decoded with *encoding* and *errors*.
+    Per processor and per file statistics are collected into *stats*, if given.
+    """
+    flags = frozenset(flags or set())
+    if SedFlags.INPLACE in flags:
+        processors = _compile_processors(commands, flags, action='substitution', stats=stats)
+        mode = _file_mode(processors, encoding, errors)
+        _substitute_inplace(processable, processors, flags, workers=workers, mode=mode, stats=stats)
+        return None
+    if output is not None:
+        _check_flags(flags)
+        processors = _compile_processors(commands, flags, action='substitution', stats=stats)
+        mode = _file_mode(processors, encoding, errors)
+        _substitute_to_file(processable, processors, flags, output, workers=workers, mode=mode, stats=stats)
+        return None
+
+    substituted_lines = isubstitute(
+        processable, commands, flags, workers=workers, encoding=encoding, errors=errors, stats=stats
+    )
+    return list(substituted_lines)
+
+
+def isearch(
+    processable: Processable,
+    commands: Commands,
+    flags: Optional[Flags] = None,
+    workers: Optional[int] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    stats: Optional[SedStats] = None,
+    max_count: Optional[int] = None,
+) -> Iterator[AnyStr]:
+    """
+    Streaming version of `search`.
+    Files are read line by line and matched strings are yielded
+    as soon as they are found, so memory stays flat regardless of input size.
+    """
+    flags = frozenset(flags or set())
     _check_flags(flags)
+    processors = _compile_processors(commands, flags, stats=stats)
+    mode = _file_mode(processors, encoding, errors)
+    return _search_processable(
+        processable, processors, flags, workers=workers, mode=mode, stats=stats, max_count=max_count
+    )
 
 
-    substitutions = []
-    for line in lines:
-        substituted_line = make_substitutions_on_line(line, processors)
-        if SedFlags.PRINT in flags and substituted_line[1]:
-            substitutions.append(substituted_line[0])
-        substitutions.append(substituted_line[0])
-    return substitutions
-
-def search(processable: Processable, commands: Commands, flags: Optional[Flags] = None) -> List[str]:
+def search(
+    processable: Processable,
+    commands: Commands,
+    flags: Optional[Flags] = None,
+    workers: Optional[int] = None,
+    output: Optional[pathlib.Path] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    stats: Optional[SedStats] = None,
+    max_count: Optional[int] = None,
+) -> Optional[List[AnyStr]]:
     """
     Search can take *processable* and apply regular expression or predicate
     to every string in *processable*, returning list of matched strings.
     Can take sed flags to modify match behaviour.
+    Files can be processed in parallel by *workers* processes (big files are split into chunks),
+    results keep input order.
+    If *output* file is given, results are written there instead of being returned.
+    With bytes patterns files are read without decoding and bytes are returned,
+    otherwise files are decoded with *encoding* and *errors*.
+    Per processor and per file statistics are collected into *stats* (see `SedStats`), if given.
+    Search stops as soon as *max_count* lines are matched, the rest of input isn't read.
     """
-    flags = frozenset(flags or set())
-    processors = _cast_commands_to_processors(commands, flags=flags)
-    lines = _aggregate_processable_lines(processable)
+    if output is None:
+        matched_lines = isearch(
+            processable,
+            commands,
+            flags,
+            workers=workers,
+            encoding=encoding,
+            errors=errors,
+            stats=stats,
+            max_count=max_count,
+        )
+        return list(matched_lines)
 
+    flags = frozenset(flags or set())
     _check_flags(flags)
-
-    match_lines, filter_lines = itertools.tee(lines, 2)
-    is_matched_strings = (
-        _is_processors_matched(line=text, processors=prcs, flags=flags)
-        for text, prcs in zip(match_lines, itertools.repeat(processors))  # noqa
+    processors = _compile_processors(commands, flags, stats=stats)
+    mode = _file_mode(processors, encoding, errors)
+    _search_to_file(
+        processable, processors, flags, output, workers=workers, mode=mode, stats=stats, max_count=max_count
     )
+    return None
 
-    if SedFlags.PRINT not in flags:
-        return [line for line, is_matched in zip(filter_lines, is_matched_strings) if is_matched]
 
-    matches = []
-    for line, is_matched in zip(filter_lines, is_matched_strings):
-        if is_matched:
-            matches.append(line)
-        matches.append(line)
-    return matches
+def search_first(
+    processable: Processable,
+    commands: Commands,
+    flags: Optional[Flags] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+) -> Optional[AnyStr]:
+    """
+    Returns the first matched line (or `None`), input isn't read past it.
+    """
+    return next(isearch(processable, commands, flags, encoding=encoding, errors=errors, max_count=1), None)
+
 
-def sed_search(command: str, processable: Processable) -> List[str]:
+def sed_search(
+    command: AnyStr, processable: Processable, encoding: Optional[str] = None, errors: Optional[str] = None
+) -> List[AnyStr]:
     """
     Wrapper around `search` function.
-    Takes command string and applies it to processable,
+    Takes command string (or bytes) and applies it to processable,
     returning list of matched strings.
+    Parsed commands are cached, see `coreutils.sed.compile`.
     For more versatile use, use `search` function instead.
     """
-    command_parse_match = re.match(r'^/(?P<pattern>.*)/(?P<flags>[^/]*)$', command)
-    pattern = command_parse_match.group('pattern')
-    flags = {utils.FLAGS_MAP[sf] for sf in command_parse_match.group('flags')}
-    return search(processable, pattern, flags)
+    from coreutils.sed.program import compile as compile_command
+
+    return compile_command(command).search(processable, encoding=encoding, errors=errors)  # type: ignore
 
-def sed_substitute(command: str, processable: Processable) -> Union[List[str], None]:
+
+def sed_substitute(
+    command: AnyStr, processable: Processable, encoding: Optional[str] = None, errors: Optional[str] = None
+) -> Union[List[AnyStr], None]:
     """
     Wrapper around `substitute` function.
-    Takes command string and applies it to processable,
+    Takes command string (or bytes) and applies it to processable,
     returning list of substituted strings
     (or, if makes changes inplace, then returns `None`).
+    Parsed commands are cached, see `coreutils.sed.compile`.
     For more versatile use, use `substitute` function instead.
     """
-    def verify_separator():
-        generic_solve = 'Use unique separator.'
-        separator_error = None
-        if separator in pattern:
-            separator_error = 'Separator used in pattern.'
-        if separator in substitution:
-            separator_error = 'Separator used in substitution string.'
-        if separator in str_flags:
-            separator_error = 'Separator used in flags.'
-
-        if separator_error:
-            raise SedException(command, '{} {}'.format(separator_error, generic_solve))
-
-    command_parse_match = re.match(r'^s(?P<separator>.)(?P<pattern>.*)(?P=separator)(?P<substitution>.*)(?P=separator)(?P<flags>.*)$', command)
-    pattern = command_parse_match.group('pattern')
-    separator = command_parse_match.group('separator')
-    substitution = command_parse_match.group('substitution')
-    str_flags = command_parse_match.group('flags')
-    verify_separator()
-
-    flags = {utils.FLAGS_MAP[sf] for sf in str_flags}
-
-    return substitute(processable, (pattern, substitution), flags)
+    from coreutils.sed.program import compile as compile_command
+
+    return compile_command(command).substitute(processable, encoding=encoding, errors=errors)
@@ -0,0 +1,187 @@
+import pathlib
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+import coreutils.sed.matchers as matchers
+
+T = TypeVar('T')
+
+
+class ProcessorStats:
+    """
+    Counters of one processor: every call processes one line,
+    *bytes* are UTF-8 encoded length of str lines.
+    """
+
+    __slots__ = ('patterns', 'strategy', 'calls', 'matches', 'seconds', 'bytes')
+
+    def __init__(self, patterns: tuple, strategy: str):
+        self.patterns = patterns
+        self.strategy = strategy
+        self.calls = 0
+        self.matches = 0
+        self.seconds = 0.0
+        self.bytes = 0
+
+    @property
+    def lines(self) -> int:
+        return self.calls
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'patterns': [_printable(pattern) for pattern in self.patterns],
+            'strategy': self.strategy,
+            'calls': self.calls,
+            'matches': self.matches,
+            'seconds': self.seconds,
+            'lines': self.lines,
+            'bytes': self.bytes,
+        }
+
+    def __repr__(self) -> str:
+        return '{}({!r}, calls={}, matches={}, seconds={:.6f})'.format(
+            type(self).__name__, self.patterns, self.calls, self.matches, self.seconds
+        )
+
+
+class FileStats:
+    """
+    Time spent reading file lines (decoding included).
+    """
+
+    __slots__ = ('path', 'seconds', 'lines', 'bytes')
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.seconds = 0.0
+        self.lines = 0
+        self.bytes = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'path': str(self.path), 'seconds': self.seconds, 'lines': self.lines, 'bytes': self.bytes}
+
+    def __repr__(self) -> str:
+        return '{}({!r}, lines={}, seconds={:.6f})'.format(
+            type(self).__name__, str(self.path), self.lines, self.seconds
+        )
+
+
+class TracedProcessor:
+    """
+    Calls processor, recording its statistics.
+    Has no patterns, so traced lines are never searched as whole buffers.
+    """
+
+    def __init__(self, processor: Callable, stats: ProcessorStats):
+        self.processor = processor
+        self.stats = stats
+
+    def __call__(self, *args, **kwargs):
+        line = args[0] if args else kwargs['string']
+        start = time.perf_counter()
+        result = self.processor(*args, **kwargs)
+        stats = self.stats
+        stats.seconds += time.perf_counter() - start
+        stats.calls += 1
+        stats.bytes += len(line) if isinstance(line, bytes) else len(line.encode('utf-8', 'surrogatepass'))
+        # Substitution processors return substituted line along with substitutions count
+        if result[1] if isinstance(result, tuple) else result:
+            stats.matches += 1
+        return result
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, self.processor)
+
+
+class SedStats:
+    """
+    Collects statistics of `search` and `substitute` calls it's passed to:
+    compilation time, per processor counters and per file read time.
+    Lines are matched bypassing `match_cache`, so every one of them reaches processors.
+    Optional callbacks are called on every stage:
+    *on_compile* with this object once processors are compiled,
+    *on_file* with `FileStats` once file is read
+    and *on_finish* with this object once all lines are processed.
+    """
+
+    def __init__(
+        self,
+        on_compile: Optional[Callable[['SedStats'], Any]] = None,
+        on_file: Optional[Callable[[FileStats], Any]] = None,
+        on_finish: Optional[Callable[['SedStats'], Any]] = None,
+    ):
+        self.on_compile = on_compile
+        self.on_file = on_file
+        self.on_finish = on_finish
+        self.compile_seconds = 0.0
+        self.processors: List[ProcessorStats] = []
+        self.files: List[FileStats] = []
+
+    def compile(self, compile_processors: Callable[[], List[Callable]]) -> List[TracedProcessor]:
+        """
+        Compiles processors, wrapping them into traced ones.
+        """
+        start = time.perf_counter()
+        processors = compile_processors()
+        self.compile_seconds += time.perf_counter() - start
+
+        traced = []
+        for processor in processors:
+            description = matchers.describe(processor)
+            processor_stats = ProcessorStats(description.patterns, description.strategy)
+            self.processors.append(processor_stats)
+            traced.append(TracedProcessor(processor, processor_stats))
+        if self.on_compile is not None:
+            self.on_compile(self)
+        return traced
+
+    def read(self, path: pathlib.Path, lines: Iterable[T]) -> Iterator[T]:
+        """
+        Yields file *lines*, recording time spent on reading every one of them.
+        """
+        file_stats = FileStats(path)
+        self.files.append(file_stats)
+        iterator = iter(lines)
+        while True:
+            start = time.perf_counter()
+            try:
+                line = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                file_stats.seconds += time.perf_counter() - start
+            file_stats.lines += 1
+            yield line
+        file_stats.bytes = path.stat().st_size
+        if self.on_file is not None:
+            self.on_file(file_stats)
+
+    def finish(self, results: Iterable[T]) -> Iterator[T]:
+        """
+        Yields *results*, calling *on_finish* callback once they're exhausted.
+        """
+        yield from results
+        self.finished()
+
+    def finished(self):
+        if self.on_finish is not None:
+            self.on_finish(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Plain structure suitable for JSON or metrics export.
+        """
+        return {
+            'compile_seconds': self.compile_seconds,
+            'processors': [processor.as_dict() for processor in self.processors],
+            'files': [file.as_dict() for file in self.files],
+        }
+
+    def __repr__(self) -> str:
+        return '{}(processors={!r}, files={!r})'.format(type(self).__name__, self.processors, self.files)
+
+
+def _printable(pattern: Any) -> str:
+    if isinstance(pattern, bytes):
+        return pattern.decode('latin-1')
+    return pattern if isinstance(pattern, str) else repr(pattern)
@@ -0,0 +1,287 @@
+"""
+Follow mode, like `tail -F file | sed`:
+
+    for line in follow(pathlib.Path('/var/log/app.log'), 'ERROR'):
+        ...
+
+Only data appended since the last read is matched, so work done
+depends on amount of new data rather than on file size.
+New data is awaited with inotify on Linux and by polling elsewhere.
+"""
+
+# pylint: disable=protected-access
+
+import codecs
+import locale
+import os
+import pathlib
+import sys
+import time
+from typing import AnyStr, Dict, Iterable, Iterator, List, Optional, Union
+
+from coreutils.sed import SedException
+from coreutils.sed import sed as engine
+
+# How long (in seconds) to wait for changes before checking files anyway
+POLL_INTERVAL = 1.0
+# How many bytes are read at once
+BLOCK_SIZE = 1024 * 1024
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+# Directories are watched, so files created in place of rotated ones are noticed too
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+Paths = Union[pathlib.Path, Iterable[pathlib.Path]]
+
+
+class FollowedFile:
+    """
+    Reads lines appended to file since the last read.
+    Incomplete last line is held back until its newline is written.
+    Truncated file is read again from its start, rotated file is read
+    to its end and then the new file at the same path is followed.
+    Lines are bytes or, with *encoding*, text decoded with *errors* handler.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        position: Optional[int] = None,
+        encoding: Optional[str] = None,
+        errors: Optional[str] = None,
+    ):
+        self.path = path
+        self._start = position
+        self._file = None
+        self._inode: Optional[int] = None
+        self._offset = 0
+        self._partial = b''
+        self._decoder = None if encoding is None else codecs.getincrementaldecoder(encoding)(errors or 'strict')
+
+    @property
+    def position(self) -> int:
+        """
+        Offset right after the last complete line read, reading can be resumed from it.
+        """
+        return self._offset - len(self._partial)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read(self) -> Iterator[List[AnyStr]]:
+        """
+        Yields batches of new complete lines (without newlines).
+        """
+        if self._file is None and not self._open(self._start):
+            # File created later is read whole
+            self._start = 0
+            return
+        # Like with `tail`, file truncated and then written past old end between reads isn't noticed
+        if os.fstat(self._file.fileno()).st_size < self._offset:  # type: ignore
+            self._file.seek(0)  # type: ignore
+            self._offset = 0
+            self._partial = b''
+            self._reset_decoder()
+        yield from self._drain()
+
+        try:
+            inode = self.path.stat().st_ino
+        except FileNotFoundError:
+            return
+        if inode == self._inode:
+            return
+        # Rotated file won't be written anymore, so its incomplete line is complete
+        if self._partial:
+            yield self._decoded([self._partial], final=True)
+            self._partial = b''
+        self.close()
+        if self._open(0):
+            yield from self._drain()
+
+    def _open(self, position: Optional[int]) -> bool:
+        try:
+            file = self.path.open('rb')
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(file.fileno())
+        if position is None or position > stat.st_size:
+            position = stat.st_size if position is None else 0
+        file.seek(position)
+        self._file = file
+        self._inode = stat.st_ino
+        self._offset = position
+        self._partial = b''
+        self._reset_decoder()
+        # Later openings follow new files, which are read from the start
+        self._start = 0
+        return True
+
+    def _drain(self) -> Iterator[List[bytes]]:
+        while True:
+            block = self._file.read(BLOCK_SIZE)  # type: ignore
+            if not block:
+                return
+            self._offset += len(block)
+            lines = (self._partial + block).split(b'\n')
+            self._partial = lines.pop()
+            if lines:
+                yield self._decoded(lines)
+
+    def _reset_decoder(self):
+        if self._decoder is not None:
+            self._decoder.reset()
+
+    def _decoded(self, lines: List[bytes], final: bool = False) -> List[AnyStr]:
+        """
+        Decodes complete lines with incremental decoder, which keeps its state (e.g. seen BOM) between reads.
+        With *final* the last line is never continued, so its cut off character
+        is left to *errors* handler, as any other undecodable bytes are.
+        """
+        if self._decoder is None:
+            return lines  # type: ignore
+        if not final:
+            text = self._decoder.decode(b'\n'.join(lines) + b'\n')[:-1]
+        else:
+            try:
+                text = self._decoder.decode(b'\n'.join(lines), final=True)
+            finally:
+                self._reset_decoder()
+        return [line[:-1] if line.endswith('\r') else line for line in text.split('\n')]
+
+
+class _PollingWatcher:
+    def wait(self, timeout: float):
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+
+class _InotifyWatcher:
+    """
+    Waits for changes in directories of followed files with inotify.
+    """
+
+    def __init__(self, directories: Iterable[pathlib.Path]):
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._descriptor = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._descriptor < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        try:
+            for directory in set(directories):
+                if libc.inotify_add_watch(self._descriptor, os.fsencode(str(directory)), WATCH_MASK) < 0:
+                    raise OSError(ctypes.get_errno(), 'inotify_add_watch failed', str(directory))
+        except OSError:
+            os.close(self._descriptor)
+            raise
+
+    def wait(self, timeout: float):
+        import select
+
+        readable, _, _ = select.select([self._descriptor], [], [], timeout)
+        if not readable:
+            return
+        # Events only wake up reading of all files, so they're just dropped
+        while True:
+            try:
+                if not os.read(self._descriptor, 64 * 1024):
+                    return
+            except BlockingIOError:
+                return
+
+    def close(self):
+        os.close(self._descriptor)
+
+
+def _watcher(paths: List[pathlib.Path]):
+    if sys.platform.startswith('linux'):
+        try:
+            return _InotifyWatcher(path.resolve().parent for path in paths)
+        except (OSError, AttributeError):
+            pass
+    return _PollingWatcher()
+
+
+def _follow(
+    followed: List[FollowedFile],
+    processors: List[engine.Processor],
+    flags: engine.Flags,
+    positions: Optional[Dict[pathlib.Path, int]],
+    idle_timeout: Optional[float],
+    poll_interval: float,
+) -> Iterator[AnyStr]:
+    watcher = _watcher([file.path for file in followed])
+    try:
+        idle_since = time.monotonic()
+        while True:
+            for file in followed:
+                for lines in file.read():
+                    idle_since = time.monotonic()
+                    yield from engine._search_lines(lines, processors, flags)
+                    if positions is not None:
+                        positions[file.path] = file.position
+
+            timeout = poll_interval
+            if idle_timeout is not None:
+                remaining = idle_since + idle_timeout - time.monotonic()
+                if remaining <= 0:
+                    return
+                timeout = min(timeout, remaining)
+            watcher.wait(timeout)
+    finally:
+        watcher.close()
+        for file in followed:
+            file.close()
+
+
+def follow(
+    paths: Paths,
+    commands: engine.Commands,
+    flags: Optional[engine.Flags] = None,
+    encoding: Optional[str] = None,
+    errors: Optional[str] = None,
+    from_start: bool = False,
+    positions: Optional[Dict[pathlib.Path, int]] = None,
+    max_count: Optional[int] = None,
+    idle_timeout: Optional[float] = None,
+    poll_interval: float = POLL_INTERVAL,
+) -> Iterator[AnyStr]:
+    """
+    Follows growing files, yielding lines appended to them as soon as they match.
+    Files are followed from their end (or *from_start*), files not created yet are awaited.
+    *positions* dictionary gives offsets to resume files from
+    and is updated with offsets of processed data, so it can be saved and reused later.
+    Lines are followed until generator is closed, *max_count* lines are matched
+    or no new data comes for *idle_timeout* seconds.
+    Text lines are split before they're decoded, so encoding must keep ASCII as is.
+    Undecodable bytes are replaced unless other *errors* handler is given,
+    so one broken line doesn't stop following.
+    """
+    flags = frozenset(flags or set())
+    engine._check_flags(flags)
+    engine._check_max_count(max_count, flags)
+    if poll_interval <= 0:
+        raise SedException(poll_interval, 'poll_interval must be positive')
+    processors = engine._cast_commands_to_processors(commands, flags=flags)
+    mode = engine._file_mode(processors, encoding, errors)
+
+    paths = [paths] if isinstance(paths, pathlib.Path) else list(paths)
+    positions_from = positions or {}
+    if not mode.binary:
+        encoding = mode.encoding or locale.getpreferredencoding(False)
+        errors = mode.errors or 'replace'
+    followed = [
+        FollowedFile(path, positions_from.get(path, 0 if from_start else None), encoding, errors) for path in paths
+    ]
+    lines = _follow(followed, processors, flags, positions, idle_timeout, poll_interval)
+    return engine._limited(lines, max_count)
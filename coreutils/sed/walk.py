@@ -0,0 +1,137 @@
+"""
+Directories as processable:
+
+    search(pathlib.Path('src'), 'TODO')
+    search(Walk('src', include=['*.py'], exclude=['build'], max_size=1024 * 1024), 'TODO')
+
+Directory path is accepted anywhere file path is and is walked with `Walk` defaults,
+so version control directories (e.g. `.git`) are never searched or rewritten in place.
+Files are found with `os.scandir` while the ones found before are matched,
+so search starts right away, however many files tree has.
+Directories, which can't be listed, are skipped the way `os.walk` skips them.
+"""
+
+import fnmatch
+import operator
+import os
+import pathlib
+import re
+from typing import Iterable, Iterator, List, Optional, Pattern, Union
+
+import coreutils.sed.files as files
+from coreutils.sed import SedException
+
+# How many bytes (of decompressed content) are sniffed to tell binary files
+SNIFF_SIZE = 8 * 1024
+# Directories of version control systems, which aren't entered unless asked to
+VCS_DIRECTORIES = frozenset(('.git', '.hg', '.svn'))
+
+
+def _compile_globs(globs: Iterable[str]) -> Optional[Pattern]:
+    globs = list(globs)
+    if not globs:
+        return None
+    return re.compile('|'.join(fnmatch.translate(glob) for glob in globs))
+
+
+def is_binary(path: pathlib.Path) -> bool:
+    """
+    File is binary if its first block has NUL byte (grep and git tell binary files the same way),
+    compressed files are sniffed decompressed.
+    """
+    try:
+        with files.FileMode(binary=True).open(path) as file:
+            return b'\0' in file.read(SNIFF_SIZE)
+    except OSError:
+        # Reading file will report the error
+        return False
+
+
+def _sorted_entries(path: Union[str, pathlib.Path]) -> List[os.DirEntry]:
+    with os.scandir(path) as entries:
+        return sorted(entries, key=operator.attrgetter('name'))
+
+
+class Walk:
+    """
+    Files under *root* directory, depth first and in name order, found lazily while they're iterated.
+    *include* and *exclude* globs are matched against file name and path relative to root
+    (with `/` separators), files are taken only if they match one of *include* globs (if any)
+    and none of *exclude* globs. Excluded directories aren't entered at all.
+    Files larger than *max_size* bytes and, with *skip_binary*, binary files are skipped,
+    with *skip_vcs* `VCS_DIRECTORIES` aren't entered.
+    Symbolic links to directories aren't followed, so walk can't loop.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, pathlib.Path],
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        max_size: Optional[int] = None,
+        skip_binary: bool = True,
+        skip_vcs: bool = True,
+    ):
+        if max_size is not None and max_size < 0:
+            raise SedException(max_size, 'max_size must not be negative')
+        self.root = pathlib.Path(root)
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.max_size = max_size
+        self.skip_binary = skip_binary
+        self.skip_vcs = skip_vcs
+        self._include = _compile_globs(self.include)
+        self._exclude = _compile_globs(self.exclude)
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, str(self.root))
+
+    def __iter__(self) -> Iterator[pathlib.Path]:
+        # Root, which can't be listed, is reported, unlike directories under it
+        stack = [(iter(_sorted_entries(self.root)), '')]
+        while stack:
+            entries, prefix = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                continue
+            relative = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if not self._is_skipped_directory(entry.name, relative):
+                    try:
+                        stack.append((iter(_sorted_entries(entry.path)), relative + '/'))
+                    except OSError:
+                        pass
+            elif entry.is_file() and self._is_taken(entry, relative):
+                yield pathlib.Path(entry.path)
+
+    @staticmethod
+    def _matches(globs: Optional[Pattern], name: str, relative: str) -> bool:
+        return globs is not None and (globs.match(name) is not None or globs.match(relative) is not None)
+
+    def _is_skipped_directory(self, name: str, relative: str) -> bool:
+        return (self.skip_vcs and name in VCS_DIRECTORIES) or self._matches(self._exclude, name, relative)
+
+    def _is_taken(self, entry: os.DirEntry, relative: str) -> bool:
+        if self._matches(self._exclude, entry.name, relative):
+            return False
+        if self._include is not None and not self._matches(self._include, entry.name, relative):
+            return False
+        if self.max_size is not None:
+            try:
+                if entry.stat().st_size > self.max_size:
+                    return False
+            except OSError:
+                return False
+        return not (self.skip_binary and is_binary(pathlib.Path(entry.path)))
+
+
+def file_paths(paths: Iterable[pathlib.Path]) -> Iterator[pathlib.Path]:
+    """
+    Yields file paths as they are and files of directory paths (walked with `Walk` defaults).
+    """
+    for path in paths:
+        if path.is_dir():
+            yield from Walk(path)
+        else:
+            yield path
@@ -0,0 +1,86 @@
+import asyncio
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedException, SedFlags, aio
+
+LINES = ['The', 's command', 'as', 'in', 'substitute', 'is', 'probably', 'the', 'most']
+
+
+@pytest.fixture
+def run():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+
+
+@pytest.fixture
+def path():
+    with tempfile.NamedTemporaryFile(mode='w+') as file:
+        file.write('\n'.join(LINES))
+        file.flush()
+        yield pathlib.Path(file.name)
+
+
+async def _stream(lines, delay=0):
+    for line in lines:
+        await asyncio.sleep(delay)
+        yield line
+
+
+@pytest.mark.parametrize('flags', [None, {SedFlags.PRINT}, {SedFlags.DELETE}, {SedFlags.INSENSITIVE}])
+def test_aio_search(run, path, flags):
+    expected = sed.search(LINES, '^t', flags)
+    assert run(aio.search(LINES, '^t', flags)) == expected
+    assert run(aio.search(_stream(LINES), '^t', flags)) == expected
+    assert run(aio.search(path, '^t', flags)) == expected
+    assert run(aio.search(_stream(['the', path]), '^t', flags)) == sed.search(['the', path], '^t', flags)
+
+
+def test_aio_substitute(run, path):
+    expected = sed.substitute(LINES, ('s', '#'), {SedFlags.GLOBAL})
+    assert run(aio.substitute(_stream(LINES), ('s', '#'), {SedFlags.GLOBAL})) == expected
+    assert run(aio.substitute(_stream([path]), ('s', '#'), {SedFlags.GLOBAL, SedFlags.INPLACE})) is None
+    assert path.read_text().splitlines() == expected
+
+
+def test_aio_stream_reader(run):
+    async def search_stream():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'GET / 200\nPOST /login 500\n')
+        reader.feed_eof()
+        return await aio.search(reader, rb' 500$')
+
+    assert run(search_stream()) == [b'POST /login 500\n']
+
+
+def test_aio_small_batches(run):
+    lines = aio.isearch(_stream(LINES), 's', batch_size=2)
+    assert run(_collect(lines)) == sed.search(LINES, 's')
+
+
+def test_aio_slow_stream_is_not_held_back(run):
+    async def stalled_stream():
+        yield 'match'
+        await asyncio.Event().wait()
+
+    async def first_match():
+        lines = aio.isearch(stalled_stream(), 'match')
+        line = await asyncio.wait_for(lines.__anext__(), timeout=1)
+        await lines.aclose()
+        return line
+
+    assert run(first_match()) == 'match'
+
+
+def test_aio_validates_eagerly():
+    with pytest.raises(SedException):
+        aio.isubstitute(LINES, ('s', '#'), {SedFlags.INPLACE})
+
+
+async def _collect(lines):
+    return [line async for line in lines]
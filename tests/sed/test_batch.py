@@ -0,0 +1,83 @@
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import BatchQuery, SedFlags, batch
+
+LINES = [
+    'GET /index 200',
+    'POST /login 500',
+    'get /about 404',
+    'GET /admin 500',
+    'PUT /ſtatic 201',
+    'DELETE /admin 403',
+    '',
+]
+QUERIES = {
+    'literal': '500',
+    'regex': r'^GET /\w+ 5\d\d$',
+    'insensitive': BatchQuery('get /', {SedFlags.INSENSITIVE}),
+    'folded': BatchQuery('static', {SedFlags.INSENSITIVE}),
+    'shared': ['/admin', '500'],
+    'deleted': BatchQuery('GET', {SedFlags.DELETE}),
+    'printed': BatchQuery('admin', {SedFlags.PRINT}),
+    'callable': lambda line: line.startswith('PUT'),
+    'nothing': 'TRACE',
+}
+
+
+@pytest.fixture(params=[None, 2])
+def small_blocks(request, monkeypatch):
+    if request.param is not None:
+        monkeypatch.setattr(batch, 'BLOCK_LINES', request.param)
+        monkeypatch.setattr(batch, 'BLOCK_SIZE', request.param * 8)
+
+
+def _separately(processable, queries):
+    results = {}
+    for name, query in queries.items():
+        if not isinstance(query, BatchQuery):
+            query = BatchQuery(query)
+        results[name] = sed.search(processable, query.commands, query.flags)
+    return results
+
+
+@pytest.mark.parametrize(
+    'queries', [QUERIES, {name: query for name, query in QUERIES.items() if name not in ('deleted', 'printed')}]
+)
+def test_search_batch_lines(small_blocks, queries):
+    assert sed.search_batch(LINES, queries) == _separately(LINES, queries)
+
+
+def test_search_batch_files(small_blocks):
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / 'access.log'
+        path.write_text('\r\n'.join(LINES) + '\n')
+        processable = [path, 'GET /extra 500', path]
+        assert sed.search_batch(processable, QUERIES) == _separately(processable, QUERIES)
+
+
+def test_search_batch_bytes(small_blocks):
+    lines = [line.encode() for line in LINES[:4]]
+    queries = {'literal': b'500', 'insensitive': BatchQuery(b'GET /A', {SedFlags.INSENSITIVE})}
+    assert sed.search_batch(lines, queries) == {'literal': lines[1:4:2], 'insensitive': lines[2:4]}
+
+
+def test_search_batch_newlines_in_lines():
+    lines = ['first\nGET 500', 'GET 200', 'last']
+    queries = {'literal': '500', 'insensitive': BatchQuery('get 2', {SedFlags.INSENSITIVE})}
+    assert sed.search_batch(lines, queries) == {'literal': [lines[0]], 'insensitive': [lines[1]]}
+
+
+def test_isearch_batch_order():
+    pairs = list(sed.isearch_batch(LINES[:4], {'server': '500', 'admin': 'admin'}))
+    assert pairs == [('server', LINES[1]), ('server', LINES[3]), ('admin', LINES[3])]
+
+
+def test_search_batch_errors():
+    with pytest.raises(sed.SedException):
+        sed.search_batch(LINES, {'str': 'GET', 'bytes': b'GET'})
+    with pytest.raises(sed.SedException):
+        sed.search_batch(LINES, {'both': BatchQuery('GET', {SedFlags.DELETE, SedFlags.PRINT})})
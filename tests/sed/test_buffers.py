@@ -0,0 +1,172 @@
+import os
+import pathlib
+import re
+import tempfile
+import threading
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedFlags, buffers
+
+TEXT = 'ERROR: timeout\nerror: Timeout\nWARN élan vital\n\nÉcole 42\nlast line ERROR'
+
+
+@pytest.fixture
+def path():
+    with tempfile.NamedTemporaryFile(mode='w+', encoding='utf-8') as file:
+        file.write(TEXT)
+        file.flush()
+        yield pathlib.Path(file.name)
+
+
+@pytest.mark.parametrize(
+    'commands, flags',
+    [
+        ('ERROR', None),
+        ('ERROR.*timeout', None),
+        ('^$', None),
+        ('ERROR$', None),
+        ('', None),
+        ('timeout', {SedFlags.INSENSITIVE}),
+        (['École', r'\d+'], None),
+        (['vital', '^error'], None),
+    ],
+)
+def test_buffer_search_same_as_line_search(path, commands, flags):
+    flags = frozenset(flags or set())
+    processors = sed.sed._cast_commands_to_processors(commands, flags)  # pylint: disable=protected-access
+    regex = buffers.compile_buffer_regex(processors, flags)
+    assert sed.search(path, commands, flags) == sed.search(TEXT.split('\n'), commands, flags)
+    if regex is not None:
+        assert list(buffers.search_file(path, regex)) == sed.search(TEXT.split('\n'), commands, flags)
+
+
+@pytest.mark.parametrize(
+    'commands, flags',
+    [
+        ('a.b', None),
+        (r'\w+', None),
+        ('[^a]', None),
+        ('a', {SedFlags.PRINT}),
+        ('a', {SedFlags.DELETE}),
+        (lambda line: True, None),
+        ('é', None),
+    ],
+)
+def test_buffer_search_not_applicable(commands, flags):
+    flags = frozenset(flags or set())
+    processors = sed.sed._cast_commands_to_processors(commands, flags)  # pylint: disable=protected-access
+    assert buffers.compile_buffer_regex(processors, flags) is None
+
+
+def test_buffer_search_falls_back_on_carriage_returns():
+    with tempfile.NamedTemporaryFile() as file:
+        file.write(b'match\r\nno\r\nmatch')
+        file.flush()
+        assert buffers.search_file(pathlib.Path(file.name), re.compile(b'match')) is None
+        assert sed.search(pathlib.Path(file.name), 'match$') == ['match', 'match']
+
+
+def test_buffer_search_empty_file():
+    with tempfile.NamedTemporaryFile() as file:
+        assert sed.search(pathlib.Path(file.name), 'a') == []
+
+
+@pytest.mark.parametrize(
+    'search',
+    [
+        lambda path: sed.search(path, 'ERROR', encoding='utf-8'),
+        lambda path: [record.text for record in sed.search_records(path, 'ERROR', encoding='utf-8')],
+    ],
+)
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='Named pipes are created only on POSIX systems')
+def test_buffer_search_fifo(search):
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / 'fifo'
+        os.mkfifo(str(path))
+        writer = threading.Thread(target=path.write_text, args=(TEXT,), kwargs={'encoding': 'utf-8'})
+        writer.start()
+        assert search(path) == ['ERROR: timeout', 'last line ERROR']
+        writer.join()
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/status'), reason='Needs procfs')
+def test_buffer_search_file_with_zero_size():
+    path = pathlib.Path('/proc/self/status')
+    assert path.stat().st_size == 0
+    assert [line.split(':')[0] for line in sed.search(path, '^Name:')] == ['Name']
+    assert [record.line_number for record in sed.search_records(path, '^Name:')] == [1]
+
+
+def test_buffer_search_falls_back_in_window(monkeypatch):
+    monkeypatch.setattr(buffers, 'CHECK_WINDOW', 8)
+    with tempfile.NamedTemporaryFile() as file:
+        file.write(b'match 1\nno\nmatch 2\nmatch\r3\nno\r\nmatch 4')
+        file.flush()
+        path = pathlib.Path(file.name)
+        lines = buffers.search_file(path, re.compile(b'match'), fallback=lambda start, end: iter([(start, end)]))
+        assert list(lines) == ['match 1', 'match 2', (19, 38)]
+        assert sed.search(path, 'match') == ['match 1', 'match 2', 'match', 'match 4']
+
+
+@pytest.fixture(params=[None, 3])
+def substitute_block(request, monkeypatch):
+    if request.param is not None:
+        monkeypatch.setattr(buffers, 'SUBSTITUTE_BLOCK', request.param)
+
+
+@pytest.mark.parametrize(
+    'commands, flags',
+    [
+        (('ERROR', 'E'), {SedFlags.GLOBAL}),
+        (('e', '<\\g<0>>'), None),
+        (('x*', '-'), None),
+        (('x*', '-'), {SedFlags.GLOBAL}),
+        (('^$', 'empty'), None),
+        ((r'(?P<word>\w+) (\d+)', r'\2 \g<word>'), None),
+        (('timeout', 'T'), {SedFlags.INSENSITIVE}),
+        ([('e', 'E'), ('E', '\\\\')], {SedFlags.GLOBAL}),
+    ],
+)
+def test_buffer_substitute_same_as_line_substitute(path, substitute_block, commands, flags):
+    flags = frozenset(flags or set())
+    processors = sed.sed._compile_processors(commands, flags, action='substitution')  # pylint: disable=protected-access
+    assert buffers.compile_buffer_substitutions(processors, flags) is not None
+    expected = sed.substitute(TEXT.split('\n'), commands, flags)
+    assert sed.substitute(path, commands, flags) == expected
+    sed.substitute(path, commands, flags | {SedFlags.INPLACE})
+    assert path.read_text(encoding='utf-8') == '\n'.join(expected)
+
+
+@pytest.mark.parametrize('text', [b'a1\r\nb2\r\n', b'a1\rb2\n\n', b'\xe9a1\nb2'])
+def test_buffer_substitute_inplace_keeps_line_ends(substitute_block, text):
+    with tempfile.NamedTemporaryFile() as file:
+        file.write(text)
+        file.flush()
+        path = pathlib.Path(file.name)
+        # Binary lines end only at \n, text lines at \r too
+        sed.substitute(path, (b'\\d\r?$', b'#'), {SedFlags.INPLACE})
+        assert path.read_bytes() == re.sub(rb'(?m)\d\r?$', b'#', text)
+        path.write_bytes(text.replace(b'\xe9', b''))
+        sed.substitute(path, (r'\d$', '#'), {SedFlags.INPLACE})
+        assert path.read_bytes() == re.sub(rb'\d(?=\r\n|\r|\n|$)', b'#', text.replace(b'\xe9', b''))
+
+
+@pytest.mark.parametrize(
+    'commands, flags',
+    [
+        (('a', 'b'), {SedFlags.PRINT}),
+        (('a', lambda match: 'b'), None),
+        ((r'[^a]', 'b'), None),
+        ((r'\s', 'b'), None),
+        (('(?s)a.', 'b'), None),
+        (('a', 'b\n'), None),
+        (('a', r'b\n'), None),
+        (('a', r'\x0a'), None),
+    ],
+)
+def test_buffer_substitute_not_applicable(commands, flags):
+    flags = frozenset(flags or set())
+    processors = sed.sed._compile_processors(commands, flags, action='substitution')  # pylint: disable=protected-access
+    assert buffers.compile_buffer_substitutions(processors, flags) is None
@@ -0,0 +1,70 @@
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedException, SedFlags
+
+# Not valid UTF-8: latin-1 encoded log lines
+CONTENT = 'GET /caf\xe9 200\nPOST /login 500\r\nget /index 404\n\nGET /\xfcber 500'.encode('latin-1')
+LINES = CONTENT.split(b'\n')
+
+
+@pytest.fixture
+def path():
+    with tempfile.NamedTemporaryFile() as file:
+        file.write(CONTENT)
+        file.flush()
+        yield pathlib.Path(file.name)
+
+
+@pytest.mark.parametrize(
+    'commands, flags',
+    [
+        (b'500', None),
+        (b' 500$', None),
+        (b'^get', {SedFlags.INSENSITIVE}),
+        ([b'caf\xe9', br'\d{3}\r$'], None),
+        (b'^$', None),
+        (b'500', {SedFlags.DELETE}),
+        (b'404', {SedFlags.PRINT}),
+    ],
+)
+def test_bytes_search(path, commands, flags):
+    expected = sed.search(LINES, commands, flags)
+    assert all(isinstance(line, bytes) for line in expected)
+    assert sed.search(path, commands, flags) == expected
+    assert sed.search(path, commands, flags, workers=2) == expected
+
+
+def test_bytes_substitute(path):
+    expected = [line.replace(b'500', b'5xx') for line in LINES]
+    assert sed.substitute(path, (b'500', b'5xx'), None) == expected
+    sed.substitute(path, (b'500', b'5xx'), {SedFlags.INPLACE})
+    assert path.read_bytes() == CONTENT.replace(b'500', b'5xx')
+
+
+def test_bytes_commands(path):
+    assert sed.sed_search(b'/^GET/', path) == [LINES[0], LINES[-1]]
+    assert sed.sed_substitute(b's/\xe9/e/', path)[0] == b'GET /cafe 200'
+
+
+def test_text_encoding(path):
+    assert sed.search(path, 'café', encoding='latin-1') == ['GET /café 200']
+    assert sed.search(path, 'GET', errors='replace', encoding='utf-8') == ['GET /caf� 200', 'GET /�ber 500']
+    sed.substitute(path, ('café', 'cafe'), {SedFlags.INPLACE}, encoding='latin-1')
+    assert path.read_bytes() == CONTENT.replace(b'caf\xe9', b'cafe')
+
+
+@pytest.mark.parametrize(
+    'call',
+    [
+        lambda: sed.search(LINES, [b'GET', 'GET']),
+        lambda: sed.substitute(LINES, [(b'GET', b'get'), ('GET', 'get')], None),
+        lambda: sed.search(LINES, b'GET', encoding='latin-1'),
+    ],
+)
+def test_bytes_misuse(call):
+    with pytest.raises(SedException):
+        call()
@@ -0,0 +1,82 @@
+import pytest
+
+from coreutils import sed
+from coreutils.sed import MatchCache
+
+
+@pytest.fixture
+def match_cache():
+    maxsize = sed.match_cache.info().maxsize
+    sed.match_cache.clear()
+    yield sed.match_cache
+    sed.match_cache.resize(maxsize)
+    sed.match_cache.clear()
+
+
+def test_cache_hits_and_misses():
+    cache = MatchCache(maxsize=2)
+    assert cache.lookup('a', lambda: 1) == 1
+    assert cache.lookup('a', lambda: 2) == 1
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = MatchCache(maxsize=2)
+    cache.lookup('a', lambda: 1)
+    cache.lookup('b', lambda: 2)
+    cache.lookup('a', lambda: 1)
+    cache.lookup('c', lambda: 3)
+    assert cache.info().evictions == 1
+    assert cache.lookup('a', lambda: None) == 1
+    assert cache.lookup('b', lambda: None) is None
+
+
+def test_cache_disabled():
+    cache = MatchCache(maxsize=0)
+    assert not cache.enabled
+    assert cache.lookup('a', lambda: 1) == 1
+    assert cache.lookup('a', lambda: 2) == 2
+    assert cache.info().currsize == 0
+
+
+def test_cache_resize_evicts():
+    cache = MatchCache(maxsize=3)
+    for key in 'abc':
+        cache.lookup(key, lambda: key)
+    cache.resize(1)
+    info = cache.info()
+    assert (info.evictions, info.currsize, info.maxsize) == (2, 1, 1)
+
+
+def test_cache_negative_size():
+    with pytest.raises(ValueError):
+        MatchCache(maxsize=-1)
+
+
+def test_cache_is_opt_in(match_cache):
+    assert not match_cache.enabled
+    assert sed.sed._line_matcher([str.isupper], frozenset()) is str.isupper
+    match_cache.resize(4)
+    is_matched = sed.sed._line_matcher([str.isupper], frozenset())
+    assert [is_matched(line) for line in ['A', 'b', 'A']] == [True, False, True]
+    assert (match_cache.info().hits, match_cache.info().misses) == (1, 2)
+
+
+def test_search_uses_bounded_cache(match_cache):
+    match_cache.resize(4)
+    sed.search(['line {}'.format(i % 8) for i in range(64)], r'line [0-3]')
+    info = match_cache.info()
+    assert info.currsize <= 4
+    assert info.evictions > 0
+
+
+def test_search_with_unhashable_processor(match_cache):
+    class Processor:
+        __hash__ = None  # type: ignore
+
+        def __call__(self, line):
+            return 'b' in line
+
+    assert sed.search(['a', 'b', 'b'], [Processor()]) == ['b', 'b']
+    assert match_cache.info().currsize == 0
@@ -0,0 +1,96 @@
+import pathlib
+import subprocess
+import sys
+import tempfile
+import threading
+
+import pytest
+
+from coreutils.sed import cli
+
+LINES = ['GET /index 200', 'POST /login 500', 'get /about 404', 'GET /admin 500']
+
+
+@pytest.fixture
+def path():
+    with tempfile.NamedTemporaryFile(mode='w+') as file:
+        file.write('\n'.join(LINES) + '\n')
+        file.flush()
+        yield pathlib.Path(file.name)
+
+
+@pytest.mark.parametrize(
+    'args, expected',
+    [
+        (['/500/'], ['POST /login 500', 'GET /admin 500']),
+        (['/^get/I'], ['GET /index 200', 'get /about 404', 'GET /admin 500']),
+        (['/500/d'], ['GET /index 200', 'get /about 404']),
+        (['s/GET/HEAD/'], ['HEAD /index 200', 'POST /login 500', 'get /about 404', 'HEAD /admin 500']),
+        (['-b', '/500/'], ['POST /login 500', 'GET /admin 500']),
+        (['-j', '2', '/404/'], ['get /about 404']),
+    ],
+)
+def test_cli(path, capsys, args, expected):
+    assert cli.main(args + [str(path)]) == 0
+    assert capsys.readouterr().out.splitlines() == expected
+
+
+def test_cli_inplace(path, capsys):
+    assert cli.main(['-i', 's/500/503/', str(path)]) == 0
+    assert capsys.readouterr().out == ''
+    assert path.read_text().splitlines() == [line.replace('500', '503') for line in LINES]
+
+
+@pytest.mark.parametrize(
+    'args, status', [(['s/a/b/x'], 1), (['/a/', '/nonexistent/file'], 2), (['/(/'], 1), (['-f', '/(/', 'app.log'], 1)]
+)
+def test_cli_errors(capsys, args, status):
+    assert cli.main(args) == status
+    assert capsys.readouterr().err.startswith(cli.PROGRAM)
+
+
+def test_cli_invalid_substitution(path, capsys):
+    assert cli.main([r's/GET/\9/', str(path)]) == 1
+    assert capsys.readouterr().err.startswith(cli.PROGRAM)
+
+
+@pytest.mark.parametrize(
+    'args, expected',
+    [
+        (['-e', '/500/d', '-e', 's/GET/HEAD/'], ['HEAD /index 200', 'get /about 404']),
+        (['-n', '2p;$p'], ['POST /login 500', 'GET /admin 500']),
+        (['-n', '-e', 's/^get/GET/p'], ['GET /about 404']),
+    ],
+)
+def test_cli_script(path, capsys, args, expected):
+    assert cli.main(args + [str(path)]) == 0
+    assert capsys.readouterr().out.splitlines() == expected
+
+
+def test_cli_max_count(path, capsys):
+    assert cli.main(['-m', '1', '/500/', str(path), str(path)]) == 0
+    assert capsys.readouterr().out.splitlines() == ['POST /login 500']
+    assert cli.main(['-m', '1', 's/a/b/', str(path)]) == 1
+
+
+def test_cli_follow(path, capsys):
+    def _append():
+        with path.open('a') as file:
+            file.write('PUT /upload 500\n')
+
+    timer = threading.Timer(0.2, _append)
+    timer.start()
+    assert cli.main(['-f', '-m', '1', '/500/', str(path)]) == 0
+    timer.join()
+    assert capsys.readouterr().out.splitlines() == ['PUT /upload 500']
+    assert cli.main(['-f', '/500/']) == 1
+    assert cli.main(['-f', 's/a/b/', str(path)]) == 1
+
+
+def test_cli_import_is_cheap():
+    # Modules command line doesn't need for every run are imported only when used
+    code = 'import sys, coreutils.sed.cli; print(*sorted(name for name in sys.modules if "coreutils." in name))'
+    root = pathlib.Path(__file__).resolve().parents[2]
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, cwd=str(root), check=True)
+    modules = ['cli', 'compression', 'files', 'utils']
+    assert result.stdout.decode().split() == ['coreutils.sed'] + ['coreutils.sed.' + module for module in modules]
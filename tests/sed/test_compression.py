@@ -0,0 +1,97 @@
+import bz2
+import gzip
+import io
+import lzma
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedFlags, compression, parallel
+
+LINES = ['GET /index 200', 'POST /login 500', 'GET /admin 500', 'PUT /upload 201']
+CONTENT = ('\n'.join(LINES) + '\n').encode()
+MODULES = {'.gz': gzip, '.bz2': bz2, '.xz': lzma}
+
+
+@pytest.fixture
+def directory():
+    with tempfile.TemporaryDirectory() as directory:
+        yield pathlib.Path(directory)
+
+
+@pytest.fixture(params=sorted(MODULES))
+def path(request, directory):
+    path = directory / ('access.log' + request.param)
+    path.write_bytes(MODULES[request.param].compress(CONTENT))
+    return path
+
+
+def _decompressed(path: pathlib.Path) -> bytes:
+    return MODULES[path.suffix].decompress(path.read_bytes())
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_search_compressed(path, workers):
+    assert sed.search([path, path], '500', workers=workers) == ['POST /login 500', 'GET /admin 500'] * 2
+    assert sed.search(path, b'^PUT', workers=workers) == [b'PUT /upload 201']
+
+
+def test_compressed_not_split(path):
+    assert list(parallel._tasks([path], 16)) == [path]
+
+
+def test_search_compressed_stopped_early(path):
+    assert sed.search_first(path, 'GET') == 'GET /index 200'
+    assert sed.search(path, '/', max_count=1) == ['GET /index 200']
+
+
+def test_substitute_compressed(path):
+    assert sed.substitute(path, ('500', '503'), set())[1:3] == ['POST /login 503', 'GET /admin 503']
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_substitute_compressed_inplace(path, workers):
+    sed.substitute(path, ('500', '503'), {SedFlags.INPLACE}, workers=workers)
+    assert compression.detect(path) is not None
+    assert _decompressed(path) == CONTENT.replace(b'500', b'503')
+
+
+def test_script_compressed_inplace(path):
+    sed.compile_script('/GET/d').run(path, inplace=True)
+    assert _decompressed(path) == b'POST /login 500\nPUT /upload 201\n'
+
+
+def test_records_compressed(path):
+    records = sed.search_records(path, '500')
+    assert [(record.line_number, record.offset) for record in records] == [(2, 15), (3, 31)]
+    with pytest.raises(sed.SedException):
+        sed.build_index(path)
+
+
+def test_not_really_compressed(directory):
+    path = directory / 'plain.gz'
+    path.write_bytes(CONTENT)
+    assert compression.detect(path) is None
+    assert sed.search(path, '201') == ['PUT /upload 201']
+
+
+def test_corrupted_compressed(directory):
+    path = directory / 'broken.gz'
+    path.write_bytes(gzip.compress(CONTENT)[:-12])
+    with pytest.raises(EOFError):
+        sed.search(path, '201')
+
+
+def test_failed_write_closes_target():
+    class Target(io.BytesIO):
+        def write(self, data):
+            raise OSError('No space left on device')
+
+    target = Target()
+    writer = compression._ThreadedWriter(target)  # pylint: disable=protected-access
+    writer.write(b'block')
+    with pytest.raises(OSError, match='No space'):
+        writer.close()
+    assert target.closed and writer.closed
@@ -0,0 +1,86 @@
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import files, index, parallel
+
+
+@pytest.fixture
+def directory():
+    with tempfile.TemporaryDirectory() as name:
+        yield pathlib.Path(name)
+
+
+def _offsets(content):
+    starts = [0] + [position + 1 for position, byte in enumerate(content) if byte == ord('\n')]
+    return [start for start in starts if start < len(content)]
+
+
+@pytest.mark.parametrize(
+    'content, carriage_returns',
+    [
+        (b'', False),
+        (b'\n', False),
+        (b'one\ntwo\n', False),
+        (b'one\r\ntwo\r\n\nlast', False),
+        (b'one\rtwo\nthree\r', True),
+    ],
+)
+def test_build_index(directory, monkeypatch, content, carriage_returns):
+    monkeypatch.setattr(index, 'BLOCK_SIZE', 3)
+    path = directory / 'file'
+    path.write_bytes(content)
+    line_index = sed.build_index(path)
+    assert list(line_index.offsets) == _offsets(content)
+    assert line_index.carriage_returns == carriage_returns
+    assert len(sed.load_index(path)) == len(list(files.read_lines(path, files.FileMode(binary=True))))
+
+
+@pytest.mark.parametrize('appended', [b'', b'three\n', b'\n\n', b'tail'])
+@pytest.mark.parametrize('content', [b'', b'one\ntwo\n', b'one\ntwo'])
+def test_incremental_index(directory, content, appended):
+    path = directory / 'file'
+    path.write_bytes(content)
+    sed.build_index(path)
+    with path.open('ab') as file:
+        file.write(appended)
+    assert sed.load_index(path) is None or not appended
+    line_index = sed.load_index(path, update=True)
+    assert line_index.is_fresh()
+    assert list(line_index.offsets) == _offsets(content + appended)
+
+
+def test_rewritten_file_reindexed(directory):
+    path = directory / 'file'
+    path.write_bytes(b'a\nb\nc\n')
+    sed.build_index(path)
+    path.write_bytes(b'long line\nb\nc\nd\n')
+    assert list(sed.build_index(path).offsets) == [0, 10, 12, 14]
+
+
+def test_index_ranges(directory):
+    path = directory / 'file'
+    path.write_text(''.join('line {}\n'.format(number) for number in range(1, 101)))
+    (directory / 'indexes').mkdir()
+    line_index = sed.build_index(path, directory=directory / 'indexes')
+    assert sed.load_index(path) is None
+    assert list(line_index.lines(10, 12)) == ['line 10', 'line 11', 'line 12']
+    assert list(line_index.lines(99)) == ['line 99', 'line 100']
+    assert list(line_index.lines(5, 4)) == []
+    start, end = line_index.byte_range(50, 50)
+    assert path.read_bytes()[start:end] == b'line 50\n'
+    assert line_index.line_number(start + 3) == 50
+    assert [chunk[1:] for chunk in parallel.split_file(path, 100)] == line_index.chunks(100)
+
+
+@pytest.mark.parametrize(
+    'script', ['50,52p', '97,$p', '10p; 30,31p; 20q', '3,2p', '60,/line 6./p', '99,120 s/line/L/p']
+)
+def test_script_jumps_to_indexed_lines(directory, script):
+    path = directory / 'file'
+    path.write_text(''.join('line {}\n'.format(number) for number in range(1, 101)))
+    expected = sed.compile_script(script, quiet=True).run(path)
+    sed.build_index(path)
+    assert sed.compile_script(script, quiet=True).run(path) == expected
@@ -0,0 +1,156 @@
+import pickle
+import re
+import sys
+import threading
+import time
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedFlags, backends, linear
+
+CATASTROPHIC = r'(a+)+$'
+CATASTROPHIC_LINE = 'a' * 40 + 'b'
+
+
+@pytest.fixture
+def backend():
+    def _set(backend):
+        previous.append(sed.set_backend(backend))
+
+    previous = []
+    yield _set
+    for backend in previous[:1]:
+        sed.set_backend(backend)
+
+
+@pytest.mark.parametrize(
+    'pattern, string',
+    [
+        (r'a+b', 'xxaaab'),
+        (r'(a|ab)(c|bcd)(d*)', 'abcd'),
+        (r'^foo$', 'foo'),
+        (r'\bfoo\b', 'a foo b'),
+        (r'\Bo', 'foo'),
+        (r'x*', 'abxd'),
+        (r'(?i)straße', 'STRASSE Straße'),
+        (r'[^\d\s]+', '12 ab 3'),
+        (r'a{2,3}?', 'aaaa'),
+        (r'(?P<year>\d{4})-(?P<month>\d\d)', 'on 2024-05 and 2023-01'),
+        (r'$', 'ab\n'),
+        (r'(?m)^b$', 'a\nb\nc'),
+        (r'(?s)a.b', 'a\nb'),
+        (r'(?i)[a-z]+', 'ſK'),
+        (r'\w+', 'żółw 42'),
+        (b'\\xff+', b'a\xff\xffb'),
+        (b'(?i)get /(\\w+)', b'GET /Index'),
+    ],
+)
+def test_matches_like_re(pattern, string):
+    expected, regex = re.compile(pattern), linear.compile(pattern)
+    match, expected_match = regex.search(string), expected.search(string)
+    assert match.span() == expected_match.span()
+    assert match.groups() == expected_match.groups()
+    assert match.groupdict() == expected_match.groupdict()
+    template = b'<\\g<0>>' if isinstance(pattern, bytes) else '<\\g<0>>'
+    assert regex.subn(template, string) == expected.subn(template, string)
+    assert regex.subn(template, string, count=1) == expected.subn(template, string, count=1)
+
+
+@pytest.mark.parametrize(
+    'template', [r'\2/\1', r'\g<month>.\g<year>', r'[\g<0>]\n', r'\0101', lambda match: match.group('month')]
+)
+def test_templates_like_re(template):
+    pattern, string = r'(?P<year>\d{4})-(?P<month>\d\d)', 'on 2024-05 and 2023-01'
+    assert linear.compile(pattern).sub(template, string) == re.sub(pattern, template, string)
+
+
+NEW_SYNTAX = pytest.mark.skipif(
+    sys.version_info < (3, 11), reason='Atomic groups and possessive repeats need Python 3.11'
+)
+
+
+@pytest.mark.parametrize(
+    'pattern',
+    [
+        r'(a)\1',
+        r'a(?=b)',
+        r'(?<!a)b',
+        r'(a)?(?(1)b|c)',
+        pytest.param(r'(?>a+)b', marks=NEW_SYNTAX),
+        pytest.param(r'a++', marks=NEW_SYNTAX),
+        r'(a{1000}){1000}',
+    ],
+)
+def test_unsupported(pattern):
+    with pytest.raises(sed.SedException):
+        linear.compile(pattern)
+
+
+def test_invalid_pattern():
+    with pytest.raises(re.error):
+        linear.compile('a(')
+
+
+def test_catastrophic_pattern_is_linear():
+    start = time.perf_counter()
+    assert linear.compile(CATASTROPHIC).search('a' * 10000 + 'b') is None
+    assert linear.compile(r'(x+x+)+y').subn('-', 'x' * 5000) == ('x' * 5000, 0)
+    assert time.perf_counter() - start < 5
+
+
+def test_pickled():
+    regex = linear.compile(r'(\w+)@(\w+)')
+    assert pickle.loads(pickle.dumps(regex)).sub(r'\2 at \1', 'mail root@host') == 'mail host at root'
+
+
+def test_linear_backend(backend):
+    backend(sed.LinearBackend())
+    lines = ['GET /index', CATASTROPHIC_LINE, 'aaa']
+    assert sed.search(lines, CATASTROPHIC) == ['aaa']
+    assert sed.substitute(lines, (r'(a+)+$', r'<\1>'), {SedFlags.GLOBAL}) == ['GET /index', CATASTROPHIC_LINE, '<aaa>']
+    assert sed.compile_script('s/[AEIOUaeiou]/_/g').run(lines[:1]) == ['G_T /_nd_x']
+    with pytest.raises(sed.SedException):
+        sed.search(lines, r'(\w)\1')
+
+
+def test_set_backend_drops_cached_programs(backend):
+    program = sed.compile('/a+/')
+    backend(sed.LinearBackend())
+    assert sed.compile('/a+/') is not program
+    assert sed.compile('s/a+/b/').substitute(['xaa']) == ['xb']
+
+
+def test_budget_backend(backend):
+    backend(sed.BudgetBackend(0.05))
+    lines = ['GET /index', CATASTROPHIC_LINE, 'aaa']
+    start = time.perf_counter()
+    assert sed.search(lines, CATASTROPHIC) == ['aaa']
+    assert sed.substitute(lines, (CATASTROPHIC, '-'), set()) == ['GET /index', CATASTROPHIC_LINE, '-']
+    assert time.perf_counter() - start < 5
+    # Backreferences still work, but can't be matched within budget
+    assert sed.search(['abba', 'abc'], r'(\w)\1') == ['abba']
+    with pytest.raises(sed.SedException):
+        sed.search([CATASTROPHIC_LINE], r'(a+)+(?=c)')
+
+
+def test_budget_pattern_outside_main_thread():
+    regex = backends.BudgetPattern(CATASTROPHIC, 0, 0.05)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(regex.search(CATASTROPHIC_LINE)))
+    thread.start()
+    thread.join(timeout=5)
+    assert results == [None]
+    assert pickle.loads(pickle.dumps(regex)).search('aa').span() == (0, 2)
+
+
+def test_budget_keeps_alarm_handler():
+    alarms = []
+    previous = backends.signal.signal(backends.signal.SIGALRM, lambda signum, frame: alarms.append(signum))
+    try:
+        backends.BudgetPattern('a', 0, 1).search('a')
+        backends.signal.setitimer(backends.signal.ITIMER_REAL, 0.01)
+        time.sleep(0.1)
+        assert alarms == [backends.signal.SIGALRM]
+    finally:
+        backends.signal.signal(backends.signal.SIGALRM, previous)
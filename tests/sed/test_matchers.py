@@ -0,0 +1,109 @@
+import random
+import string
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedFlags, matchers
+
+LINES = ['The', 's command', 'as', 'in', 'substitute', 'is', 'probably', 'the', 'most', 'İnternational', 'ſtate']
+
+
+def _words(count, seed=0):
+    rnd = random.Random(seed)
+    return [''.join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(2, 6))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('flags', [frozenset(), frozenset({SedFlags.INSENSITIVE})])
+def test_aho_corasick_same_as_regex(flags):
+    patterns = _words(200)
+    lines = [' '.join(_words(5, seed=i)) for i in range(200)] + LINES
+    automaton = matchers.AhoCorasickMatcher(patterns, flags)
+    regexes = [matchers.RegexMatcher([pattern], flags) for pattern in patterns]
+    for line in lines:
+        assert automaton(line) == any(regex(line) for regex in regexes), line
+
+
+def test_aho_corasick_overlapping_patterns():
+    automaton = matchers.AhoCorasickMatcher(['abcd', 'bce', 'cex'], frozenset())
+    assert automaton('xxabcex')
+    assert not automaton('xxabcdx'[:5])
+
+
+@pytest.mark.parametrize(
+    'patterns, expected',
+    [
+        (['a', 'b'], [matchers.LiteralMatcher]),
+        ([r'a\d', r'b\d'], [matchers.RegexMatcher]),
+        (_words(64), [matchers.AhoCorasickMatcher]),
+        (_words(64) + [r'\d+', r'^x'], [matchers.AhoCorasickMatcher, matchers.RegexMatcher]),
+        ([r'(a)\1', r'(?P<name>b)', r'c\d', r'd\d'], [matchers.RegexMatcher] * 3),
+    ],
+)
+def test_patterns_are_fused(patterns, expected):
+    processors = matchers.compile_search_patterns(patterns, frozenset())
+    assert [type(processor) for processor in processors] == expected
+
+
+def test_delete_patterns_are_not_fused():
+    processors = matchers.compile_search_patterns(['a', 'b'], frozenset({SedFlags.DELETE}))
+    assert len(processors) == 2
+
+
+@pytest.mark.parametrize('flags', [None, {SedFlags.INSENSITIVE}])
+def test_search_with_many_patterns(flags):
+    patterns = _words(100) + ['the', 'SED', r'^\w{3}$', lambda line: line.endswith('ost')]
+    expected = [line for line in LINES if any(sed.search([line], pattern, flags) for pattern in patterns)]
+    assert sed.search(LINES, patterns, flags) == expected
+
+
+@pytest.mark.parametrize(
+    'pattern, literal, required',
+    [
+        ('abc', 'abc', 'abc'),
+        (r'a\.b', 'a.b', 'a.b'),
+        ('ERROR.*timeout', None, 'timeout'),
+        (r'(ab)cd?ef', None, 'ef'),
+        (r'x{0,3}yz', None, 'yz'),
+        (r'ab{2}cd', None, 'ab'),
+        (r'\x41bc', None, 'bc'),
+        (r'\bword\b', None, 'word'),
+        ('a|bc', None, None),
+        ('(?i)abc', None, None),
+        (r'ab*', None, None),
+    ],
+)
+def test_pattern_analysis(pattern, literal, required):
+    assert matchers.literal_text(pattern) == literal
+    assert matchers.required_literal(pattern) == required
+
+
+@pytest.mark.parametrize(
+    'commands, flags, strategies',
+    [
+        ('timeout', None, ['literal']),
+        ('timeout', {SedFlags.INSENSITIVE}, ['casefold-literal']),
+        ('ERROR.*timeout', None, ['prefiltered-regex']),
+        (r'^\d+$', None, ['regex']),
+        (['ERROR.*timeout', r'WARN\d'], None, ['prefiltered-fused-regex']),
+        (['a', r'^\d+$', len], None, ['literal', 'regex', 'callable']),
+        (_words(64), None, ['aho-corasick']),
+    ],
+)
+def test_explain(commands, flags, strategies):
+    assert [strategy.strategy for strategy in sed.explain(commands, flags)] == strategies
+
+
+@pytest.mark.parametrize('flags', [None, {SedFlags.INSENSITIVE}, {SedFlags.DELETE}])
+@pytest.mark.parametrize('pattern', ['timeout', 'ERROR.*timeout', r'ERR\w+ tim', 'İ', 'is'])
+def test_fast_paths_same_as_regex(pattern, flags):
+    lines = ['ERROR: timeout', 'error: Timeout', 'ERROR timeo', 'ıs', 'İs', 'ſ', 'timeout ERROR', '']
+    regex = matchers.RegexMatcher([pattern], frozenset(flags or set()))
+    expected = [line for line in lines if bool(regex(line)) != (SedFlags.DELETE in (flags or set()))]
+    assert sed.search(lines, pattern, flags) == expected
+
+
+def test_program_strategies():
+    assert sed.compile('/ERROR.*timeout/I').strategies == [
+        matchers.Strategy(('ERROR.*timeout',), 'prefiltered-regex')
+    ]
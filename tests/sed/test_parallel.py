@@ -0,0 +1,104 @@
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedException, SedFlags, parallel
+
+LINES = ['The', 's command', 'as', 'in', 'substitute', 'is', 'probably', 'the', 'most', 'important']
+
+
+@pytest.fixture
+def paths():
+    with tempfile.TemporaryDirectory() as directory:
+        files = []
+        for index in range(7):
+            path = pathlib.Path(directory) / 'file{}.txt'.format(index)
+            path.write_text('\n'.join(LINES[index:] + LINES[:index]) + '\n')
+            files.append(path)
+        yield files
+
+
+@pytest.mark.parametrize(
+    'commands, flags', [(r'^\w{3}$', None), ('the', {SedFlags.INSENSITIVE}), (len, {SedFlags.PRINT})]
+)
+def test_parallel_search(paths, commands, flags):
+    assert sed.search(paths, commands, flags, workers=3) == sed.search(paths, commands, flags)
+
+
+def test_parallel_search_with_strings(paths):
+    processable = ['the'] + paths[:2] + ['is', 'the'] + paths[2:]
+    assert sed.search(processable, 'the', workers=2) == sed.search(processable, 'the')
+
+
+@pytest.mark.parametrize('flags', [None, {SedFlags.GLOBAL, SedFlags.PRINT}])
+def test_parallel_substitute(paths, flags):
+    assert sed.substitute(paths, ('s', '#'), flags, workers=3) == sed.substitute(paths, ('s', '#'), flags)
+
+
+def test_parallel_substitute_inplace(paths):
+    expected = [sed.substitute(path, ('s', '#'), {SedFlags.GLOBAL}) for path in paths]
+    sed.substitute(paths, ('s', '#'), {SedFlags.GLOBAL, SedFlags.INPLACE}, workers=3)
+    assert [path.read_text().splitlines() for path in paths] == expected
+
+
+def test_parallel_unpicklable_processor(paths):
+    with pytest.raises(SedException):
+        sed.search(paths, lambda line: True, workers=2)
+
+
+@pytest.fixture
+def big_file(monkeypatch):
+    monkeypatch.setattr(parallel, 'CHUNK_SIZE', 40)
+    with tempfile.NamedTemporaryFile(mode='w+') as file:
+        file.write('\n'.join('{} {}'.format(index, line) for index, line in enumerate(LINES * 5)))
+        file.flush()
+        yield pathlib.Path(file.name)
+
+
+def test_split_file(big_file):
+    chunks = parallel.split_file(big_file, 40)
+    content = big_file.read_bytes()
+    assert len(chunks) > 1
+    assert chunks[0].start == 0 and chunks[-1].end == len(content)
+    assert all(content[chunk.end - 1] == ord('\n') for chunk in chunks[:-1])
+    assert all(previous.end == chunk.start for previous, chunk in zip(chunks, chunks[1:]))
+
+
+@pytest.mark.parametrize('commands, flags', [('the', None), (r'\d+ \w{3}$', None), (str.isupper, {SedFlags.PRINT})])
+def test_chunked_search(big_file, commands, flags):
+    assert sed.search(big_file, commands, flags, workers=3) == sed.search(big_file, commands, flags)
+
+
+def test_chunked_substitute(big_file):
+    assert sed.substitute(big_file, ('s', '#'), None, workers=3) == sed.substitute(big_file, ('s', '#'), None)
+
+
+@pytest.mark.parametrize('workers', [None, 3])
+def test_output_to_file(big_file, workers):
+    with tempfile.TemporaryDirectory() as directory:
+        output = pathlib.Path(directory) / 'output.txt'
+        assert sed.search(big_file, 'the', workers=workers, output=output) is None
+        assert output.read_text().splitlines() == sed.search(big_file, 'the')
+        assert sed.substitute(big_file, ('s', '#'), None, workers=workers, output=output) is None
+        assert output.read_text().splitlines() == sed.substitute(big_file, ('s', '#'), None)
+        assert [path.name for path in pathlib.Path(directory).iterdir()] == ['output.txt']
+
+
+def test_chunked_substitute_inplace(big_file):
+    with big_file.open('a') as file:
+        file.write('\r\nlast line a\r\n')
+    expected = big_file.read_bytes().replace(b's', b'#')
+    sed.substitute(big_file, ('s', '#'), {SedFlags.GLOBAL, SedFlags.INPLACE}, workers=3)
+    assert big_file.read_bytes() == expected
+    assert not list(big_file.parent.glob('.{}.*'.format(big_file.name)))
+
+
+def test_chunked_bytes(big_file):
+    lines = big_file.read_bytes().split(b'\n')
+    assert sed.search(big_file, rb'\d+ \w{3}$', workers=3) == sed.search(lines, rb'\d+ \w{3}$')
+    with tempfile.TemporaryDirectory() as directory:
+        output = pathlib.Path(directory) / 'output.txt'
+        sed.substitute(big_file, (b's', b'#'), {SedFlags.GLOBAL}, workers=3, output=output)
+        assert output.read_bytes() == big_file.read_bytes().replace(b's', b'#') + b'\n'
@@ -0,0 +1,38 @@
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedException, SedFlags
+
+LINES = ['The', 's command', 'as', 'in', 'substitute', 'is', 'probably', 'the', 'most']
+
+
+@pytest.mark.parametrize(
+    'command, flags', [('/^t/', set()), ('/^t/I', {SedFlags.INSENSITIVE}), ('/^t/p', {SedFlags.PRINT})]
+)
+def test_program_search(command, flags):
+    program = sed.compile(command)
+    assert program.flags == frozenset(flags)
+    assert program.search(LINES) == sed.search(LINES, '^t', flags)
+    assert list(program.isearch(LINES)) == sed.sed_search(command, LINES)
+
+
+@pytest.mark.parametrize('command', ['s/s/#/', 's|s|#|g', 's/s/#/p'])
+def test_program_substitute(command):
+    program = sed.compile(command)
+    assert program.substitute(LINES) == sed.sed_substitute(command, LINES)
+    assert list(program.isubstitute(LINES)) == program.substitute(LINES)
+
+
+def test_program_is_cached():
+    assert sed.compile('/cached/') is sed.compile('/cached/')
+
+
+@pytest.mark.parametrize('command', ['s/a/b/c/', '/a/z', 'no command', '/a/dp', '/(/', 's/a(/b/'])
+def test_program_invalid_command(command):
+    with pytest.raises(SedException):
+        sed.compile(command)
+
+
+def test_search_program_cannot_substitute():
+    with pytest.raises(SedException):
+        sed.compile('/a/').substitute(['a'])
@@ -0,0 +1,71 @@
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedException, SedFlags, buffers
+
+CONTENT = 'alpha one\nbeta two\ncafé one\n\ngamma one\nlast one'.encode()
+LINE_BREAKS = b'alpha one\r\nbeta two\rcaf\xc3\xa9 one\n\ngamma one\r\nlast one'
+
+
+def _path(content):
+    file = tempfile.NamedTemporaryFile()
+    file.write(content)
+    file.flush()
+    return file
+
+
+@pytest.fixture(params=[CONTENT, LINE_BREAKS])
+def content(request):
+    return request.param
+
+
+@pytest.mark.parametrize('window', [3, buffers.CHECK_WINDOW])
+@pytest.mark.parametrize(
+    'commands, flags',
+    [
+        ('one', None),
+        ('ONE$', {SedFlags.INSENSITIVE}),
+        (['two', r'é\s'], None),
+        ('one', {SedFlags.DELETE}),
+        (lambda line: line.startswith('g'), None),
+    ],
+)
+def test_records(monkeypatch, content, window, commands, flags):
+    monkeypatch.setattr(buffers, 'CHECK_WINDOW', window)
+    with _path(content) as file:
+        path = pathlib.Path(file.name)
+        lines = sed.search(path, commands, flags)
+        records = sed.search_records(path, commands, flags, encoding='utf-8')
+        assert [record.text for record in records] == lines
+        all_lines = list(sed.isearch(path, lambda line: True))
+        for record in records:
+            assert record.path == path
+            assert all_lines[record.line_number - 1] == record.text
+            assert content[record.offset :].decode().startswith(record.text)
+            if record.span is not None:
+                assert sed.search([record.text[slice(*record.span)]], commands, flags)
+
+
+def test_records_of_lines():
+    records = sed.search_records(['one', 'two', 'three'], 't[wh]')
+    assert records == [sed.Record(None, 2, None, (0, 2), 'two'), sed.Record(None, 3, None, (0, 2), 'three')]
+
+
+def test_bytes_records():
+    with _path(LINE_BREAKS) as file:
+        path = pathlib.Path(file.name)
+        records = sed.search_records([path, path], b'one$', max_count=3)
+    assert [(record.line_number, record.offset, record.text) for record in records] == [
+        (2, 11, b'beta two\rcaf\xc3\xa9 one'),
+        (5, 42, b'last one'),
+        (2, 11, b'beta two\rcaf\xc3\xa9 one'),
+    ]
+
+
+@pytest.mark.parametrize('flags, encoding', [({SedFlags.PRINT}, None), (None, 'utf-16')])
+def test_records_errors(flags, encoding):
+    with pytest.raises(SedException):
+        sed.search_records(['one'], 'one', flags, encoding=encoding)
@@ -0,0 +1,141 @@
+import itertools
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedException, script
+
+LINES = ['header', 'Version 1', '', 'start', 'body 1', 'end', 'ERROR 2', 'footer']
+
+
+@pytest.fixture
+def path():
+    with tempfile.NamedTemporaryFile(mode='w+', newline='') as file:
+        file.write('first\r\nsecond\r\nthird')
+        file.flush()
+        yield pathlib.Path(file.name)
+
+
+@pytest.mark.parametrize(
+    'script, expected',
+    [
+        ('2d', ['header', '', 'start', 'body 1', 'end', 'ERROR 2', 'footer']),
+        ('1,/^$/d', ['start', 'body 1', 'end', 'ERROR 2', 'footer']),
+        ('/start/,/end/d; s/\\d/N/g', ['header', 'Version N', '', 'ERROR N', 'footer']),
+        ('/start/,/end/!d', ['start', 'body 1', 'end']),
+        ('6,$ s/^/> /', ['header', 'Version 1', '', 'start', 'body 1', '> end', '> ERROR 2', '> footer']),
+        ('/^e/I p; 3q', ['header', 'Version 1', '']),
+        ('/error/I p; 1,6d', ['ERROR 2', 'ERROR 2', 'footer']),
+        ('5,2d; 3,$d', ['header', 'Version 1']),
+        ('s|(\\w+) (\\d)|\\2/\\1|; /\\//!d', ['1/Version', '1/body', '2/ERROR']),
+        (['s/o/0/g', '$!d'], ['f00ter']),
+        ('# comment\n$p;1,7d', ['footer', 'footer']),
+    ],
+)
+def test_script(script, expected):
+    assert sed.sed_script(script, LINES) == expected
+
+
+@pytest.mark.parametrize(
+    'script, expected',
+    [
+        ('$p', ['footer']),
+        ('s/1/one/p', ['Version one', 'body one']),
+        ('/^start$/,/^end$/p', ['start', 'body 1', 'end']),
+    ],
+)
+def test_quiet_script(script, expected):
+    assert sed.sed_script(script, LINES, quiet=True) == expected
+
+
+@pytest.mark.parametrize(
+    'script, quiet, expected',
+    [
+        ('$!N; P; D', False, LINES),
+        ('N; N; s/\\n/,/g', False, ['header,Version 1,', 'start,body 1,end', 'ERROR 2\nfooter']),
+        ('/start/,/end/H; /end/!d; x; s/\\n/ /g', False, [' start body 1 end']),
+        ('1!G; h; $!d', False, ['\n'.join(LINES[::-1])]),
+        ('$!N; /^\\nstart/P; D', False, ['']),
+        ('x; 1d', False, LINES[:-1]),
+        ('G; 3q', False, ['header\n', 'Version 1\n', '\n']),
+        ('/^start$/{', None, None),
+        ('2h; 3g; 2,3p', True, ['Version 1', 'Version 1']),
+        ('7N; 8p', True, ['ERROR 2\nfooter']),
+        ('/body/N; /\\n/P', True, ['body 1']),
+    ],
+)
+def test_multiline_script(script, quiet, expected):
+    if expected is None:
+        with pytest.raises(SedException):
+            sed.compile_script(script)
+        return
+    assert sed.sed_script(script, LINES, quiet=quiet) == expected
+
+
+@pytest.mark.parametrize(
+    'script, lines, expected',
+    [
+        ('N; 2,3d', list('123456'), ['3\n4', '5\n6']),
+        ('N; 2,3!d', list('123456'), ['1\n2']),
+        ('N; 1,3d', list('123456'), ['3\n4', '5\n6']),
+        ('N; N; 1,2d', list('123456'), ['1\n2\n3', '4\n5\n6']),
+        ('N; /4/,3d', list('12345678'), ['1\n2', '5\n6', '7\n8']),
+        ('3,1G; 3,4D', list('abcd'), ['a', 'b']),
+        ('$!N; P; 2,3D', list('12345'), ['1', '2', '3', '3\n4', '5', '5']),
+        ('$!N; 2,1D', list('1234'), ['2\n3', '4']),
+    ],
+)
+def test_ranges_with_multiline_commands(script, lines, expected):
+    # N and D make line numbers skip or repeat, ranges behave the same as in GNU sed
+    assert sed.sed_script(script, lines) == expected
+
+
+def test_multiline_script_file(path):
+    assert sed.compile_script('N', quiet=True).run(path) == []
+    assert sed.compile_script('$!N; s/\\n/+/').run(path) == ['first+second', 'third']
+    sed.compile_script('$!N; s/\\n/+/').run(path, inplace=True)
+    assert path.read_bytes() == b'first+second\r\nthird'
+
+
+def test_multiline_bytes_script():
+    assert sed.sed_script(b'H; $!d; x', [b'caf\xe9', b'bar']) == [b'\ncaf\xe9\nbar']
+
+
+def test_space_is_bounded(monkeypatch):
+    monkeypatch.setattr(script, 'MAX_SPACE', 25)
+    assert sed.sed_script('$!N; P; D', ['a' * 10] * 5) == ['a' * 10] * 5
+    with pytest.raises(SedException):
+        sed.sed_script('H; $!d', ['a' * 10] * 5)
+
+
+def test_script_quits_early():
+    numbers = (str(number) for number in itertools.count())
+    assert sed.sed_script('/5/q', numbers) == ['0', '1', '2', '3', '4', '5']
+
+
+def test_bytes_script():
+    assert sed.sed_script(b'1d; s/\xe9/e/', [b'caf\xe9', b'caf\xe9']) == [b'cafe']
+
+
+def test_script_inplace(path):
+    sed.compile_script('1d; $p; s/ir/IR/').run(path, inplace=True)
+    assert path.read_bytes() == b'second\r\nthird\nthIRd'
+
+
+def test_script_output(path):
+    with tempfile.TemporaryDirectory() as directory:
+        output = pathlib.Path(directory) / 'output'
+        assert sed.compile_script('2q', quiet=True).run([LINES, path], output=output) is None
+        assert output.read_text() == ''
+    assert sed.compile_script(['$!d']).run([path]) == ['third']
+
+
+@pytest.mark.parametrize(
+    'script',
+    ['k', '/a/', 's/a/b', 's/a/b/i', '1,d', '//d', '0p', '1,2q', 's/(/x/', 'p p', [], ['1d', b'2d']],
+)
+def test_script_errors(script):
+    with pytest.raises(SedException):
+        sed.compile_script(script)
@@ -283,3 +283,52 @@ def test_search_on_file(processable, command, control_seq):
             second.flush()
             result = list(sed.search([pathlib.Path(first.name), pathlib.Path(second.name)], command))
     _assert_common(result, control_seq)
+
+
+LIMITED_LINES = ['error {}'.format(number) if number % 3 == 0 else 'info {}'.format(number) for number in range(30)]
+
+
+@pytest.fixture
+def limited_path():
+    with tempfile.NamedTemporaryFile(mode='w+') as file:
+        file.write('\n'.join(LIMITED_LINES))
+        file.flush()
+        yield pathlib.Path(file.name)
+
+
+@pytest.mark.parametrize('max_count', [0, 1, 4, 100])
+@pytest.mark.parametrize(
+    'commands, flags, kwargs',
+    [
+        ('error', None, {}),
+        (r'^error \d$', None, {}),
+        ('error', {SedFlags.DELETE}, {}),
+        (lambda line: line.endswith('5'), None, {}),
+        ('error', None, {'workers': 2}),
+        ('error', None, {'stats': sed.SedStats()}),
+    ],
+)
+def test_search_max_count(limited_path, max_count, commands, flags, kwargs):
+    expected = sed.search(LIMITED_LINES, commands, flags)[:max_count]
+    assert sed.search(LIMITED_LINES, commands, flags, max_count=max_count) == expected
+    assert sed.search(limited_path, commands, flags, max_count=max_count, **kwargs) == expected
+
+
+def test_search_stops_reading():
+    read = []
+
+    def lines():
+        for line in LIMITED_LINES:
+            read.append(line)
+            yield line
+
+    assert sed.search_first(lines(), 'error [1-9]') == 'error 3'
+    assert read == LIMITED_LINES[:4]
+    assert sed.search_first(LIMITED_LINES, 'warning') is None
+
+
+def test_search_max_count_errors():
+    with pytest.raises(SedException):
+        sed.search(LIMITED_LINES, 'error', {SedFlags.PRINT}, max_count=1)
+    with pytest.raises(SedException):
+        sed.search(LIMITED_LINES, 'error', max_count=-1)
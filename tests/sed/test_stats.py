@@ -0,0 +1,78 @@
+import json
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedException, SedFlags, SedStats
+
+LINES = ['The', 's command', 'as', 'in', 'substitute', 'is', 'probably', 'the', 'most']
+
+
+@pytest.fixture(autouse=True)
+def with_cache():
+    # Statistics are collected bypassing the cache, even when it's on
+    maxsize = sed.match_cache.info().maxsize
+    sed.match_cache.resize(1024)
+    yield
+    sed.match_cache.resize(maxsize)
+    sed.match_cache.clear()
+
+
+@pytest.fixture
+def path():
+    with tempfile.NamedTemporaryFile(mode='w+') as file:
+        file.write('\n'.join(LINES))
+        file.flush()
+        yield pathlib.Path(file.name)
+
+
+def test_search_stats(path):
+    stats = SedStats()
+    assert sed.search([path, 'extra'], ['^t', len], {SedFlags.INSENSITIVE}, stats=stats) == sed.search(
+        [path, 'extra'], ['^t', len], {SedFlags.INSENSITIVE}
+    )
+    regex, length = stats.processors
+    assert (regex.patterns, regex.calls, regex.matches) == (('^t',), len(LINES) + 1, 2)
+    assert regex.bytes == len(''.join(LINES) + 'extra')
+    assert (length.strategy, length.calls, length.matches) == ('callable', len(LINES) - 1, len(LINES) - 1)
+    assert [file.path for file in stats.files] == [path]
+    assert stats.files[0].lines == len(LINES)
+    assert json.loads(json.dumps(stats.as_dict()))['processors'][0]['lines'] == len(LINES) + 1
+
+
+def test_stats_count_repeated_lines():
+    stats = SedStats()
+    assert sed.search(['a', 'b', 'a', 'a'], ['a', str.isalpha], stats=stats) == ['a', 'b', 'a', 'a']
+    assert [(processor.calls, processor.matches) for processor in stats.processors] == [(4, 3), (1, 1)]
+    assert sed.match_cache.info().currsize == 0
+
+
+@pytest.mark.parametrize('flags', [{SedFlags.GLOBAL}, {SedFlags.GLOBAL, SedFlags.INPLACE}])
+def test_substitute_stats(path, flags):
+    stats = SedStats()
+    sed.substitute(path, [('s', '#'), ('^t', 'T')], flags, stats=stats)
+    assert [(processor.strategy, processor.matches) for processor in stats.processors] == [
+        ('substitution', 5),
+        ('substitution', 1),
+    ]
+    assert stats.files[0].bytes == path.stat().st_size
+
+
+def test_stats_callbacks(path):
+    stages = []
+    stats = SedStats(
+        on_compile=lambda stats: stages.append('compile'),
+        on_file=lambda file: stages.append(file.path),
+        on_finish=lambda stats: stages.append('finish'),
+    )
+    lines = sed.isearch(path, 's', stats=stats)
+    assert stages == ['compile']
+    list(lines)
+    assert stages == ['compile', path, 'finish']
+
+
+def test_stats_without_workers(path):
+    with pytest.raises(SedException):
+        sed.search(path, 's', workers=2, stats=SedStats())
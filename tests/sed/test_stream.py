@@ -0,0 +1,49 @@
+import itertools
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedException, SedFlags
+
+LINES = ['The', 's command', 'as', 'in', 'substitute', 'is', 'probably', 'the', 'most']
+
+
+@pytest.mark.parametrize('flags', [None, {SedFlags.PRINT}, {SedFlags.DELETE}, {SedFlags.INSENSITIVE}])
+def test_isearch_same_as_search(flags):
+    assert list(sed.isearch(LINES, r'^\w{3}$', flags)) == sed.search(LINES, r'^\w{3}$', flags)
+
+
+@pytest.mark.parametrize('flags', [None, {SedFlags.PRINT}, {SedFlags.GLOBAL}])
+def test_isubstitute_same_as_substitute(flags):
+    assert list(sed.isubstitute(LINES, ('s', '#'), flags)) == sed.substitute(LINES, ('s', '#'), flags)
+
+
+def test_isearch_is_lazy():
+    infinite_lines = itertools.cycle(['skip', 'match'])
+    assert list(itertools.islice(sed.isearch(infinite_lines, 'match'), 3)) == ['match'] * 3
+
+
+def test_isubstitute_is_lazy():
+    infinite_lines = itertools.repeat('aaa')
+    assert next(sed.isubstitute(infinite_lines, ('a', 'b'), {SedFlags.GLOBAL})) == 'bbb'
+
+
+def test_isearch_on_file():
+    with tempfile.NamedTemporaryFile(mode='w+') as file:
+        file.write('\n'.join(LINES) + '\n')
+        file.flush()
+        result = sed.isearch(pathlib.Path(file.name), r'^\w{3}$')
+        assert next(result) == 'The'
+        assert list(result) == ['the']
+
+
+def test_isubstitute_several_commands():
+    result = sed.isubstitute(['abc'], [('a', 'x'), ('c', 'z')])
+    assert list(result) == ['xbz']
+
+
+def test_isubstitute_inplace_error():
+    with pytest.raises(SedException):
+        sed.isubstitute(['a'], ('a', 'b'), {SedFlags.INPLACE})
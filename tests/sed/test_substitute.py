@@ -173,7 +173,57 @@ def test_substitute_on_file_inplace(original_seq, match, substitute, flags, cont
         first.write('\n'.join(lines_for_first_file))
         first.flush()
         sed.substitute(pathlib.Path(first.name), (match, substitute), flags)
-        first.seek(0)
-        lines = first.readlines()
+        # file is replaced atomically, so it must be reopened to see new content
+        lines = pathlib.Path(first.name).read_text().splitlines()
         result = list(map(str.strip, lines))
     _assert_common(result, control_seq)
+
+
+@pytest.mark.parametrize(
+    'content, flags, expected',
+    [
+        ('a\nb\na\n', {SedFlags.INPLACE}, '#\nb\n#\n'),
+        ('a\r\nb\r\na', {SedFlags.INPLACE}, '#\r\nb\r\n#'),
+        ('a\nb', {SedFlags.INPLACE, SedFlags.PRINT}, '#\n#\nb'),
+        ('b\na', {SedFlags.INPLACE, SedFlags.PRINT}, 'b\n#\n#'),
+    ],
+)
+def test_substitute_inplace_keeps_line_endings(content, flags, expected):
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / 'file.txt'
+        path.write_bytes(content.encode())
+        path.chmod(0o640)
+        sed.substitute(path, ('a', '#'), flags)
+        assert path.read_bytes() == expected.encode()
+        assert path.stat().st_mode & 0o777 == 0o640
+        assert [child.name for child in pathlib.Path(directory).iterdir()] == ['file.txt']
+
+
+def test_substitute_inplace_failure_keeps_original():
+    def fail(match):
+        raise RuntimeError(match)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / 'file.txt'
+        path.write_text('a\nb\na\n')
+        with pytest.raises(RuntimeError):
+            sed.substitute(path, ('b', fail), {SedFlags.INPLACE})
+        assert path.read_text() == 'a\nb\na\n'
+        assert [child.name for child in pathlib.Path(directory).iterdir()] == ['file.txt']
+
+
+def test_substitute_inplace_without_temporary_file_errors(monkeypatch):
+    # Before Python 3.8 NamedTemporaryFile takes neither errors nor anything but binary mode arguments here
+    named_temporary_file = tempfile.NamedTemporaryFile
+
+    def binary_only(mode, dir, prefix, suffix, delete):  # noqa: A002  # pylint: disable=redefined-builtin
+        return named_temporary_file(mode, dir=dir, prefix=prefix, suffix=suffix, delete=delete)
+
+    monkeypatch.setattr(tempfile, 'NamedTemporaryFile', binary_only)
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / 'file.txt'
+        path.write_bytes(b'caf\xe9\r\nbar\n')
+        sed.substitute(path, ('b', 'X'), {SedFlags.INPLACE}, encoding='utf-8', errors='surrogateescape')
+        assert path.read_bytes() == b'caf\xe9\r\nXar\n'
+        sed.compile_script('s/X/b/').run(path, inplace=True, encoding='utf-8', errors='surrogateescape')
+        assert path.read_bytes() == b'caf\xe9\r\nbar\n'
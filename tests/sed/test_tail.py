@@ -0,0 +1,154 @@
+import pathlib
+import tempfile
+import threading
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedFlags
+from coreutils.sed import tail
+
+FOLLOW = {'idle_timeout': 0.5, 'poll_interval': 0.05}
+
+
+@pytest.fixture(params=['inotify', 'polling'])
+def watcher(request, monkeypatch):
+    if request.param == 'polling':
+        monkeypatch.setattr(tail, '_watcher', lambda paths: tail._PollingWatcher())
+    return request.param
+
+
+@pytest.fixture
+def path():
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / 'app.log'
+        path.write_text('old error\nold info\n')
+        yield path
+
+
+def _append(path: pathlib.Path, data: str):
+    with path.open('a') as file:
+        file.write(data)
+
+
+def _append_bytes(path: pathlib.Path, data: bytes):
+    with path.open('ab') as file:
+        file.write(data)
+
+
+def _later(*actions):
+    """
+    Runs actions one by one in background, giving follower time to read data between them.
+    """
+
+    def _run():
+        for action in actions:
+            stop.wait(0.1)
+            action()
+
+    stop = threading.Event()
+    thread = threading.Thread(target=_run)
+    thread.start()
+    return thread
+
+
+def test_follow_appended(path, watcher):
+    thread = _later(
+        lambda: _append(path, 'new error\nnew info\n'),
+        lambda: _append(path, 'partial err'),
+        lambda: _append(path, 'or\n'),
+    )
+    assert list(sed.follow(path, 'error', **FOLLOW)) == ['new error', 'partial error']
+    thread.join()
+
+
+@pytest.mark.parametrize(
+    'kwargs, expected',
+    [
+        ({'from_start': True}, ['old error', 'new error']),
+        ({'flags': {SedFlags.DELETE}}, ['new info']),
+        ({'from_start': True, 'max_count': 1}, ['old error']),
+    ],
+)
+def test_follow_options(path, kwargs, expected):
+    thread = _later(lambda: _append(path, 'new error\nnew info\n'))
+    assert list(sed.follow(path, 'error', **dict(FOLLOW, **kwargs))) == expected
+    thread.join()
+
+
+def test_follow_truncated(path, watcher):
+    thread = _later(lambda: path.write_text(''), lambda: _append(path, 'error after truncation\n'))
+    assert list(sed.follow(path, 'error', **FOLLOW)) == ['error after truncation']
+    thread.join()
+
+
+def test_follow_rotated(path, watcher):
+    rotated = path.with_name('app.log.1')
+    thread = _later(
+        lambda: _append(path, 'last error'),
+        lambda: path.rename(rotated),
+        lambda: _append(rotated, ' of old file\n'),
+        lambda: path.write_text('error of new file\n'),
+    )
+    assert list(sed.follow(path, 'error', **FOLLOW)) == ['last error of old file', 'error of new file']
+    thread.join()
+
+
+def test_follow_undecodable(path, watcher):
+    rotated = path.with_name('app.log.1')
+    thread = _later(
+        lambda: _append_bytes(path, b'bad \xff error\nsplit \xc3'),
+        lambda: _append_bytes(path, b'\xa9 error\ncut \xc3'),
+        lambda: path.rename(rotated),
+        lambda: path.write_bytes(b'error of new file\n'),
+    )
+    expected = ['bad \ufffd error', 'split \xe9 error', 'cut \ufffd', 'error of new file']
+    assert list(sed.follow(path, '.', encoding='utf-8', **FOLLOW)) == expected
+    thread.join()
+
+
+def test_follow_undecodable_strict(path):
+    thread = _later(lambda: _append_bytes(path, b'bad \xff error\n'))
+    with pytest.raises(UnicodeDecodeError):
+        list(sed.follow(path, 'error', encoding='utf-8', errors='strict', **FOLLOW))
+    thread.join()
+
+
+@pytest.mark.parametrize('errors, expected', [('replace', ['cut \ufffd']), ('ignore', ['cut ']), ('strict', None)])
+def test_follow_rotated_cut_off_character(path, errors, expected):
+    thread = _later(
+        lambda: _append_bytes(path, b'cut \xc3'),
+        lambda: path.rename(path.with_name('app.log.1')),
+        lambda: path.write_bytes(b'new file\n'),
+    )
+    lines = sed.follow(path, 'cut', encoding='utf-8', errors=errors, **FOLLOW)
+    if expected is None:
+        with pytest.raises(UnicodeDecodeError):
+            list(lines)
+    else:
+        assert list(lines) == expected
+    thread.join()
+
+
+def test_follow_created(path):
+    created = path.with_name('created.log')
+    thread = _later(lambda: created.write_text('error\n'))
+    assert list(sed.follow([path, created], 'error', **FOLLOW)) == ['error']
+    thread.join()
+
+
+def test_follow_positions(path):
+    positions = {}
+    assert list(sed.follow(path, 'error', from_start=True, positions=positions, **FOLLOW)) == ['old error']
+    assert positions == {path: path.stat().st_size}
+
+    _append(path, 'resumed error\nunfinished error')
+    assert list(sed.follow(path, 'error', positions=positions, **FOLLOW)) == ['resumed error']
+    assert positions[path] == path.stat().st_size - len('unfinished error')
+
+
+def test_follow_errors(path):
+    with pytest.raises(sed.SedException):
+        sed.follow(path, 'error', poll_interval=0)
+    with pytest.raises(sed.SedException):
+        sed.follow(path, 'error', flags={SedFlags.PRINT}, max_count=1)
@@ -0,0 +1,89 @@
+import gzip
+import pathlib
+import tempfile
+
+import pytest
+
+from coreutils import sed
+from coreutils.sed import SedFlags, Walk, walk
+
+TREE = {
+    'a.txt': 'TODO: a\nnothing\n',
+    'b.py': 'x = 1  # TODO: b\n',
+    'image.png': '\x89PNG\x00\x00TODO: binary\n',
+    'build/out.txt': 'TODO: build\n',
+    'src/c.py': 'TODO: c\n',
+    'src/deep/d.txt': 'TODO: d\n' * 100,
+    'src/deep/empty.txt': '',
+    '.git/COMMIT_EDITMSG': 'TODO: git\n',
+    'src/.hg/hgrc': 'TODO: hg\n',
+}
+
+
+@pytest.fixture
+def tree():
+    with tempfile.TemporaryDirectory() as directory:
+        root = pathlib.Path(directory)
+        for name, text in TREE.items():
+            (root / name).parent.mkdir(parents=True, exist_ok=True)
+            (root / name).write_text(text, encoding='latin-1')
+        with gzip.open(str(root / 'src' / 'e.txt.gz'), 'wt') as file:
+            file.write('TODO: e\n')
+        yield root
+
+
+def _names(root, paths):
+    return [path.relative_to(root).as_posix() for path in paths]
+
+
+@pytest.mark.parametrize(
+    'options, expected',
+    [
+        ({}, ['a.txt', 'b.py', 'build/out.txt', 'src/c.py', 'src/deep/d.txt', 'src/deep/empty.txt', 'src/e.txt.gz']),
+        ({'include': ['*.py']}, ['b.py', 'src/c.py']),
+        ({'include': ['src/*.py', 'a.*']}, ['a.txt', 'src/c.py']),
+        ({'exclude': ['build', 'deep', '*.gz']}, ['a.txt', 'b.py', 'src/c.py']),
+        ({'exclude': ['src/deep/*'], 'max_size': 100}, ['a.txt', 'b.py', 'build/out.txt', 'src/c.py', 'src/e.txt.gz']),
+        ({'include': ['*.png'], 'skip_binary': False}, ['image.png']),
+        ({'include': ['COMMIT_EDITMSG', 'hgrc'], 'skip_vcs': False}, ['.git/COMMIT_EDITMSG', 'src/.hg/hgrc']),
+    ],
+)
+def test_walk(tree, options, expected):
+    assert _names(tree, Walk(tree, **options)) == expected
+
+
+def test_search_directory(tree):
+    expected = ['TODO: a', 'x = 1  # TODO: b', 'TODO: build', 'TODO: c'] + ['TODO: d'] * 100 + ['TODO: e']
+    assert sed.search(tree, 'TODO') == expected
+    assert sed.search(['TODO: line', tree / 'src' / 'deep', tree / 'a.txt'], 'TODO: [la]') == ['TODO: line', 'TODO: a']
+    assert sed.search(Walk(tree, include=['*.py']), 'TODO', workers=2) == ['x = 1  # TODO: b', 'TODO: c']
+    assert sed.search_batch(tree, {'a': 'TODO: a', 'c': 'TODO: c'}) == {'a': ['TODO: a'], 'c': ['TODO: c']}
+    assert [record.path.name for record in sed.search_records(tree / 'src', 'TODO: [ce]')] == ['c.py', 'e.txt.gz']
+    assert sed.sed_script('/TODO: [ab]$/!d', tree) == ['TODO: a', 'x = 1  # TODO: b']
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_substitute_directory_inplace(tree, workers):
+    sed.substitute(tree / 'src', ('TODO', 'DONE'), {SedFlags.INPLACE}, workers=workers)
+    sed.compile_script('s/TODO/DONE/').run(Walk(tree, include=['a.txt']), inplace=True)
+    assert sed.search(tree, 'TODO') == ['x = 1  # TODO: b', 'TODO: build']
+    assert (tree / 'image.png').read_bytes() == TREE['image.png'].encode('latin-1')
+    sed.substitute(tree, ('TODO', 'DONE'), {SedFlags.INPLACE}, workers=workers)
+    assert (tree / '.git' / 'COMMIT_EDITMSG').read_text() == TREE['.git/COMMIT_EDITMSG']
+    assert (tree / 'src' / '.hg' / 'hgrc').read_text() == TREE['src/.hg/hgrc']
+    sed.substitute(Walk(tree, include=['*.nothing']), ('TODO', 'DONE'), {SedFlags.INPLACE})
+
+
+def test_walk_is_lazy(tree, monkeypatch):
+    listed = []
+    sorted_entries = walk._sorted_entries
+    monkeypatch.setattr(walk, '_sorted_entries', lambda path: listed.append(path) or sorted_entries(path))
+    assert sed.search_first(tree, 'TODO') == 'TODO: a'
+    assert listed == [tree]
+
+
+def test_walk_errors(tree):
+    with pytest.raises(sed.SedException):
+        Walk(tree, max_size=-1)
+    with pytest.raises(OSError):
+        list(Walk(tree / 'missing'))